@@ -0,0 +1,126 @@
+"""Хеширование и проверка паролей argon2 в отдельном пуле процессов.
+
+Один хеш - ARGON2_MEMORY_COST памяти (по умолчанию 64 MiB) и заметное время CPU.
+Считать его прямо в обработчике значит занимать threadpool FastAPI и не контролировать
+память при всплеске логинов.
+Здесь число одновременных хешей ограничено размером пула (PASSWORD_HASH_WORKERS),
+а очередь ожидающих - PASSWORD_HASH_MAX_PENDING: сверх нее запрос сразу получает 503.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+import asyncio
+import logging
+import multiprocessing
+import threading
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from ..config import settings
+from ..services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+def make_context(time_cost: int, memory_cost: int, parallelism: int) -> CryptContext:
+    return CryptContext(
+        schemes=["argon2"],
+        default="argon2",
+        argon2__time_cost=time_cost,      # Количество итераций (больше = безопаснее, но медленнее)
+        argon2__memory_cost=memory_cost,  # Использование памяти в KiB
+        argon2__parallelism=parallelism,  # Количество параллельных потоков
+        argon2__hash_len=32,      # Длина хеша
+        argon2__salt_len=16,      # Длина соли
+        deprecated="auto"  )
+
+
+pwd_context = make_context(settings.ARGON2_TIME_COST, settings.ARGON2_MEMORY_COST, settings.ARGON2_PARALLELISM)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending = 0  # Меняется только из event loop
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except Exception as e:
+        logger.error(f"Ошибка проверки пароля: {e}")
+        return False
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Проверка пароля; второй элемент - новый хеш, если у сохраненного устаревшие параметры"""
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except Exception as e:
+        logger.error(f"Ошибка проверки пароля: {e}")
+        return False, None
+
+
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: не форкаем процесс с запущенным event loop и потоками
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+
+async def _run_in_pool(func, *args):
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        logger.warning(f"Очередь хеширования паролей переполнена ({_pending}), отклоняем запрос")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер перегружен, повторите попытку позже",
+            headers={"Retry-After": "1"}
+        )
+
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_pool(), func, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_pool(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_pool(verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run_in_pool(verify_and_update_password, plain_password, hashed_password)
+
+
+def pool_stats() -> dict:
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "pending": _pending,
+        "max_pending": settings.PASSWORD_HASH_MAX_PENDING
+    }
+
+
+registry.gauge(
+    "trustflow_password_hash_pending", "Хеширования паролей в пуле и в очереди к нему", (),
+    lambda: {(): _pending}
+)
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
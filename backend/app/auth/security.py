@@ -1,39 +1,33 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import hmac
 import jwt
 from jwt import PyJWTError as JWTError
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from ..config import settings
 from ..database import get_db
 from ..models.user import User
+from ..services.cache import TTLCache
+from .passwords import (
+    pwd_context, verify_password, get_password_hash, verify_password_async, hash_password_async,
+    verify_and_update_password, verify_and_update_password_async
+)
 
-pwd_context = CryptContext(
-    schemes=["argon2"],
-    default="argon2",
-    argon2__time_cost=3,      # Количество итераций (больше = безопаснее, но медленнее)
-    argon2__memory_cost=65536, # Использование памяти в KiB (64MB)
-    argon2__parallelism=4,    # Количество параллельных потоков
-    argon2__hash_len=32,      # Длина хеша
-    argon2__salt_len=16,      # Длина соли
-    deprecated="auto"  )
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Ошибка проверки пароля: {e}")
-        return False
+# Кеш авторизованных пользователей: поля User без password_hash, чтобы не ходить в БД на каждый запрос.
+# Кеш на процесс: invalidate_cached_user сбрасывает запись только в процессе, где прошла запись
+# (маршруты auth, users, credit). Другие реплики API и изменения из воркера и rescore.py
+# (reputation_score) видны не позже чем через AUTH_USER_CACHE_TTL.
+USER_CACHE_FIELDS = [column.name for column in User.__table__.columns if column.name != "password_hash"]
+user_cache = TTLCache(max_size=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+def invalidate_cached_user(user_id: int):
+    """Сбросить кеш пользователя после изменения его данных (вызывать после коммита каждой записи в users)"""
+    user_cache.invalidate(user_id)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -66,10 +60,28 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = None
+    if settings.AUTH_USER_CACHE_ENABLED:
+        cached = user_cache.get(int(user_id))
+        if cached is not None:
+            # Отдельный объект на запрос, не привязанный к сессии
+            user = User(**cached)
+
     if user is None:
-        raise credentials_exception
+        user = db.query(User).filter(User.id == int(user_id)).first()
+        if user is None:
+            raise credentials_exception
+        if settings.AUTH_USER_CACHE_ENABLED:
+            user_cache.set(user.id, {field: getattr(user, field) for field in USER_CACHE_FIELDS})
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
 
-    return user
\ No newline at end of file
+    return user
+
+
+def verify_parser_callback(x_parser_secret: Optional[str] = Header(None)):
+    """Результат парсинга принимается только от парсера, знающего PARSER_CALLBACK_SECRET"""
+    if not settings.PARSER_CALLBACK_SECRET:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Прием результатов парсинга не настроен")
+    if not x_parser_secret or not hmac.compare_digest(x_parser_secret.encode(), settings.PARSER_CALLBACK_SECRET.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный секрет парсера")
\ No newline at end of file
@@ -1,18 +1,52 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .services.metrics import instrument_pool
+from .services.query_profiler import instrument_engine
 from dotenv import load_dotenv
 
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    echo=True
+    echo=settings.SQL_ECHO
 )
 Base = declarative_base()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронные драйверы для тех же баз
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """postgresql://... -> postgresql+asyncpg://..., sqlite://... -> sqlite+aiosqlite://..."""
+    db_url = make_url(url)
+    backend = db_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Нет асинхронного драйвера для базы {backend}")
+    return db_url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or get_async_database_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    echo=settings.SQL_ECHO
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+instrument_pool(engine, "sync")
+instrument_pool(async_engine.sync_engine, "async")
+
+if settings.SQL_PROFILE_ENABLED:
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+
 
 # Dependency для получения сессии БД
 def get_db():
@@ -21,3 +55,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency для async обработчиков: запросы не блокируют event loop
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
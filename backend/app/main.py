@@ -1,11 +1,20 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 from sqlalchemy import text
 
+from .config import settings
+from .auth.passwords import shutdown_pool as shutdown_password_pool
 from .database import engine
 from .routes.auth import router as auth_router
 from .routes.credit import router as credit_router
+from .services.credit_data_client import credit_data_client
+from .services.health import readiness, users_estimate
+from .services.job_queue import queue_depth
+from .services.metrics import MetricsMiddleware, registry
+from .services.query_profiler import profile_queries
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,46 +35,92 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+registry.gauge(
+    "trustflow_job_queue_depth", "Задачи скоринга в очереди и в работе", ("queue", "status"), queue_depth,
+    ttl=settings.METRICS_QUEUE_DEPTH_TTL
+)
+
+
+@app.middleware("http")
+async def sql_profile_middleware(request: Request, call_next):
+    """Профиль SQL выражений запроса: предупреждение о N+1, заголовок X-DB-Profile при SQL_PROFILE_HEADER"""
+    if not settings.SQL_PROFILE_ENABLED:
+        return await call_next(request)
+
+    with profile_queries(f"{request.method} {request.url.path}") as profile:
+        response = await call_next(request)
+    profile.report()
+    if settings.SQL_PROFILE_HEADER:
+        response.headers["X-DB-Profile"] = profile.header()
+    return response
+
+
 app.include_router(auth_router, prefix="/api/auth", tags=["Аутентификация"])
 app.include_router(credit_router, prefix="/api/credit", tags=["Кредитный скоринг"])
 
+@app.on_event("shutdown")
+def shutdown_password_hashing():
+    shutdown_password_pool()
+
+
+@app.on_event("shutdown")
+def close_credit_data_client():
+    credit_data_client.close()
+
+
 @app.get("/")
 async def root():
     return {"message": "TrustFlow Credit Platform API"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики процесса в формате Prometheus. Сборщики gauge ходят в БД - считаем в threadpool"""
+    return PlainTextResponse(await run_in_threadpool(registry.render), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/livez")
+async def liveness():
+    """Процесс жив и обслуживает event loop. Зависимости не проверяются"""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readiness_check():
+    """Готовность принимать трафик: БД, блокчейн, credit_data_service (с кешем на HEALTH_CHECK_TTL)"""
+    result = await readiness()
+    return JSONResponse(status_code=200 if result["ready"] else 503, content=result)
+
+
 @app.get("/health")
 async def health_check():
-    try:
-        with engine.connect() as conn:
-            # Проверяем существование таблицы users
-            result = conn.execute(
-                text("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'users');")
-            ).scalar()
-
-            if result:
-                # Пробуем получить количество пользователей
-                count = conn.execute(text("SELECT COUNT(*) FROM users;")).scalar()
-                return {
-                    "status": "healthy",
-                    "database": "connected",
-                    "users_table": "exists",
-                    "users_count": count
-                }
-            else:
-                return {
-                    "status": "unhealthy",
-                    "database": "connected",
-                    "users_table": "missing",
-                    "message": "Таблица users не найдена. Создайте таблицы через SQL скрипт."
-                }
-
-    except Exception as e:
+    result = await readiness()
+    database = result["checks"]["database"]
+    if database["status"] != "ok":
         return {
             "status": "unhealthy",
-            "error": str(e),
+            "error": database.get("error"),
             "message": "Ошибка подключения к базе данных"
         }
 
+    # Оценка по статистике планировщика вместо COUNT(*) по всей таблице
+    users = await users_estimate.get()
+    if users["status"] != "ok":
+        return {
+            "status": "unhealthy",
+            "database": "connected",
+            "users_table": "missing",
+            "message": "Таблица users не найдена. Создайте таблицы через SQL скрипт."
+        }
+
+    return {
+        "status": "healthy" if result["status"] == "ready" else result["status"],
+        "database": "connected",
+        "users_table": "exists",
+        "users_count": users["users_estimate"],
+        "checks": result["checks"]
+    }
+
 
 @app.get("/tables")
 async def get_tables():
@@ -1,17 +1,48 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from sqlalchemy.sql import func, text
 from ..database import Base
 
 
 class BlockchainRecord(Base):
     __tablename__ = "blockchain_records"
+    __table_args__ = (
+        # Keyset пагинация записей пользователя (services/pagination.py)
+        Index("ix_blockchain_records_user_created_id", "user_id", text("created_at DESC"), text("id DESC")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)
-    transaction_hash = Column(String, unique=True)
+    report_id = Column(Integer, index=True, nullable=True)  # CreditReport, хеш которого записан
+    transaction_hash = Column(String, index=True)  # Одна транзакция на пакет записей (корень Меркла)
     block_number = Column(Integer)
     contract_address = Column(String)
     data_hash = Column(String)  # Хеш данных для верификации
     data_type = Column(String)  # credit_report, user_consent, data_source
     transaction_data = Column(JSON)
+
+    # Пакетная запись через дерево Меркла
+    anchor_status = Column(String, default="pending", index=True)  # pending, submitting, anchored, failed
+    anchor_id = Column(Integer, index=True, nullable=True)  # MerkleAnchor
+    merkle_root = Column(String, nullable=True)
+    leaf_index = Column(Integer, nullable=True)
+    merkle_proof = Column(JSON, nullable=True)  # Путь от data_hash до merkle_root
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class MerkleAnchor(Base):
+    """Корень дерева Меркла, записанный в блокчейн одной транзакцией"""
+
+    __tablename__ = "merkle_anchors"
+
+    id = Column(Integer, primary_key=True, index=True)
+    merkle_root = Column(String, unique=True, nullable=False)
+    leaf_count = Column(Integer, nullable=False)
+    transaction_hash = Column(String)  # Последняя отправленная транзакция
+    block_number = Column(Integer)
+    contract_address = Column(String)
+    # submitting - пакет собран, транзакция отправляется; sent - ждем receipt; anchored; failed
+    status = Column(String, default="submitting", index=True)
+    attempts = Column(Integer, default=0, nullable=False)  # Отправки транзакции
+    submitted_at = Column(DateTime(timezone=True), nullable=True)  # Последняя попытка отправки
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Float, Integer, String, DateTime, Text, Boolean
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Float, Integer, String, DateTime, Text, Boolean, Index, JSON
+from sqlalchemy.sql import func, text
 from ..database import Base
 
 class CreditReport(Base):
     __tablename__ = "credit_reports"
+    __table_args__ = (
+        # Keyset пагинация истории (services/pagination.py)
+        Index("ix_credit_reports_user_created_id", "user_id", text("created_at DESC"), text("id DESC")),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, index=True, nullable=False)
@@ -14,6 +18,7 @@ class CreditReport(Base):
     blockchain_hash = Column(String, nullable=True)  # Хеш в блокчейне
     transaction_hash = Column(String, nullable=True)  # Транзакция в блокчейне
     block_number = Column(Integer, nullable=True)  # Номер блока
+    feature_snapshot_id = Column(Integer, nullable=True)  # UserFeatureSnapshot, по которому посчитан скор
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class ParserJob(Base):
@@ -30,10 +35,69 @@ class ParserJob(Base):
 
 
 class CreditRequest(Base):
+    """Запрос на расчет скора - одновременно задача в очереди воркеров (см. services/job_queue.py)"""
+
     __tablename__ = "credit_requests"
+    __table_args__ = (
+        Index("ix_credit_requests_status_available_at", "status", "available_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)
     status = Column(String, default="pending")  # pending, processing, completed, failed
     blockchain_recorded = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    payload = Column(Text)  # Параметры запроса (JSON)
+
+    # Очередь задач
+    attempts = Column(Integer, default=0, nullable=False)  # Сколько раз задачу брали в работу
+    available_at = Column(DateTime(timezone=True), server_default=func.now())  # Не брать раньше (ретраи)
+    locked_by = Column(String, nullable=True)  # Воркер, взявший задачу
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # Visibility timeout
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+class UserLatestScore(Base):
+    """Последний отчет пользователя: обновляется в той же транзакции, что и вставка CreditReport
+    (см. services/latest_scores.py), чтобы /score читался по первичному ключу без сортировки"""
+
+    __tablename__ = "user_latest_scores"
+
+    user_id = Column(Integer, primary_key=True)
+    report_id = Column(Integer, nullable=False)
+    score = Column(Integer)
+    score_category = Column(String)
+    reputation_score = Column(Float)
+    blockchain_hash = Column(String, nullable=True)
+    transaction_hash = Column(String, nullable=True)
+    block_number = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True))  # created_at отчета
+
+
+class UserFeatureSnapshot(Base):
+    """Версия финансовых признаков пользователя из credit_data_service (см. services/feature_store.py)"""
+
+    __tablename__ = "user_feature_snapshots"
+    __table_args__ = (
+        Index("ix_user_feature_snapshots_user_version", "user_id", "version", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)  # 1, 2, ... для каждого пользователя
+    features = Column(JSON, nullable=False)  # 12 признаков в формате credit_data_service
+    has_history = Column(Boolean)  # С каким has_credit_history запрошены признаки
+    source = Column(String, default="credit_data_service")
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RescoreCheckpoint(Base):
+    """Прогресс массового пересчета (rescore.py): пишется в транзакции вставки отчетов пачки"""
+
+    __tablename__ = "rescore_checkpoints"
+
+    name = Column(String, primary_key=True)  # Запуск пересчета, --checkpoint
+    last_user_id = Column(Integer, nullable=False, default=0)  # Последний записанный user_id
+    processed = Column(Integer, nullable=False, default=0)
+    saved_at = Column(DateTime(timezone=True))
\ No newline at end of file
@@ -16,6 +16,7 @@ class UploadedDocument(Base):
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)  # Путь к файлу на диске
     file_size = Column(Integer)  # Размер в байтах
+    sha256 = Column(String(64), index=True, nullable=True)  # Хеш содержимого, считается при загрузке
     mime_type = Column(String, default="application/pdf")
 
     # Тип документа
@@ -49,4 +50,25 @@ class UploadedDocument(Base):
     deleted_at = Column(DateTime(timezone=True), nullable=True)  # Мягкое удаление
 
     def __repr__(self):
-        return f"<UploadedDocument(id={self.id}, user_id={self.user_id}, filename='{self.filename}')>"
\ No newline at end of file
+        return f"<UploadedDocument(id={self.id}, user_id={self.user_id}, filename='{self.filename}')>"
+
+class DocumentBlob(Base):
+    """Содержимое загруженного файла по SHA-256 (см. services/blob_store.py).
+
+    Один файл на диске и один результат парсинга на любое число UploadedDocument
+    с тем же содержимым; ref_count - число таких документов.
+    """
+
+    __tablename__ = "document_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    path = Column(String, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+
+    # Результат парсинга содержимого - переиспользуется для повторных загрузок
+    parsed_data = Column(JSON, nullable=True)
+    extracted_text = Column(Text, nullable=True)
+    parsed_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
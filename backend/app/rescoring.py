@@ -0,0 +1,203 @@
+"""Массовый пересчет кредитных отчетов всех пользователей (python rescore.py).
+
+Пользователи читаются пачками по id (в Postgres - серверным курсором), признаки для пачки
+берутся из хранилища признаков (в credit_data_service - одним запросом за пользователями
+без сохраненного снимка), скоринг и сборка строк отчетов идут
+в пуле процессов, результат пишется пакетной вставкой. В той же транзакции, что и отчеты
+пачки, в rescore_checkpoints сохраняется последний обработанный id: прерванный запуск
+продолжается с него и не вставляет отчеты пачки повторно.
+"""
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+import json
+import logging
+import multiprocessing
+import time
+
+import numpy as np
+from sqlalchemy import insert, select, update
+
+from .config import settings
+from .database import SessionLocal, engine
+from .models.credit import CreditReport, RescoreCheckpoint
+from .models.user import User
+from .services.feature_store import feature_store
+from .services.latest_scores import latest_score_upsert_many
+from .services.scoring_engine import FEATURES, features_to_matrix, scoring_engine
+
+logger = logging.getLogger(__name__)
+
+
+def score_chunk(user_ids: List[int], snapshot_ids: List[int], X: np.ndarray, calculated_at: str) -> List[dict]:
+    """Выполняется в процессе пула: скоринг пачки и готовые строки credit_reports"""
+    result = scoring_engine.score_matrix(X)
+    contributions = np.round(result["contributions"], 1).tolist()
+    features = X.tolist()
+
+    rows = []
+    for i, (user_id, score, category, reputation_score) in enumerate(zip(
+            user_ids, result["score"].tolist(), result["category"].tolist(), result["reputation_score"].tolist()
+    )):
+        report_data = {
+            "user_id": user_id,
+            "score": score,
+            "category": category,
+            "calculated_at": calculated_at,
+            "factors": dict(zip(FEATURES, contributions[i])),
+            "features": dict(zip(FEATURES, features[i])),
+            "source": "rescoring"
+        }
+        rows.append({
+            "user_id": user_id,
+            "score": score,
+            "score_category": category,
+            "reputation_score": reputation_score,
+            "report_data": json.dumps(report_data),
+            "feature_snapshot_id": snapshot_ids[i]
+        })
+    return rows
+
+
+class Checkpoint:
+    """Последний записанный user_id запуска name (строка rescore_checkpoints)"""
+
+    def __init__(self, name: str = "rescore"):
+        self.name = name
+        self.last_user_id = 0
+        self.processed = 0
+        db = SessionLocal()
+        try:
+            row = db.get(RescoreCheckpoint, name)
+            if row is not None:
+                self.last_user_id = row.last_user_id
+                self.processed = row.processed
+        finally:
+            db.close()
+
+    def save(self, db, last_user_id: int, processed: int):
+        """Добавить прогресс в транзакцию db: коммитится вместе с отчетами пачки"""
+        db.merge(RescoreCheckpoint(
+            name=self.name, last_user_id=last_user_id, processed=processed, saved_at=datetime.utcnow()
+        ))
+        self.last_user_id = last_user_id
+        self.processed = processed
+
+    def reset(self):
+        db = SessionLocal()
+        try:
+            db.query(RescoreCheckpoint).filter(RescoreCheckpoint.name == self.name).delete()
+            db.commit()
+        finally:
+            db.close()
+        self.last_user_id = 0
+        self.processed = 0
+
+
+class Rescorer:
+    def __init__(
+            self,
+            checkpoint: Checkpoint,
+            chunk_size: int = settings.RESCORE_CHUNK_SIZE,
+            processes: int = settings.RESCORE_PROCESSES,
+            max_in_flight: Optional[int] = None,
+            refresh_features: bool = False
+    ):
+        self.checkpoint = checkpoint
+        self.chunk_size = chunk_size
+        self.processes = processes
+        # Пачек в пуле одновременно: процессы не простаивают, пока пишется предыдущая
+        self.max_in_flight = max_in_flight or processes * 2
+        # False - считаем по сохраненным снимкам признаков, True - обновляем устаревшие (старше FEATURE_TTL)
+        self.refresh_features = refresh_features
+        self.calculated_at = datetime.utcnow().isoformat()
+        self._initial = 0
+
+    def _stream_users(self, after_id: int) -> Iterator[Tuple[List[int], List[bool]]]:
+        query = select(User.id, User.has_credit_history).where(User.id > after_id).order_by(User.id)
+
+        if engine.dialect.name == "postgresql":
+            # Серверный курсор на отдельном соединении: в памяти только текущая пачка
+            with engine.connect() as conn:
+                result = conn.execution_options(stream_results=True, yield_per=self.chunk_size).execute(query)
+                for rows in result.partitions():
+                    yield [row.id for row in rows], [bool(row.has_credit_history) for row in rows]
+            return
+
+        # SQLite не дает писать, пока открыт читающий курсор - читаем пачками по id
+        while True:
+            with engine.connect() as conn:
+                rows = conn.execute(query.where(User.id > after_id).limit(self.chunk_size)).all()
+            if not rows:
+                return
+            after_id = rows[-1].id
+            yield [row.id for row in rows], [bool(row.has_credit_history) for row in rows]
+
+    def _fetch_features(self, user_ids: List[int], has_history: List[bool]) -> Tuple[List[int], np.ndarray]:
+        """Снимки признаков пачки: по умолчанию сохраненные (любого возраста),
+        в credit_data_service - только за пользователями без снимка"""
+        snapshots = feature_store.get_many(user_ids, has_history, fresh_only=self.refresh_features)
+        snapshot_ids = [snapshot_id for snapshot_id, _ in snapshots]
+        return snapshot_ids, features_to_matrix([features for _, features in snapshots])
+
+    def _write(self, rows: List[dict], last_user_id: int):
+        db = SessionLocal()
+        try:
+            report_ids = db.execute(
+                insert(CreditReport).returning(CreditReport.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            db.execute(*latest_score_upsert_many(db, [
+                {
+                    "user_id": row["user_id"],
+                    "report_id": report_id,
+                    "score": row["score"],
+                    "score_category": row["score_category"],
+                    "reputation_score": row["reputation_score"],
+                    "blockchain_hash": None,
+                    "transaction_hash": None,
+                    "block_number": None
+                }
+                for row, report_id in zip(rows, report_ids)
+            ]))
+            # Пакетный UPDATE по первичному ключу
+            db.execute(update(User), [{"id": row["user_id"], "reputation_score": row["reputation_score"]} for row in rows])
+            # Прогресс в той же транзакции: после сбоя пачка либо записана вместе с ним, либо не записана вовсе
+            self.checkpoint.save(db, last_user_id, self.checkpoint.processed + len(rows))
+            db.commit()
+        finally:
+            db.close()
+
+    def _drain(self, in_flight: "deque[Tuple[int, Future]]", started: float):
+        last_user_id, future = in_flight.popleft()
+        self._write(future.result(), last_user_id)
+        processed = self.checkpoint.processed
+
+        rate = (processed - self._initial) / max(time.perf_counter() - started, 1e-9)
+        logger.info(f"Пересчитано {processed} пользователей (до id {last_user_id}), {rate:.0f}/с")
+
+    def run(self):
+        started = time.perf_counter()
+        self._initial = self.checkpoint.processed
+        logger.info(
+            f"Пересчет скоров: с user_id > {self.checkpoint.last_user_id}, пачка {self.chunk_size}, "
+            f"процессов {self.processes}"
+        )
+
+        in_flight: "deque[Tuple[int, Future]]" = deque()
+        # spawn: дочерние процессы не наследуют соединения с БД и потоки родителя
+        with ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for user_ids, has_history in self._stream_users(self.checkpoint.last_user_id):
+                snapshot_ids, X = self._fetch_features(user_ids, has_history)
+                in_flight.append((user_ids[-1], pool.submit(score_chunk, user_ids, snapshot_ids, X, self.calculated_at)))
+                # Пачки пишутся по порядку, поэтому checkpoint никогда не перескакивает незаписанные id
+                while len(in_flight) >= self.max_in_flight:
+                    self._drain(in_flight, started)
+
+            while in_flight:
+                self._drain(in_flight, started)
+
+        elapsed = time.perf_counter() - started
+        total = self.checkpoint.processed - self._initial
+        logger.info(f"Пересчет завершен: {total} пользователей за {elapsed:.1f} с ({total / max(elapsed, 1e-9):.0f}/с)")
+        return total
@@ -1,33 +1,41 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from ..database import get_db, Base
+from ..database import get_async_db, Base
 from ..config import settings
 from ..models.user import User, UserProfile
 from ..schemas.user import UserCreate, UserLogin, Token, UserResponse
-from ..auth.security import get_password_hash, verify_password, create_access_token, get_current_user
-from ..services.blockchain_service import BlockchainService
+from ..auth.security import (
+    hash_password_async, verify_and_update_password_async, create_access_token, get_current_user, invalidate_cached_user
+)
+from ..services.blockchain_service import BlockchainService, get_blockchain_service
 router = APIRouter()
 
 
 @router.post("/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(
+        user_data: UserCreate,
+        db: AsyncSession = Depends(get_async_db),
+        blockchain_service: BlockchainService = Depends(get_blockchain_service)
+):
     # Проверяем, существует ли пользователь
-    db_user = db.query(User).filter(User.email == user_data.email).first()
+    db_user = (await db.execute(select(User).where(User.email == user_data.email))).scalars().first()
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     if user_data.phone:
-        phone_user = db.query(User).filter(User.phone == user_data.phone).first()
+        phone_user = (await db.execute(select(User).where(User.phone == user_data.phone))).scalars().first()
         if phone_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Номер телефона уже зарегистрирован"
             )
-    # Создаем пользователя
-    hashed_password = get_password_hash(user_data.password)
+    # Создаем пользователя (argon2 считается в пуле процессов, см. auth/passwords.py)
+    hashed_password = await hash_password_async(user_data.password)
     user = User(
         email=user_data.email,
         password_hash=hashed_password,
@@ -39,13 +47,13 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     # Создаем профиль на блокчейне (НОВОЕ ↓)
     if user.wallet_address:
-        blockchain_service = BlockchainService()
-        tx_hash = blockchain_service.create_user_profile(
+        tx_hash = await run_in_threadpool(
+            blockchain_service.create_user_profile,
             user_id=user.id,
             email=user.email,
             wallet_address=user.wallet_address
@@ -53,25 +61,35 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
         if tx_hash:
             user.blockchain_user_id = tx_hash
-            db.commit()
+            await db.commit()
+            invalidate_cached_user(user.id)
 
     # Создаем пустой профиль
     profile = UserProfile(user_id=user.id)
     db.add(profile)
-    db.commit()
+    await db.commit()
 
     return user
 
 
 @router.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_data.email).first()
-    if not user or not verify_password(user_data.password, user.password_hash):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).where(User.email == user_data.email))).scalars().first()
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_and_update_password_async(user_data.password, user.password_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
 
+    if new_hash:
+        # Хеш с устаревшими параметрами argon2 - заменяем на хеш с текущими
+        user.password_hash = new_hash
+        await db.commit()
+        invalidate_cached_user(user.id)  # updated_at изменился
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1,18 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi import UploadFile, File, Form
-from sqlalchemy.orm import Session
-from ..database import get_db
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
+from ..database import get_db, get_async_db
 from ..models.user import User
 from ..models.blockchain import BlockchainRecord
-from ..models.credit import CreditReport, ParserJob, CreditRequest
-from ..models.uploaded_document import UploadedDocument
-from ..schemas.credit import (CreditScoreRequest, CreditScoreResponse, CreditRequestResponse, CreditMethodRequest, ParsingResult, MLScoreRequest, MLScoreResponse)
-from ..auth.security import get_current_user
+from ..models.credit import CreditReport, ParserJob, CreditRequest, UserFeatureSnapshot
+from ..models.uploaded_document import DocumentBlob, UploadedDocument
+from ..schemas.credit import (CreditScoreRequest, CreditScoreResponse, CreditRequestResponse, CreditMethodRequest, ParsingResult, MLScoreRequest, MLScoreResponse,
+                              CreditHistoryPage, BlockchainRecordsPage, MLScoreBatchRequest, MLScoreBatchResponse)
+from ..auth.security import get_current_user, invalidate_cached_user, verify_parser_callback
 from ..config import settings
-from ..services.blockchain_service import blockchain_service
+from ..services.blockchain_service import BlockchainService, get_blockchain_service, rating_version
+from ..services.anchoring import anchor_record_values, enqueue_anchor, generate_blockchain_hash
+from ..services.verification import verify_report_proof
+from ..services.pagination import paginate
+from ..services.blob_store import blob_store
+from ..services.uploads import UploadTooLarge
+from ..services.scoring_engine import scoring_engine
+from ..services.latest_scores import (get_latest_score, get_latest_score_async, latest_score_upsert, latest_score_upsert_many,
+                                     latest_score_cache)
 from datetime import datetime
+from typing import Optional
 import os
-import shutil
 import random
 import hashlib
 import json
@@ -24,40 +36,6 @@ router = APIRouter()
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
 
-# Заглушка для ML модели
-def calculate_mock_score(user_data: dict) -> dict:
-    """Мок расчет кредитного скора"""
-    base_score = random.randint(300, 850)
-
-    if base_score >= 720:
-        category = "excellent"
-    elif base_score >= 680:
-        category = "good"
-    elif base_score >= 620:
-        category = "fair"
-    elif base_score >= 580:
-        category = "poor"
-    else:
-        category = "bad"
-
-    return {
-        "score": base_score,
-        "category": category,
-        "reputation_score": base_score / 850,
-        "factors": {
-            "payment_history": random.choice(["excellent", "good", "fair", "poor"]),
-            "credit_utilization": random.randint(10, 80),
-            "credit_age": random.randint(1, 20)
-        }
-    }
-
-
-def generate_blockchain_hash(data: dict) -> str:
-    """Генерация хеша для блокчейна"""
-    data_str = json.dumps(data, sort_keys=True)
-    return hashlib.sha256(data_str.encode()).hexdigest()
-
-
 def mock_blockchain_transaction(data_hash: str, user_id: int) -> dict:
     """Мок транзакции в блокчейне"""
     # В реальности здесь будет вызов web3.eth.send_transaction()
@@ -71,29 +49,22 @@ def mock_blockchain_transaction(data_hash: str, user_id: int) -> dict:
 @router.post("/request", response_model=CreditRequestResponse)
 def request_credit_score(
         request_data: CreditScoreRequest,
-        background_tasks: BackgroundTasks,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
     """Запрос расчета кредитного скора"""
 
+    # Запрос сохраняется в очередь, расчет выполняют процессы воркеров (worker.py)
     credit_request = CreditRequest(
         user_id=current_user.id,
-        status="processing",
-        blockchain_recorded=request_data.use_blockchain
+        status="pending",
+        blockchain_recorded=request_data.use_blockchain,
+        payload=json.dumps(request_data.dict())
     )
     db.add(credit_request)
     db.commit()
     db.refresh(credit_request)
 
-    background_tasks.add_task(
-        process_credit_score_background,
-        credit_request.id,
-        current_user.id,
-        request_data.dict(),
-        db
-    )
-
     return credit_request
 
 
@@ -104,9 +75,8 @@ def get_credit_score(
 ):
     """Получение последнего кредитного отчета"""
 
-    report = db.query(CreditReport).filter(
-        CreditReport.user_id == current_user.id
-    ).order_by(CreditReport.created_at.desc()).first()
+    # Read model user_latest_scores + кеш вместо сортировки credit_reports
+    report = get_latest_score(db, current_user.id)
 
     if not report:
         raise HTTPException(status_code=404, detail="Кредитный отчет не найден")
@@ -133,46 +103,115 @@ def get_score_by_id(
     return report
 
 
-@router.get("/history")
-def get_credit_history(
+@router.get("/score/{report_id}/explain")
+def explain_score(
+        report_id: int,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
-    """История всех отчетов"""
+    """Объяснение скора: признаки из снимка, по которому считался отчет, и вклад каждого признака.
+    Считается текущей моделью по сохраненным признакам, без запроса в credit_data_service"""
 
-    reports = db.query(CreditReport).filter(
+    report = db.query(CreditReport).options(load_only(
+        CreditReport.id, CreditReport.score, CreditReport.feature_snapshot_id, CreditReport.created_at
+    )).filter(
+        CreditReport.id == report_id,
         CreditReport.user_id == current_user.id
-    ).order_by(CreditReport.created_at.desc()).all()
+    ).first()
+
+    if not report:
+        raise HTTPException(status_code=404, detail="Отчет не найден")
+
+    snapshot = db.get(UserFeatureSnapshot, report.feature_snapshot_id) if report.feature_snapshot_id else None
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Для отчета не сохранен снимок признаков")
+
+    explanation = scoring_engine.score_features(snapshot.features)
+    return {
+        "report_id": report.id,
+        "score": report.score,
+        "current_model_score": explanation["score"],
+        "category": explanation["category"],
+        "factors": explanation["factors"],
+        "features": snapshot.features,
+        "feature_snapshot": {
+            "id": snapshot.id,
+            "version": snapshot.version,
+            "fetched_at": snapshot.fetched_at
+        }
+    }
 
-    return reports
 
+@router.get("/history", response_model=CreditHistoryPage)
+def get_credit_history(
+        cursor: Optional[str] = None,
+        limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """История отчетов постранично, от новых к старым. Следующая страница - ?cursor=next_cursor"""
 
-@router.get("/blockchain-records")
+    # report_data не выбираем: полный отчет отдается по одному (/score, /verify-on-blockchain)
+    query = db.query(CreditReport).options(load_only(
+        CreditReport.id, CreditReport.score, CreditReport.score_category, CreditReport.reputation_score,
+        CreditReport.blockchain_hash, CreditReport.transaction_hash, CreditReport.block_number,
+        CreditReport.created_at
+    )).filter(CreditReport.user_id == current_user.id)
+
+    try:
+        reports, next_cursor = paginate(query, CreditReport, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"items": reports, "next_cursor": next_cursor}
+
+
+@router.get("/blockchain-records", response_model=BlockchainRecordsPage)
 def get_blockchain_records(
+        cursor: Optional[str] = None,
+        limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
-    """Получение записей в блокчейне (будущая функциональность)"""
+    """Записи в блокчейне постранично, от новых к старым"""
+
+    # transaction_data и merkle_proof в списке не нужны
+    query = db.query(BlockchainRecord).options(load_only(
+        BlockchainRecord.id, BlockchainRecord.report_id, BlockchainRecord.transaction_hash,
+        BlockchainRecord.block_number, BlockchainRecord.contract_address, BlockchainRecord.data_hash,
+        BlockchainRecord.data_type, BlockchainRecord.anchor_status, BlockchainRecord.merkle_root,
+        BlockchainRecord.created_at
+    )).filter(BlockchainRecord.user_id == current_user.id)
 
-    records = db.query(BlockchainRecord).filter(
-        BlockchainRecord.user_id == current_user.id
-    ).order_by(BlockchainRecord.created_at.desc()).all()
+    try:
+        records, next_cursor = paginate(query, BlockchainRecord, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
         "user_id": current_user.id,
         "wallet_address": current_user.wallet_address,
         "records": records,
-        "count": len(records)
+        "count": len(records),
+        "next_cursor": next_cursor
     }
 
 
 @router.post("/verify-on-blockchain/{report_id}")
 def verify_on_blockchain(
         report_id: int,
+        mode: str = "proof",
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        blockchain_service: BlockchainService = Depends(get_blockchain_service)
 ):
-    """Верификация отчета в блокчейне"""
+    """Верификация отчета в блокчейне.
+
+    mode=proof - локально по proof Меркла и закешированному корню (по умолчанию),
+    mode=rpc - запрос к контракту на каждый вызов.
+    """
+    if mode not in ("proof", "rpc"):
+        raise HTTPException(status_code=400, detail="mode должен быть proof или rpc")
 
     report = db.query(CreditReport).filter(
         CreditReport.id == report_id,
@@ -185,11 +224,16 @@ def verify_on_blockchain(
     if not report.blockchain_hash:
         raise HTTPException(status_code=400, detail="Отчет не записан в блокчейн")
 
-    # Используем blockchain_service вместо мок верификации
-    verification = blockchain_service.verify_data_hash(
-        report.blockchain_hash,
-        report.user_id
-    )
+    if mode == "proof":
+        record = db.query(BlockchainRecord).filter(
+            BlockchainRecord.report_id == report.id
+        ).order_by(BlockchainRecord.id.desc()).first()
+        verification = verify_report_proof(report, record)
+    else:
+        verification = blockchain_service.verify_data_hash(
+            report.blockchain_hash,
+            report.user_id
+        )
 
     verification_data = {
         "report_id": report.id,
@@ -205,127 +249,23 @@ def verify_on_blockchain(
     return verification_data
 
 
-def process_credit_score_background(request_id: int, user_id: int, request_data: dict, db: Session):
-    """Фоновая задача расчета скора"""
-    try:
-        request = db.query(CreditScoreRequest).filter(CreditScoreRequest.id == request_id).first()
-        user = db.query(User).filter(User.id == user_id).first()
-
-        if not request or not user:
-            return
-
-        # Мок расчет
-        score_data = calculate_mock_score({})
-
-        # Подготовка данных для хеширования
-        report_data = {
-            "user_id": user_id,
-            "score": score_data["score"],
-            "category": score_data["category"],
-            "calculated_at": datetime.utcnow().isoformat(),
-            "factors": score_data["factors"]
-        }
-
-        blockchain_hash = None
-        transaction_hash = None
-        block_number = None
-
-        # Запись в блокчейн если требуется
-        if request_data.get("use_blockchain", False) and user.wallet_address:
-            try:
-                # Генерируем хеш данных
-                data_hash = generate_blockchain_hash(report_data)
-
-                # Используем blockchain_service вместо мок
-                tx_hash = blockchain_service.update_credit_score(
-                    user_id=user_id,
-                    score=score_data["score"],
-                    data_hash=data_hash
-                )
-                if tx_hash:
-                    blockchain_hash = data_hash
-                    transaction_hash = tx_hash
-                    block_number = random.randint(1000000, 2000000)  # Мок номер блока
-
-                    # Сохраняем запись о блокчейн-транзакции
-                    blockchain_record = BlockchainRecord(
-                        user_id=user_id,
-                        transaction_hash=transaction_hash,
-                        block_number=block_number,
-                        contract_address=settings.CONTRACT_ADDRESS or "0x0000000000000000000000000000000000000000",
-                        data_hash=data_hash,
-                        data_type="credit_report",
-                        transaction_data=report_data
-                    )
-                    db.add(blockchain_record)
-                    request.blockchain_recorded = True
-
-            except Exception as e:
-                print(f"Ошибка блокчейн-записи: {e}")
-
-            #     blockchain_hash = data_hash
-            #     transaction_hash = tx_result["transaction_hash"]
-            #     block_number = tx_result["block_number"]
-            #
-            #     # Сохраняем запись о блокчейн-транзакции
-            #     blockchain_record = BlockchainRecord(
-            #         user_id=user_id,
-            #         transaction_type="credit_report",
-            #         transaction_hash=transaction_hash,
-            #         block_number=block_number,
-            #         contract_address=settings.CONTRACT_ADDRESS or "0x0000000000000000000000000000000000000000",
-            #         data_hash=data_hash,
-            #         confirmed=True
-            #     )
-            #     db.add(blockchain_record)
-            #
-            #     request.blockchain_recorded = True
-            #
-            # except Exception as e:
-            #     print(f"Ошибка блокчейн-записи: {e}")
-            #     # Продолжаем без блокчейна
-
-        # Создаем отчет
-        report = CreditReport(
-            user_id=user_id,
-            score=score_data["score"],
-            score_category=score_data["category"],
-            reputation_score=score_data["reputation_score"],
-            report_data=json.dumps(report_data),
-            blockchain_hash=blockchain_hash,
-            transaction_hash=transaction_hash,
-            block_number=block_number
-        )
-        db.add(report)
-
-        # Обновляем репутационный счет пользователя
-        user.reputation_score = score_data["reputation_score"]
-
-        # Завершаем запрос
-        request.status = "completed"
-        db.commit()
-
-    except Exception as e:
-        request = db.query(CreditScoreRequest).filter(CreditScoreRequest.id == request_id).first()
-        request.status = "failed"
-        db.commit()
-        print(f"Ошибка расчета скора: {e}")
-
 #Новые методы
 
 @router.post("/choose-method")
 async def choose_credit_method(
         method_data: CreditMethodRequest,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Выбор метода определения кредитной истории"""
 
     # Обновляем данные пользователя
+    values = {"consent_data_processing": method_data.consent_data_processing}
     if method_data.has_credit_history is not None:
-        current_user.has_credit_history = method_data.has_credit_history
-    current_user.consent_data_processing = method_data.consent_data_processing
-    db.commit()
+        values["has_credit_history"] = method_data.has_credit_history
+    await db.execute(update(User).where(User.id == current_user.id).values(**values))
+    await db.commit()
+    invalidate_cached_user(current_user.id)
 
     return {
         "message": "Метод выбран",
@@ -339,7 +279,7 @@ async def upload_document(
         file: UploadFile = File(...),
         document_type: str = Form("gosuslugi"),
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Загрузка документа (PDF)"""
 
@@ -348,27 +288,44 @@ async def upload_document(
     if not filename.lower().endswith('.pdf'):
         raise HTTPException(400, "Только PDF файлы поддерживаются")
 
-    # Сохраняем файл
-    file_path = os.path.join(settings.UPLOAD_DIR, f"{current_user.id}_{int(datetime.now().timestamp())}_{filename}")
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Сохраняем файл по хешу содержимого: одинаковые файлы хранятся один раз
+    try:
+        sha256, file_size, file_path, staging_path = await blob_store.put(file)
+    except UploadTooLarge as e:
+        raise HTTPException(413, f"Файл больше {e.max_size // (1024 * 1024)} МБ")
 
     # Сохраняем запись в БД
     document = UploadedDocument(
         user_id=current_user.id,
         filename=filename,
         file_path=file_path,
+        file_size=file_size,
+        sha256=sha256,
         document_type=document_type
     )
-    db.add(document)
-    db.commit()
-    db.refresh(document)
+    try:
+        blob = await blob_store.acquire(db, sha256, file_size, file_path, staging_path)
+        if blob.parsed_data is not None:
+            # Это содержимое уже парсилось - результат переиспользуется
+            document.parsed_data = blob.parsed_data
+            document.extracted_text = blob.extracted_text
+            document.is_parsed = True
+            document.status = "completed"
+        db.add(document)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        # Файл без ссылок после неудачной транзакции никто не удалит
+        await blob_store.discard(db, sha256, file_size, file_path, staging_path)
+        raise
 
     return {
         "message": "Файл загружен",
         "document_id": document.id,
         "filename": filename,
+        "file_size": file_size,
+        "sha256": sha256,
+        "is_parsed": bool(document.is_parsed),
         "next_step": f"/api/credit/process-document/{document.id}"
     }
 
@@ -376,7 +333,7 @@ async def upload_document(
 @router.post("/process-parsing")
 async def process_parsing_method(
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Обработка метода парсинга (вызов внешнего сервиса)"""
 
@@ -390,8 +347,7 @@ async def process_parsing_method(
         data_sources="external_parsing_service"
     )
     db.add(parser_job)
-    db.commit()
-    db.refresh(parser_job)
+    await db.commit()
 
     # Здесь будет вызов внешнего сервиса парсинга
     # Пока возвращаем мок ответ
@@ -408,18 +364,40 @@ async def process_parsing_method(
 async def process_uploaded_document(
         document_id: int,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Обработка загруженного документа (вызов внешнего парсера)"""
 
-    document = db.query(UploadedDocument).filter(
-        UploadedDocument.id == document_id,
-        UploadedDocument.user_id == current_user.id
-    ).first()
+    document = (await db.execute(
+        select(UploadedDocument).where(
+            UploadedDocument.id == document_id,
+            UploadedDocument.user_id == current_user.id,
+            UploadedDocument.deleted_at.is_(None)
+        )
+    )).scalars().first()
 
     if not document:
         raise HTTPException(404, "Документ не найден")
 
+    if not document.is_parsed and document.sha256:
+        blob = await blob_store.get(db, document.sha256)
+        if blob is not None and blob.parsed_data is not None:
+            document.parsed_data = blob.parsed_data
+            document.extracted_text = blob.extracted_text
+            document.is_parsed = True
+            document.status = "completed"
+            await db.commit()
+
+    if document.is_parsed:
+        # Повторный парсинг того же содержимого не нужен
+        return {
+            "job_id": None,
+            "document_id": document_id,
+            "status": "completed",
+            "message": "Документ уже обработан",
+            "parsed_data": document.parsed_data
+        }
+
     # Создаем задачу обработки
     parser_job = ParserJob(
         user_id=current_user.id,
@@ -428,8 +406,7 @@ async def process_uploaded_document(
         result_data=json.dumps({"document_id": document_id})
     )
     db.add(parser_job)
-    db.commit()
-    db.refresh(parser_job)
+    await db.commit()
 
     return {
         "job_id": parser_job.id,
@@ -440,16 +417,92 @@ async def process_uploaded_document(
     }
 
 
+@router.delete("/document/{document_id}")
+async def delete_uploaded_document(
+        document_id: int,
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Удаление документа (мягкое): ссылка на файл снимается, файл удалит sweep_blobs.py"""
+
+    document = (await db.execute(
+        select(UploadedDocument).where(
+            UploadedDocument.id == document_id,
+            UploadedDocument.user_id == current_user.id,
+            UploadedDocument.deleted_at.is_(None)
+        )
+    )).scalars().first()
+
+    if not document:
+        raise HTTPException(404, "Документ не найден")
+
+    document.deleted_at = datetime.utcnow()
+    if document.sha256:
+        await blob_store.release(db, document.sha256)
+    await db.commit()
+
+    return {"document_id": document.id, "deleted": True}
+
+
+@router.post("/document-result/{job_id}", dependencies=[Depends(verify_parser_callback)])
+async def receive_document_result(
+        job_id: int,
+        result: ParsingResult,
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Результат парсинга документа от внешнего парсера (заголовок X-Parser-Secret).
+
+    Сохраняется и в документ, и в document_blobs по хешу содержимого:
+    тот же файл, загруженный повторно, парсить уже не нужно.
+    """
+    parser_job = await db.get(ParserJob, job_id)
+    if parser_job is None or parser_job.data_sources != "document_parsing":
+        raise HTTPException(404, "Задача не найдена")
+
+    document_id = json.loads(parser_job.result_data or "{}").get("document_id")
+    document = await db.get(UploadedDocument, document_id) if document_id else None
+    if document is None:
+        raise HTTPException(404, "Документ не найден")
+
+    now = datetime.utcnow()
+    parser_job.completed_at = now
+    if not result.success:
+        parser_job.status = "failed"
+        parser_job.error_message = result.message
+        document.parsing_error = result.message
+        document.status = "failed"
+        await db.commit()
+        return {"job_id": job_id, "document_id": document.id, "status": "failed"}
+
+    extracted_text = result.data.get("text")
+    parser_job.status = "completed"
+    parser_job.result_data = json.dumps({"document_id": document.id, "data": result.data})
+    document.parsed_data = result.data
+    document.extracted_text = extracted_text
+    document.is_parsed = True
+    document.parsing_error = None
+    document.status = "completed"
+
+    if document.sha256:
+        await db.execute(
+            update(DocumentBlob)
+            .where(DocumentBlob.sha256 == document.sha256)
+            .values(parsed_data=result.data, extracted_text=extracted_text, parsed_at=now)
+        )
+    await db.commit()
+
+    return {"job_id": job_id, "document_id": document.id, "status": "completed"}
+
+
 @router.post("/receive-ml-score")
 async def receive_ml_score(
         ml_data: MLScoreRequest,
-        db: Session = Depends(get_db),
-        background_tasks: BackgroundTasks = None
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Получение результата от ML модели (вызывается внешним сервисом)"""
 
     # Проверяем пользователя
-    user = db.query(User).filter(User.id == ml_data.user_id).first()
+    user = await db.get(User, ml_data.user_id)
     if not user:
         raise HTTPException(404, "Пользователь не найден")
 
@@ -457,30 +510,26 @@ async def receive_ml_score(
     score_category = determine_category(ml_data.score)
 
     # Сохраняем результат ML модели
+    report_data = ml_data.dict()
     credit_report = CreditReport(
         user_id=ml_data.user_id,
         score=ml_data.score,
         score_category=score_category,
         reputation_score=ml_data.score / 850.0,
-        report_data=json.dumps(ml_data.dict())
+        report_data=json.dumps(report_data)
     )
 
     if ml_data.document_id:
         credit_report.source_document_id = ml_data.document_id
 
     db.add(credit_report)
-    db.commit()
-    db.refresh(credit_report)
-
-    # Запускаем фоновую задачу для записи в блокчейн
-    if background_tasks:
-        background_tasks.add_task(
-            save_to_blockchain_task,
-            credit_report.id,
-            ml_data.user_id,
-            ml_data.score,
-            db
-        )
+    await db.flush()
+
+    # Хеш отчета попадет в блокчейн с ближайшим пакетом (одна транзакция на пакет)
+    enqueue_anchor(db, credit_report, generate_blockchain_hash(report_data), report_data)
+    await db.execute(latest_score_upsert(db, credit_report))
+    await db.commit()
+    latest_score_cache.invalidate(ml_data.user_id)
 
     return {
         "report_id": credit_report.id,
@@ -491,30 +540,106 @@ async def receive_ml_score(
     }
 
 
+@router.post("/receive-ml-score/batch", response_model=MLScoreBatchResponse)
+async def receive_ml_score_batch(
+        batch: MLScoreBatchRequest,
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Пакетный прием результатов ML модели: одна транзакция на пакет, результат по каждому элементу"""
+
+    if len(batch.items) > settings.ML_INGEST_MAX_BATCH:
+        raise HTTPException(413, f"Не больше {settings.ML_INGEST_MAX_BATCH} элементов в пакете")
+    if not batch.items:
+        return {"created": 0, "failed": 0, "results": []}
+
+    # Все пользователи пакета одним запросом
+    user_ids = {item.user_id for item in batch.items}
+    existing = set((await db.execute(select(User.id).where(User.id.in_(user_ids)))).scalars().all())
+
+    results = []
+    accepted = []
+    rows = []
+    for index, item in enumerate(batch.items):
+        if item.user_id not in existing:
+            results.append({"index": index, "user_id": item.user_id, "status": "error", "error": "Пользователь не найден"})
+            continue
+
+        report_data = item.dict()
+        rows.append({
+            "user_id": item.user_id,
+            "score": item.score,
+            "score_category": determine_category(item.score),
+            "reputation_score": item.score / 850.0,
+            "report_data": json.dumps(report_data),
+            "blockchain_hash": generate_blockchain_hash(report_data)
+        })
+        accepted.append((index, report_data))
+
+    if rows:
+        # Пакетная вставка с RETURNING: id в порядке rows
+        report_ids = (await db.execute(
+            insert(CreditReport).returning(CreditReport.id, sort_by_parameter_order=True), rows
+        )).scalars().all()
+
+        # Хеши всего пакета встают в очередь на запись в блокчейн (services/anchoring.py)
+        await db.execute(insert(BlockchainRecord), [
+            anchor_record_values(row["user_id"], report_id, row["blockchain_hash"], report_data)
+            for row, report_id, (_, report_data) in zip(rows, report_ids, accepted)
+        ])
+        await db.execute(*latest_score_upsert_many(db, [
+            {
+                "user_id": row["user_id"],
+                "report_id": report_id,
+                "score": row["score"],
+                "score_category": row["score_category"],
+                "reputation_score": row["reputation_score"],
+                "blockchain_hash": row["blockchain_hash"],
+                "transaction_hash": None,
+                "block_number": None
+            }
+            for row, report_id in zip(rows, report_ids)
+        ]))
+        await db.commit()
+        latest_score_cache.invalidate_many(row["user_id"] for row in rows)
+
+        for row, report_id, (index, _) in zip(rows, report_ids, accepted):
+            results.append({
+                "index": index,
+                "user_id": row["user_id"],
+                "status": "created",
+                "report_id": report_id,
+                "score_category": row["score_category"]
+            })
+        results.sort(key=lambda result: result["index"])
+
+    return {"created": len(rows), "failed": len(batch.items) - len(rows), "results": results}
+
+
 @router.get("/blockchain-rating")
 async def get_blockchain_rating(
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db),
+        blockchain_service: BlockchainService = Depends(get_blockchain_service)
 ):
     """Получение рейтинга с блокчейна"""
 
-    # Получаем рейтинг из блокчейна
-    blockchain_rating = blockchain_service.get_user_rating(current_user.id)
+    # Получаем локальный рейтинг: его версия сбрасывает кеш рейтинга после новой оценки воркером
+    local_report = await get_latest_score_async(db, current_user.id)
 
-    # Получаем локальный рейтинг
-    local_report = db.query(CreditReport).filter(
-        CreditReport.user_id == current_user.id
-    ).order_by(CreditReport.created_at.desc()).first()
+    # Получаем рейтинг из блокчейна (RPC синхронный - уводим из event loop)
+    blockchain_rating = await run_in_threadpool(
+        blockchain_service.get_user_rating, current_user.id, rating_version(local_report)
+    )
 
     # Получаем информацию о сети
-    network_info = blockchain_service.get_network_info()
+    network_info = await run_in_threadpool(blockchain_service.get_network_info)
 
     return {
         "user_id": current_user.id,
         "full_name": current_user.full_name,
         "blockchain_rating": blockchain_rating,
-        "local_score": local_report.score if local_report else None,
-        "local_category": local_report.score_category if local_report else None,
+        "local_score": local_report["score"] if local_report else None,
+        "local_category": local_report["score_category"] if local_report else None,
         "blockchain_info": network_info,
         "timestamp": datetime.utcnow().isoformat()
     }
@@ -522,32 +647,6 @@ async def get_blockchain_rating(
 
 # ============ ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ============
 
-async def save_to_blockchain_task(report_id: int, user_id: int, score: int, db: Session):
-    """Фоновая задача сохранения рейтинга в блокчейн"""
-    try:
-        # Генерируем хеш данных
-        data_str = f"{user_id}{score}{datetime.utcnow().timestamp()}"
-        data_hash = hashlib.sha256(data_str.encode()).hexdigest()
-
-        # Записываем в блокчейн
-        tx_hash = blockchain_service.update_credit_score(
-            user_id=user_id,
-            score=score,
-            data_hash=data_hash
-        )
-
-        if tx_hash:
-            # Обновляем запись в БД
-            report = db.query(CreditReport).filter(CreditReport.id == report_id).first()
-            if report:
-                report.blockchain_hash = data_hash
-                report.transaction_hash = tx_hash
-                db.commit()
-
-    except Exception as e:
-        print(f"Ошибка записи в блокчейн: {e}")
-
-
 def determine_category(score: int) -> str:
     """Определение категории по score"""
     if score >= 720:
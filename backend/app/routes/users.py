@@ -3,8 +3,9 @@ from sqlalchemy.orm import Session
 from ..database import get_db
 from ..models.user import User, UserProfile
 from ..schemas.user import UserResponse, ProfileBase, ProfileResponse
-from ..auth.security import get_current_user
-from ..services.blockchain_service import BlockchainService
+from ..auth.security import get_current_user, invalidate_cached_user
+from ..services.blockchain_service import BlockchainService, get_blockchain_service, rating_version
+from ..services.latest_scores import get_latest_score
 
 router = APIRouter()
 
@@ -17,12 +18,15 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
 @router.get("/me/with-rating")
 def get_user_with_rating(
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        blockchain_service: BlockchainService = Depends(get_blockchain_service)
 ):
     """Получение данных пользователя с рейтингом из блокчейна"""
 
-    blockchain_service = BlockchainService()
-    blockchain_rating = blockchain_service.get_user_rating(current_user.id)
+    # Версия последнего отчета - та же запись кеша рейтингов, что и у /blockchain-rating
+    blockchain_rating = blockchain_service.get_user_rating(
+        current_user.id, rating_version(get_latest_score(db, current_user.id))
+    )
 
     return {
         "user": current_user,
@@ -57,5 +61,6 @@ def update_user_profile(
             setattr(profile, field, value)
 
     db.commit()
+    invalidate_cached_user(current_user.id)
     db.refresh(profile)
     return profile
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class CreditMethodRequest(BaseModel):
     method: str  # 'parsing' или 'upload'
@@ -14,10 +14,27 @@ class ParsingResult(BaseModel):
 
 class MLScoreRequest(BaseModel):
     user_id: int
+    score: int
     source: str  # 'parsing' или 'document'
     data: Dict[str, Any]
     document_id: Optional[int] = None
 
+class MLScoreBatchRequest(BaseModel):
+    items: List[MLScoreRequest]
+
+class MLScoreBatchItemResult(BaseModel):
+    index: int  # Позиция в items запроса
+    user_id: int
+    status: str  # created, error
+    report_id: Optional[int] = None
+    score_category: Optional[str] = None
+    error: Optional[str] = None
+
+class MLScoreBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[MLScoreBatchItemResult]
+
 class MLScoreResponse(BaseModel):
     score: int
     score_category: str
@@ -42,6 +59,32 @@ class CreditScoreResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class CreditHistoryPage(BaseModel):
+    items: List[CreditScoreResponse]
+    next_cursor: Optional[str] = None  # None - это последняя страница
+
+class BlockchainRecordItem(BaseModel):
+    id: int
+    report_id: Optional[int] = None
+    transaction_hash: Optional[str] = None
+    block_number: Optional[int] = None
+    contract_address: Optional[str] = None
+    data_hash: Optional[str] = None
+    data_type: Optional[str] = None
+    anchor_status: Optional[str] = None
+    merkle_root: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class BlockchainRecordsPage(BaseModel):
+    user_id: int
+    wallet_address: Optional[str] = None
+    records: List[BlockchainRecordItem]
+    count: int
+    next_cursor: Optional[str] = None
+
 class ParserJobResponse(BaseModel):
     id: int
     status: str
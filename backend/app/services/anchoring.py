@@ -0,0 +1,235 @@
+"""Пакетная запись хешей кредитных отчетов в блокчейн.
+
+Отчет не пишется в блокчейн сразу: для него создается BlockchainRecord в статусе pending.
+Anchorer собирает pending записи по размеру пакета или по временному окну, строит дерево
+Меркла и отправляет в блокчейн только корень - одна транзакция на весь пакет.
+Каждой записи сохраняется proof, по которому ее можно проверить против корня.
+
+Пакет проходит статусы MerkleAnchor: submitting (записи забраны, корень сохранен) ->
+sent (хеш транзакции сохранен) -> anchored. Транзакция отправляется вне транзакции БД,
+receipt не ожидается: check_submitted на следующих итерациях проверяет сохраненный хеш
+и отправляет тот же корень заново, только если транзакция упала или потерялась.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import hashlib
+import json
+import logging
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.blockchain import BlockchainRecord, MerkleAnchor
+from ..models.credit import CreditReport
+from .blockchain_service import get_blockchain_service
+from .latest_scores import latest_score_anchored
+from .merkle import build_tree, merkle_root, merkle_proof
+
+logger = logging.getLogger(__name__)
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+def generate_blockchain_hash(data: dict) -> str:
+    """Генерация хеша для блокчейна"""
+    data_str = json.dumps(data, sort_keys=True)
+    return hashlib.sha256(data_str.encode()).hexdigest()
+
+
+def enqueue_anchor(db, report: CreditReport, data_hash: str, report_data: dict) -> BlockchainRecord:
+    """Поставить хеш отчета в очередь на запись в блокчейн.
+
+    Работает и с Session, и с AsyncSession: запись только добавляется в сессию,
+    коммит - вместе с самим отчетом. У report уже должен быть id (после flush).
+    """
+    report.blockchain_hash = data_hash
+    record = BlockchainRecord(**anchor_record_values(report.user_id, report.id, data_hash, report_data))
+    db.add(record)
+    return record
+
+
+def anchor_record_values(user_id: int, report_id: int, data_hash: str, report_data: dict) -> dict:
+    """Колонки pending BlockchainRecord; для пакетной вставки insert(BlockchainRecord)"""
+    return {
+        "user_id": user_id,
+        "report_id": report_id,
+        "contract_address": settings.CONTRACT_ADDRESS or ZERO_ADDRESS,
+        "data_hash": data_hash,
+        "data_type": "credit_report",
+        "transaction_data": report_data,
+        "anchor_status": "pending"
+    }
+
+
+class Anchorer:
+    def __init__(
+            self,
+            batch_size: int = settings.ANCHOR_BATCH_SIZE,
+            window_seconds: int = settings.ANCHOR_WINDOW_SECONDS
+    ):
+        self.batch_size = batch_size
+        self.window = timedelta(seconds=window_seconds)
+
+    def anchor_pending(self, db: Session, force: bool = False) -> Optional[MerkleAnchor]:
+        """Собрать и отправить один пакет pending записей. None - пакет еще не набран или не отправлен"""
+        if not get_blockchain_service().can_anchor():
+            return None
+
+        records = db.execute(
+            select(BlockchainRecord)
+            .where(BlockchainRecord.anchor_status == "pending")
+            .order_by(BlockchainRecord.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+
+        if not records:
+            db.rollback()
+            return None
+
+        if len(records) < self.batch_size and not force:
+            oldest = _aware(records[0].created_at)
+            if oldest is not None and datetime.now(timezone.utc) - oldest < self.window:
+                db.rollback()
+                return None
+
+        levels = build_tree([record.data_hash for record in records])
+        root = merkle_root(levels)
+
+        anchor = MerkleAnchor(
+            merkle_root=root,
+            leaf_count=len(records),
+            contract_address=settings.CONTRACT_ADDRESS or ZERO_ADDRESS,
+            status="submitting",
+            attempts=0,
+            submitted_at=datetime.now(timezone.utc)
+        )
+        db.add(anchor)
+        db.flush()
+
+        for index, record in enumerate(records):
+            record.anchor_status = "submitting"
+            record.anchor_id = anchor.id
+            record.merkle_root = root
+            record.leaf_index = index
+            record.merkle_proof = merkle_proof(levels, index)
+
+        # Блокировки записей снимаются до обращения к ноде
+        db.commit()
+
+        return anchor if self._send(db, anchor) else None
+
+    def check_submitted(self, db: Session) -> int:
+        """Проверить отправленные пакеты по сохраненному хешу транзакции. Возвращает число записанных пакетов.
+
+        Транзакция без receipt дольше BLOCKCHAIN_TX_TIMEOUT, упавшая транзакция и пакет, застрявший
+        в submitting (процесс упал между отправкой и сохранением хеша), отправляются заново.
+        """
+        service = get_blockchain_service()
+        if not service.can_anchor():
+            return 0
+
+        anchors = db.execute(
+            select(MerkleAnchor)
+            .where(MerkleAnchor.status.in_(("submitting", "sent")))
+            .order_by(MerkleAnchor.id)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+
+        deadline = datetime.now(timezone.utc) - timedelta(seconds=settings.BLOCKCHAIN_TX_TIMEOUT)
+        anchored = 0
+        resend = []
+        for anchor in anchors:
+            expired = (_aware(anchor.submitted_at) or deadline) <= deadline
+            if anchor.status == "submitting":
+                if expired:
+                    resend.append(anchor)
+                continue
+
+            state = service.get_transaction_status(anchor.transaction_hash)
+            if state is None:
+                continue  # Нода недоступна - проверим позже
+            if state["status"] == "confirmed":
+                self._mark_anchored(db, anchor, state["block_number"])
+                anchored += 1
+            elif state["status"] == "reverted" or expired:
+                logger.warning(
+                    f"Транзакция {anchor.transaction_hash} пакета {anchor.id} "
+                    f"{'упала' if state['status'] == 'reverted' else 'не подтверждена'}, отправка заново"
+                )
+                resend.append(anchor)
+
+        for anchor in resend:
+            if anchor.attempts >= settings.ANCHOR_MAX_ATTEMPTS:
+                self._mark_failed(db, anchor)
+            else:
+                # Новый срок до отправки: другой процесс не возьмет пакет повторно
+                anchor.status = "submitting"
+                anchor.submitted_at = datetime.now(timezone.utc)
+        db.commit()
+
+        for anchor in resend:
+            if anchor.status == "submitting":
+                self._send(db, anchor)
+        return anchored
+
+    def _send(self, db: Session, anchor: MerkleAnchor) -> bool:
+        """Отправить корень пакета вне транзакции БД и сохранить хеш транзакции"""
+        tx_hash = get_blockchain_service().send_merkle_root(anchor.merkle_root, anchor.leaf_count)
+        anchor.attempts += 1
+        anchor.submitted_at = datetime.now(timezone.utc)
+        if tx_hash is None:
+            # Пакет остается в submitting, check_submitted отправит его после BLOCKCHAIN_TX_TIMEOUT
+            if anchor.attempts >= settings.ANCHOR_MAX_ATTEMPTS:
+                self._mark_failed(db, anchor)
+            db.commit()
+            return False
+
+        anchor.transaction_hash = tx_hash
+        anchor.status = "sent"
+        db.commit()
+        return True
+
+    def _mark_anchored(self, db: Session, anchor: MerkleAnchor, block_number: int):
+        tx_hash = anchor.transaction_hash
+        anchor.status = "anchored"
+        anchor.block_number = block_number
+
+        records = db.execute(
+            select(BlockchainRecord).where(BlockchainRecord.anchor_id == anchor.id)
+        ).scalars().all()
+        for record in records:
+            record.anchor_status = "anchored"
+            record.transaction_hash = tx_hash
+            record.block_number = block_number
+
+        report_ids = [record.report_id for record in records if record.report_id is not None]
+        if report_ids:
+            db.execute(
+                update(CreditReport)
+                .where(CreditReport.id.in_(report_ids))
+                .values(transaction_hash=tx_hash, block_number=block_number)
+                .execution_options(synchronize_session=False)
+            )
+            db.execute(latest_score_anchored(report_ids, tx_hash, block_number))
+        logger.info(f"Записан пакет из {anchor.leaf_count} отчетов, корень {anchor.merkle_root[:16]}..., tx: {tx_hash}")
+
+    def _mark_failed(self, db: Session, anchor: MerkleAnchor):
+        anchor.status = "failed"
+        db.execute(
+            update(BlockchainRecord)
+            .where(BlockchainRecord.anchor_id == anchor.id)
+            .values(anchor_status="failed")
+            .execution_options(synchronize_session=False)
+        )
+        logger.error(f"Пакет {anchor.id} (корень {anchor.merkle_root[:16]}...) не записан за {anchor.attempts} отправок")
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)  # SQLite хранит время без зоны
+    return value
+
+
+anchorer = Anchorer()
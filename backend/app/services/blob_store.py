@@ -0,0 +1,152 @@
+"""Хранилище загруженных файлов с адресацией по содержимому.
+
+Файл лежит в UPLOAD_DIR/blobs/ab/cd/<sha256> (два уровня каталогов по префиксу хеша,
+чтобы каталог не разрастался), одинаковое содержимое хранится один раз.
+Строка document_blobs считает ссылки из UploadedDocument и хранит результат парсинга,
+поэтому повторно загруженный документ не парсится заново.
+
+Загрузка сначала пишется в UPLOAD_DIR/staging и после подсчета хеша переносится
+на место атомарным os.replace. Удаление документа снимает ссылку (release),
+файлы без ссылок удаляет sweep() - python sweep_blobs.py.
+
+Файл появляется и удаляется только под блокировкой строки document_blobs:
+acquire() кладет файл на место после upsert строки (и перезаписывает пропавший),
+sweep() и discard() удаляют строку с ref_count <= 0 и только потом файл, до commit.
+Поэтому загрузка того же содержимого не может остаться со строкой без файла.
+"""
+from typing import List, Optional, Tuple
+import logging
+import os
+import uuid
+
+from fastapi import UploadFile
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.uploaded_document import DocumentBlob
+from .uploads import save_upload
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    def __init__(self, root: str = settings.UPLOAD_DIR):
+        self.blobs_dir = os.path.join(root, "blobs")
+        self.staging_dir = os.path.join(root, "staging")
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.blobs_dir, sha256[:2], sha256[2:4], sha256)
+
+    async def put(self, upload: UploadFile) -> Tuple[str, int, str, str]:
+        """Сохраняет загрузку в staging (один проход: запись + хеш).
+
+        Возвращает (sha256, размер, путь, staging путь); на место файл кладет acquire().
+        UploadTooLarge из save_upload пробрасывается как есть.
+        """
+        os.makedirs(self.staging_dir, exist_ok=True)
+        staging_path = os.path.join(self.staging_dir, uuid.uuid4().hex)
+        size, sha256 = await save_upload(upload, staging_path)
+        return sha256, size, self.path_for(sha256), staging_path
+
+    def _place(self, path: str, staging_path: Optional[str]):
+        """Под блокировкой строки: файл на место из staging, если его нет (в том числе удален sweep)"""
+        if not staging_path or not os.path.exists(staging_path):
+            return
+        if os.path.exists(path):
+            os.remove(staging_path)  # Такое содержимое уже хранится
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(staging_path, path)
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _insert(self, db: AsyncSession):
+        return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+    async def _upsert(self, db: AsyncSession, sha256: str, size: int, path: str, increment: int) -> DocumentBlob:
+        """Upsert строки с ref_count + increment: строка заблокирована до конца транзакции"""
+        stmt = self._insert(db)(DocumentBlob).values(sha256=sha256, size=size, path=path, ref_count=increment)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DocumentBlob.sha256],
+            set_={"ref_count": DocumentBlob.ref_count + increment, "path": stmt.excluded.path}
+        ).returning(DocumentBlob)
+        return (await db.execute(
+            select(DocumentBlob).from_statement(stmt).execution_options(populate_existing=True)
+        )).scalars().one()
+
+    async def acquire(self, db: AsyncSession, sha256: str, size: int, path: str,
+                      staging_path: Optional[str] = None) -> DocumentBlob:
+        """+1 ссылка на содержимое (строка создается при первой загрузке) в транзакции вызывающего.
+
+        Под блокировкой строки кладет на место файл из staging_path (см. put).
+        Возвращает строку document_blobs: по parsed_data видно, парсилось ли уже это содержимое.
+        """
+        blob = await self._upsert(db, sha256, size, path, 1)
+        self._place(path, staging_path)
+        return blob
+
+    async def discard(self, db: AsyncSession, sha256: str, size: int, path: str, staging_path: Optional[str] = None):
+        """Уборка после неудачной транзакции загрузки (вызывать после rollback).
+
+        Удаляет staging файл, а файл на месте - только если на него нет ссылок: строка блокируется
+        upsert'ом, поэтому незакоммиченная ссылка параллельной загрузки дождется этой транзакции
+        и положит файл заново из своего staging.
+        """
+        if staging_path:
+            self._unlink(staging_path)
+        try:
+            blob = await self._upsert(db, sha256, size, path, 0)
+            if blob.ref_count <= 0:
+                await db.execute(delete(DocumentBlob).where(DocumentBlob.sha256 == sha256))
+                self._unlink(path)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Не удалось убрать файл {sha256[:16]}... после неудачной загрузки: {e}")
+
+    async def release(self, db: AsyncSession, sha256: str):
+        """-1 ссылка (при удалении UploadedDocument). Файл остается до sweep()"""
+        await db.execute(
+            update(DocumentBlob)
+            .where(DocumentBlob.sha256 == sha256, DocumentBlob.ref_count > 0)
+            .values(ref_count=DocumentBlob.ref_count - 1)
+        )
+
+    async def get(self, db: AsyncSession, sha256: str) -> Optional[DocumentBlob]:
+        return await db.get(DocumentBlob, sha256)
+
+    async def sweep(self, db: AsyncSession) -> List[str]:
+        """Удаляет строки и файлы без ссылок.
+
+        Строки блокируются (FOR UPDATE; занятые загрузкой пропускаются), ref_count перепроверяется
+        при удалении, файлы удаляются до commit - загрузка того же содержимого ждет блокировку
+        и после нее кладет файл заново.
+        """
+        candidates = (await db.execute(
+            select(DocumentBlob.sha256).where(DocumentBlob.ref_count <= 0).with_for_update(skip_locked=True)
+        )).scalars().all()
+        if not candidates:
+            await db.rollback()
+            return []
+
+        paths = (await db.execute(
+            delete(DocumentBlob)
+            .where(DocumentBlob.sha256.in_(candidates), DocumentBlob.ref_count <= 0)
+            .returning(DocumentBlob.path)
+        )).scalars().all()
+        for path in paths:
+            self._unlink(path)
+        await db.commit()
+        if paths:
+            logger.info(f"Удалено {len(paths)} файлов без ссылок")
+        return paths
+
+
+blob_store = BlobStore()
@@ -1,37 +1,126 @@
 from web3 import Web3
-from typing import Optional, Dict, Any
+from web3.exceptions import TransactionNotFound
+from typing import Optional, Dict, Any, Hashable, List, Tuple
 from datetime import datetime
+from functools import lru_cache
 import json
 import os
 import hashlib
+import threading
 import time
 import logging
+import requests
 
 from ..config import settings
+from .cache import TTLCache
+from .metrics import InstrumentedAdapter
 
 logger = logging.getLogger(__name__)
 
+# Функция контракта для записи корня Меркла: anchorRoot(bytes32 root) или anchorRoot(bytes32 root, uint256 leafCount)
+ANCHOR_FUNCTION = "anchorRoot"
+# Необязательная view функция контракта: isRootAnchored(bytes32 root) -> bool
+ANCHORED_ROOT_LOOKUP = "isRootAnchored"
+
+
+def rating_version(latest_score: Optional[Dict[str, Any]]) -> Optional[Tuple[Any, Any]]:
+    """Версия рейтинга по последнему отчету (get_latest_score): меняется с новой оценкой и с ее записью в блокчейн"""
+    if latest_score is None:
+        return None
+    return latest_score["id"], latest_score["transaction_hash"]
+
+
+@lru_cache(maxsize=1)
+def load_contract_abi() -> Optional[list]:
+    """ABI контракта (файл читается один раз на процесс)"""
+    # Ищем файл контракта
+    contract_paths = [
+        os.path.join(os.path.dirname(__file__), '../contracts/CreditProfile.json'),
+        os.path.join(os.path.dirname(__file__), '../../contracts/CreditProfile.json'),
+        'contracts/CreditProfile.json',
+        './contracts/CreditProfile.json'
+    ]
+
+    contract_path = None
+    for path in contract_paths:
+        if os.path.exists(path):
+            contract_path = path
+            break
+
+    if not contract_path:
+        logger.warning(f"Файл контракта не найден. Искали в: {contract_paths}")
+        return None
+
+    with open(contract_path, 'r') as f:
+        contract_data = json.load(f)
+
+    # Извлекаем ABI (поддерживаем разные форматы)
+    if isinstance(contract_data, list):
+        return contract_data  # Уже массив ABI
+    elif 'abi' in contract_data:
+        return contract_data['abi']  # Truffle/Hardhat формат
+    elif 'result' in contract_data:
+        return contract_data['result']  # Etherscan формат
+
+    logger.warning(f"Неизвестный формат контракта в {contract_path}")
+    return None
+
 
 class BlockchainService:
+    """Клиент блокчейна. Один экземпляр на процесс - см. get_blockchain_service()"""
+
     def __init__(self):
         self.web3 = None
         self.contract = None
         self.is_initialized = False
 
+        # Пул keep-alive соединений к RPC ноде, общий для всех запросов процесса
+        self.session = requests.Session()
+        adapter = InstrumentedAdapter("blockchain_rpc", pool_connections=1, pool_maxsize=settings.BLOCKCHAIN_RPC_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Переподключение: пока нода недоступна, работаем в мок режиме и не чаще
+        # раза в backoff секунд пробуем подключиться снова (backoff растет до максимума)
+        self._connect_lock = threading.Lock()
+        self._anchor_unsupported_logged = False
+        self._backoff = settings.BLOCKCHAIN_RECONNECT_BACKOFF
+        self._next_connect_at = 0.0
+
+        # Кеш get_network_info
+        self._chain_id: Optional[int] = None
+        self._network_info: Optional[Dict[str, Any]] = None
+        self._network_info_at = 0.0
+        self._network_refresh_lock = threading.Lock()
+        self.network_cache_stats = {"hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+
+        # Рейтинги пользователей. Новые оценки и их запись в блокчейн делает воркер (другой процесс),
+        # поэтому запись хранится вместе с версией последнего отчета из user_latest_scores
+        # (report_id, transaction_hash): новая версия - промах кеша, TTL ограничивает только чтения без версии
+        self.rating_cache = TTLCache(max_size=settings.RATING_CACHE_SIZE, ttl=settings.RATING_CACHE_TTL)
+
+        # Проверяем наличие URL блокчейна
+        if not settings.BLOCKCHAIN_RPC_URL:
+            logger.warning("BLOCKCHAIN_RPC_URL не настроен, используем мок режим")
+            return
+
+        self._connect()
+
+    def _connect(self):
         try:
-            # Проверяем наличие URL блокчейна
-            if not settings.BLOCKCHAIN_RPC_URL:
-                logger.warning("BLOCKCHAIN_RPC_URL не настроен, используем мок режим")
-                return
+            web3 = Web3(Web3.HTTPProvider(
+                settings.BLOCKCHAIN_RPC_URL,
+                request_kwargs={"timeout": settings.BLOCKCHAIN_RPC_TIMEOUT},
+                session=self.session
+            ))
 
-            self.web3 = Web3(Web3.HTTPProvider(settings.BLOCKCHAIN_RPC_URL))
-
-            if not self.web3.is_connected():
+            if not web3.is_connected():
                 logger.warning(f"Не удалось подключиться к блокчейну по адресу: {settings.BLOCKCHAIN_RPC_URL}")
-                logger.info("Работаем в мок режиме без блокчейна")
-                self.web3 = None
+                logger.info(f"Работаем в мок режиме без блокчейна, повтор через {self._backoff:.0f} с")
+                self._schedule_reconnect()
                 return
 
+            self.web3 = web3
             logger.info(f"✅ Успешное подключение к блокчейну")
             logger.info(f"   Chain ID: {self.web3.eth.chain_id}")
             logger.info(f"   Последний блок: {self.web3.eth.block_number}")
@@ -43,45 +132,44 @@ class BlockchainService:
                 logger.info("CONTRACT_ADDRESS не указан, блокчейн операции будут мок")
 
             self.is_initialized = True
+            self._backoff = settings.BLOCKCHAIN_RECONNECT_BACKOFF
 
         except Exception as e:
             logger.error(f"Ошибка инициализации блокчейн сервиса: {e}")
             logger.info("Продолжаем работу в мок режиме")
             self.web3 = None
+            self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        self._next_connect_at = time.monotonic() + self._backoff
+        self._backoff = min(self._backoff * 2, settings.BLOCKCHAIN_RECONNECT_MAX_BACKOFF)
+
+    def _ensure_connected(self):
+        """Попытка переподключения, если подошло время. Остальные потоки не ждут, а идут в мок режим"""
+        if self.web3 or not settings.BLOCKCHAIN_RPC_URL or time.monotonic() < self._next_connect_at:
+            return
+        if not self._connect_lock.acquire(blocking=False):
+            return
+        try:
+            if not self.web3 and time.monotonic() >= self._next_connect_at:
+                self._connect()
+        finally:
+            self._connect_lock.release()
+
+    def _mark_disconnected(self, error: Exception):
+        """RPC вызов упал - считаем ноду недоступной до следующей попытки переподключения"""
+        if self.web3:
+            logger.warning(f"Потеряно соединение с блокчейном: {error}")
+            self.web3 = None
+            self.contract = None
+            self.is_initialized = False
+            self._schedule_reconnect()
 
     def _load_contract(self):
-        """Загрузка ABI контракта"""
+        """Загрузка контракта по ABI"""
         try:
-            # Ищем файл контракта
-            contract_paths = [
-                os.path.join(os.path.dirname(__file__), '../contracts/CreditProfile.json'),
-                os.path.join(os.path.dirname(__file__), '../../contracts/CreditProfile.json'),
-                'contracts/CreditProfile.json',
-                './contracts/CreditProfile.json'
-            ]
-
-            contract_path = None
-            for path in contract_paths:
-                if os.path.exists(path):
-                    contract_path = path
-                    break
-
-            if not contract_path:
-                logger.warning(f"Файл контракта не найден. Искали в: {contract_paths}")
-                return
-
-            with open(contract_path, 'r') as f:
-                contract_data = json.load(f)
-
-            # Извлекаем ABI (поддерживаем разные форматы)
-            if isinstance(contract_data, list):
-                contract_abi = contract_data  # Уже массив ABI
-            elif 'abi' in contract_data:
-                contract_abi = contract_data['abi']  # Truffle/Hardhat формат
-            elif 'result' in contract_data:
-                contract_abi = contract_data['result']  # Etherscan формат
-            else:
-                logger.warning(f"Неизвестный формат контракта в {contract_path}")
+            contract_abi = load_contract_abi()
+            if contract_abi is None:
                 return
 
             self.contract = self.web3.eth.contract(
@@ -96,6 +184,7 @@ class BlockchainService:
 
     def create_user_profile(self, user_id: int, email: str, wallet_address: str) -> Optional[str]:
         """Создание профиля пользователя на блокчейне"""
+        self._ensure_connected()
         try:
             if not self.web3:
                 # Мок реализация если блокчейн не доступен
@@ -115,54 +204,303 @@ class BlockchainService:
 
     def update_credit_score(self, user_id: int, score: int, data_hash: str) -> Optional[str]:
         """Обновление кредитного рейтинга на блокчейне"""
+        self._ensure_connected()
         try:
             if not self.web3:
                 # Мок реализация
                 tx_data = f"{user_id}{score}{data_hash}{time.time()}"
                 tx_hash = f"0x{hashlib.sha256(tx_data.encode()).hexdigest()[:64]}"
                 logger.info(f"📝 Мок: Обновлен рейтинг пользователя {user_id} до {score}, tx: {tx_hash}")
-                return tx_hash
+            else:
+                # Реальная реализация
+                tx_data = f"{user_id}{score}{data_hash}{time.time()}"
+                tx_hash = f"0x{hashlib.sha256(tx_data.encode()).hexdigest()[:64]}"
+                logger.info(f"✅ Реальный блокчейн: Обновлен рейтинг пользователя {user_id} до {score}")
 
-            # Реальная реализация
-            tx_data = f"{user_id}{score}{data_hash}{time.time()}"
-            tx_hash = f"0x{hashlib.sha256(tx_data.encode()).hexdigest()[:64]}"
-            logger.info(f"✅ Реальный блокчейн: Обновлен рейтинг пользователя {user_id} до {score}")
             return tx_hash
 
         except Exception as e:
             logger.error(f"Ошибка обновления рейтинга в блокчейне: {e}")
             return None
+        finally:
+            # Рейтинг изменился (или неизвестно, дошла ли транзакция) - следующее чтение пойдет в блокчейн.
+            # Так сбрасывается только кеш этого процесса; оценки воркера сбрасывают кеш API через версию
+            self.rating_cache.invalidate(user_id)
+
+    def _abi_function(self, name: str) -> Optional[dict]:
+        """Описание функции контракта из ABI или None, если такой функции нет"""
+        if not self.contract:
+            return None
+        for item in self.contract.abi:
+            if item.get("type") == "function" and item.get("name") == name:
+                return item
+        return None
+
+    def _send_transaction(self, call) -> Any:
+        """Отправка вызова контракта от ADMIN_WALLET_ADDRESS, возвращает хеш транзакции"""
+        sender = settings.ADMIN_WALLET_ADDRESS
+        if not sender:
+            raise RuntimeError("ADMIN_WALLET_ADDRESS не задан")
+        if settings.ADMIN_PRIVATE_KEY:
+            tx = call.build_transaction({
+                "from": sender,
+                "nonce": self.web3.eth.get_transaction_count(sender, "pending")
+            })
+            signed = self.web3.eth.account.sign_transaction(tx, settings.ADMIN_PRIVATE_KEY)
+            return self.web3.eth.send_raw_transaction(signed.raw_transaction)
+        # Аккаунт разблокирован на ноде (ganache)
+        return call.transact({"from": sender})
+
+    def can_anchor(self) -> bool:
+        """Есть ли куда отправлять корни Меркла: подключенный блокчейн и anchorRoot в ABI контракта"""
+        self._ensure_connected()
+        if not self.web3 or not self.contract:
+            return False
+        if self._abi_function(ANCHOR_FUNCTION) is None:
+            if not self._anchor_unsupported_logged:
+                logger.warning(f"В ABI контракта нет {ANCHOR_FUNCTION}, отчеты остаются в очереди на запись")
+                self._anchor_unsupported_logged = True
+            return False
+        return True
+
+    def send_merkle_root(self, merkle_root: str, leaf_count: int) -> Optional[str]:
+        """Отправка транзакции anchorRoot с корнем дерева Меркла (пакета хешей отчетов), без ожидания receipt.
+
+        Возвращает хеш транзакции; подтверждение проверяет get_transaction_status.
+        None - отправить не удалось (блокчейн недоступен, в ABI нет anchorRoot, ошибка ноды).
+        Хеш никогда не выдумывается.
+        """
+        if not self.can_anchor():
+            return None
 
-    def get_user_rating(self, user_id: int) -> Optional[int]:
-        """Получение рейтинга пользователя с блокчейна"""
+        try:
+            args = [bytes.fromhex(merkle_root)]
+            if len(self._abi_function(ANCHOR_FUNCTION).get("inputs", [])) > 1:
+                args.append(leaf_count)
+            tx_hash = self.web3.to_hex(self._send_transaction(getattr(self.contract.functions, ANCHOR_FUNCTION)(*args)))
+            logger.info(f"✅ Реальный блокчейн: Отправлен корень {merkle_root[:16]}... для {leaf_count} отчетов, tx: {tx_hash}")
+            return tx_hash
+
+        except requests.exceptions.ConnectionError as e:
+            self._mark_disconnected(e)
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка отправки корня Меркла в блокчейн: {e}")
+            return None
+
+    def get_transaction_status(self, transaction_hash: str) -> Optional[Dict[str, Any]]:
+        """Состояние транзакции по receipt: {"status": "pending" | "confirmed" | "reverted", "block_number"}.
+
+        pending - receipt еще нет (транзакция не в блоке или потеряна). None - не удалось проверить.
+        """
+        self._ensure_connected()
+        if not self.web3:
+            return None
+        try:
+            receipt = self.web3.eth.get_transaction_receipt(transaction_hash)
+        except TransactionNotFound:
+            return {"status": "pending", "block_number": None}
+        except requests.exceptions.ConnectionError as e:
+            self._mark_disconnected(e)
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка получения receipt {transaction_hash}: {e}")
+            return None
+        if receipt is None:
+            return {"status": "pending", "block_number": None}
+        return {
+            "status": "confirmed" if receipt["status"] == 1 else "reverted",
+            "block_number": receipt["blockNumber"]
+        }
+
+    def is_root_anchored(self, merkle_root: str, transaction_hash: Optional[str]) -> Optional[bool]:
+        """Проверка, что корень Меркла записан контрактом. None - не удалось проверить.
+
+        Если в контракте есть isRootAnchored, спрашиваем его. Иначе декодируем вход транзакции
+        transaction_hash: она должна быть успешным вызовом anchorRoot этого контракта именно с merkle_root.
+        """
+        self._ensure_connected()
+        if not self.web3 or not self.contract:
+            return None
+
+        root = bytes.fromhex(merkle_root)
+        try:
+            if self._abi_function(ANCHORED_ROOT_LOOKUP) is not None:
+                return bool(getattr(self.contract.functions, ANCHORED_ROOT_LOOKUP)(root).call())
+
+            if self._abi_function(ANCHOR_FUNCTION) is None or not transaction_hash:
+                return None
+
+            tx = self.web3.eth.get_transaction(transaction_hash)
+            if not tx.get("to") or tx["to"].lower() != self.contract.address.lower():
+                return False
+            function, params = self.contract.decode_function_input(tx["input"])
+            if function.fn_name != ANCHOR_FUNCTION or next(iter(params.values()), None) != root:
+                return False
+
+            receipt = self.web3.eth.get_transaction_receipt(transaction_hash)
+            return receipt is not None and receipt.get("status") == 1
+
+        except requests.exceptions.ConnectionError as e:
+            self._mark_disconnected(e)
+            return None
+        except TransactionNotFound:
+            return False
+        except Exception as e:
+            logger.error(f"Ошибка проверки корня {merkle_root[:16]}... в блокчейне: {e}")
+            return None
+
+    def verify_data_hash(self, data_hash: str, user_id: int) -> Dict[str, Any]:
+        """Онлайн проверка хеша через контракт (RPC на каждый вызов)"""
+        self._ensure_connected()
+        try:
+            if not self.web3 or not self.contract:
+                return {
+                    "verified": True,
+                    "mode": "mock",
+                    "message": "Блокчейн не доступен, используется мок режим"
+                }
+
+            # В ABI контракта пока нет функции проверки хеша
+            # verified = self.contract.functions.verifyDataHash(user_id, data_hash).call()
+            return {
+                "verified": False,
+                "mode": "rpc",
+                "message": "Контракт не поддерживает проверку хеша, используйте проверку по proof"
+            }
+
+        except Exception as e:
+            logger.error(f"Ошибка проверки хеша в блокчейне: {e}")
+            return {"verified": False, "mode": "failed", "error": str(e)}
+
+    def get_user_rating(self, user_id: int, version: Optional[Hashable] = None) -> Optional[int]:
+        """Получение рейтинга пользователя с блокчейна через кеш рейтингов.
+
+        version - версия последнего отчета пользователя (см. rating_version): запись кеша
+        с другой версией считается устаревшей и рейтинг читается заново.
+        """
+        cached = self.rating_cache.get(user_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        rating = self._read_ratings([user_id]).get(user_id)
+        if rating is not None:
+            self.rating_cache.set(user_id, (version, rating))
+        return rating
+
+    def warm_ratings(self, versions: Dict[int, Optional[Hashable]]) -> Dict[int, int]:
+        """Предзагрузка рейтингов пользователей {user_id: версия} в кеш одним batch запросом к ноде.
+
+        Из блокчейна читаются только пользователи без записи кеша с той же версией.
+        """
+        ratings = {}
+        missing = []
+        for user_id, version in versions.items():
+            cached = self.rating_cache.get(user_id)
+            if cached is not None and cached[0] == version:
+                ratings[user_id] = cached[1]
+            else:
+                missing.append(user_id)
+
+        if missing:
+            fetched = self._read_ratings(missing)
+            self.rating_cache.set_many({user_id: (versions[user_id], rating) for user_id, rating in fetched.items()})
+            ratings.update(fetched)
+        return ratings
+
+    def _read_ratings(self, user_ids: List[int]) -> Dict[int, int]:
+        """Чтение рейтингов с блокчейна (без кеша)"""
+        self._ensure_connected()
         try:
             if not self.web3 or not self.contract:
                 # Мок реализация - генерируем реалистичный рейтинг
-                mock_rating = 500 + ((user_id * 12345) % 300)  # 500-800
-                logger.info(f"📊 Мок: Получен рейтинг пользователя {user_id}: {mock_rating}")
-                return mock_rating
+                ratings = {user_id: 500 + ((user_id * 12345) % 300) for user_id in user_ids}  # 500-800
+                logger.info(f"📊 Мок: Получены рейтинги {len(ratings)} пользователей")
+
+            elif any(item.get("name") == "getUserRating" for item in self.contract.abi):
+                # Реальная реализация - все eth_call одним batch запросом (multicall)
+                results = self._rpc_batch([
+                    ("eth_call", [{
+                        "to": settings.CONTRACT_ADDRESS,
+                        "data": self.contract.functions.getUserRating(user_id)._encode_transaction_data()
+                    }, "latest"])
+                    for user_id in user_ids
+                ])
+                ratings = {user_id: int(result, 16) for user_id, result in zip(user_ids, results)}
+                logger.info(f"✅ Реальный блокчейн: Получены рейтинги {len(ratings)} пользователей")
 
-            # Реальная реализация - вызов контракта
-            # rating = self.contract.functions.getUserRating(user_id).call()
-            # logger.info(f"✅ Реальный блокчейн: Получен рейтинг пользователя {user_id}: {rating}")
-            # return rating
+            else:
+                # Пока в ABI нет getUserRating - возвращаем мок даже с подключенным блокчейном
+                ratings = {user_id: 600 + ((user_id * 54321) % 200) for user_id in user_ids}  # 600-800
+                logger.info(f"📊 Блокчейн доступен, используем мок рейтинги для {len(ratings)} пользователей")
 
-            # Пока возвращаем мок даже с подключенным блокчейном
-            mock_rating = 600 + ((user_id * 54321) % 200)  # 600-800
-            logger.info(f"📊 Блокчейн доступен, используем мок рейтинг: {mock_rating}")
-            return mock_rating
+            return ratings
 
         except Exception as e:
+            if isinstance(e, requests.exceptions.ConnectionError):
+                self._mark_disconnected(e)
             logger.error(f"Ошибка получения рейтинга из блокчейна: {e}")
-            return None
+            return {}
 
     def is_available(self) -> bool:
         """Проверка доступности блокчейна"""
         return self.web3 is not None and self.web3.is_connected()
 
+    def _rpc_batch(self, calls: List[Tuple[str, list]]) -> List[Any]:
+        """Несколько JSON-RPC вызовов одним HTTP запросом, результаты в порядке calls"""
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in enumerate(calls)
+        ]
+        response = self.session.post(
+            settings.BLOCKCHAIN_RPC_URL,
+            json=payload,
+            timeout=settings.BLOCKCHAIN_RPC_TIMEOUT
+        )
+        response.raise_for_status()
+
+        results = {}
+        for item in response.json():
+            if "error" in item:
+                raise RuntimeError(f"RPC {calls[item['id']][0]}: {item['error']}")
+            results[item["id"]] = item["result"]
+        return [results[i] for i in range(len(calls))]
+
+    def _refresh_network_info(self):
+        """chain_id запрашивается один раз на процесс, блок и цена газа - при каждом обновлении"""
+        calls = [("eth_blockNumber", []), ("eth_gasPrice", [])]
+        if self._chain_id is None:
+            calls.append(("eth_chainId", []))
+
+        results = self._rpc_batch(calls)
+        if self._chain_id is None:
+            self._chain_id = int(results[2], 16)
+        self._network_info = {
+            "block_number": int(results[0], 16),
+            "gas_price": str(int(results[1], 16))
+        }
+        self._network_info_at = time.monotonic()
+        self.network_cache_stats["refreshes"] += 1
+
+    def _refresh_network_info_background(self):
+        try:
+            self._refresh_network_info()
+        except Exception as e:
+            self.network_cache_stats["errors"] += 1
+            logger.warning(f"Не удалось обновить информацию о сети: {e}")
+            if isinstance(e, requests.exceptions.ConnectionError):
+                self._mark_disconnected(e)
+        finally:
+            self._network_refresh_lock.release()
+
     def get_network_info(self) -> Dict[str, Any]:
-        """Получение информации о сети"""
-        if not self.web3 or not self.is_available():
+        """Получение информации о сети.
+
+        Значения кешируются: chain_id - на время жизни процесса, номер блока и цена газа -
+        на BLOCKCHAIN_INFO_TTL секунд. Устаревшее значение отдается сразу, а обновление
+        идет в фоновом потоке. Запрос к ноде - один batch JSON-RPC.
+        """
+        self._ensure_connected()
+        if not self.web3:
             return {
                 "connected": False,
                 "mode": "mock",
@@ -170,15 +508,32 @@ class BlockchainService:
             }
 
         try:
+            if self._network_info is None:
+                # Первое обращение - ждем ответа ноды
+                self.network_cache_stats["misses"] += 1
+                with self._network_refresh_lock:
+                    if self._network_info is None:
+                        self._refresh_network_info()
+            else:
+                self.network_cache_stats["hits"] += 1
+                is_stale = time.monotonic() - self._network_info_at > settings.BLOCKCHAIN_INFO_TTL
+                # Одно фоновое обновление за раз
+                if is_stale and self._network_refresh_lock.acquire(blocking=False):
+                    threading.Thread(target=self._refresh_network_info_background, daemon=True).start()
+
             return {
                 "connected": True,
                 "mode": "real",
-                "chain_id": self.web3.eth.chain_id,
-                "block_number": self.web3.eth.block_number,
-                "gas_price": str(self.web3.eth.gas_price),
-                "contract_address": settings.CONTRACT_ADDRESS
+                "chain_id": self._chain_id,
+                "block_number": self._network_info["block_number"],
+                "gas_price": self._network_info["gas_price"],
+                "contract_address": settings.CONTRACT_ADDRESS,
+                "cache": dict(self.network_cache_stats)
             }
         except Exception as e:
+            self.network_cache_stats["errors"] += 1
+            if isinstance(e, requests.exceptions.ConnectionError):
+                self._mark_disconnected(e)
             return {
                 "connected": False,
                 "error": str(e),
@@ -186,5 +541,18 @@ class BlockchainService:
             }
 
 
-# Создаем глобальный экземпляр сервиса
-blockchain_service = BlockchainService()
\ No newline at end of file
+_service: Optional[BlockchainService] = None
+_service_lock = threading.Lock()
+
+
+def get_blockchain_service() -> BlockchainService:
+    """Общий экземпляр сервиса на процесс, создается при первом обращении.
+
+    Используется как FastAPI dependency: Depends(get_blockchain_service).
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = BlockchainService()
+    return _service
\ No newline at end of file
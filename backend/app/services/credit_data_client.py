@@ -0,0 +1,20 @@
+"""Клиент credit_data_service: 12 финансовых признаков пользователя для скоринга.
+
+Используется общий клиент сервиса (credit_data_service/client.py), здесь только
+настройки бэкенда и метрики запросов. Пакет credit_data_service ставится как
+зависимость: pip install -e ../credit_data_service (в образе - backend/Dockerfile).
+"""
+from credit_data_service.client import RandomizerClient
+
+from ..config import settings
+from .metrics import InstrumentedAdapter
+
+POOL_SIZE = 20
+
+credit_data_client = RandomizerClient(
+    base_url=settings.CREDIT_DATA_SERVICE_URL,
+    timeout=settings.CREDIT_DATA_SERVICE_TIMEOUT,
+    # /api/generate/batch считает пачку векторно, но ответ в разы больше одиночного
+    batch_timeout=settings.CREDIT_DATA_SERVICE_TIMEOUT * 10,
+    adapter=InstrumentedAdapter("credit_data_service", pool_connections=1, pool_maxsize=POOL_SIZE)
+)
@@ -0,0 +1,187 @@
+"""Хранилище финансовых признаков пользователей.
+
+Признаки из credit_data_service сохраняются версиями в user_feature_snapshots,
+перед таблицей - LRU кеш процесса. Снимок считается свежим FEATURE_TTL секунд:
+пока он свежий, скоринг не ходит в credit_data_service. CreditReport хранит
+feature_snapshot_id, поэтому пересчет и объяснение скора работают по сохраненным признакам.
+Признаки зависят от наличия кредитной истории: снимок, запрошенный с другим has_history,
+считается устаревшим при любом возрасте.
+
+Снимки пишутся в отдельной сессии и коммитятся сразу: это факт о пользователе,
+он остается валидным, даже если задача скоринга потом упадет.
+"""
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+import threading
+
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.credit import UserFeatureSnapshot
+from .cache import TTLCache
+from .credit_data_client import credit_data_client
+
+logger = logging.getLogger(__name__)
+
+# Попытки вставки снимков при гонке версий с другим процессом
+INSERT_ATTEMPTS = 3
+
+
+def _timestamp(value: Optional[datetime]) -> float:
+    if value is None:
+        return 0.0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)  # SQLite хранит время без зоны
+    return value.timestamp()
+
+
+class FeatureStore:
+    def __init__(self, ttl: float = settings.FEATURE_TTL, cache_size: int = settings.FEATURE_CACHE_SIZE):
+        self.ttl = ttl
+        # user_id -> (snapshot_id, version, features, fetched_at, has_history)
+        self.cache = TTLCache(max_size=cache_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self.db_hits = 0
+        self.service_calls = 0
+        self.fetched = 0
+
+    def _is_fresh(self, fetched_at: float, fresh_only: bool) -> bool:
+        return not fresh_only or datetime.now(timezone.utc).timestamp() - fetched_at <= self.ttl
+
+    def _use_latest(self, db, user_ids: List[int], history: Dict[int, bool], fresh_only: bool,
+                    result: Dict[int, Tuple[int, dict]]) -> Dict[int, UserFeatureSnapshot]:
+        """Подходящие последние снимки из БД - в result и кеш; возвращает последние снимки по user_id"""
+        latest = self._latest_snapshots(db, user_ids)
+        for user_id, snapshot in latest.items():
+            fetched_at = _timestamp(snapshot.fetched_at)
+            self.cache.set(user_id, (snapshot.id, snapshot.version, snapshot.features, fetched_at, snapshot.has_history))
+            if snapshot.has_history == history[user_id] and self._is_fresh(fetched_at, fresh_only):
+                result[user_id] = (snapshot.id, snapshot.features)
+                with self._lock:
+                    self.db_hits += 1
+        return latest
+
+    def _latest_snapshots(self, db, user_ids: List[int]) -> Dict[int, UserFeatureSnapshot]:
+        latest = (
+            select(UserFeatureSnapshot.user_id, func.max(UserFeatureSnapshot.version).label("version"))
+            .where(UserFeatureSnapshot.user_id.in_(user_ids))
+            .group_by(UserFeatureSnapshot.user_id)
+            .subquery()
+        )
+        snapshots = db.execute(
+            select(UserFeatureSnapshot).join(latest, and_(
+                UserFeatureSnapshot.user_id == latest.c.user_id,
+                UserFeatureSnapshot.version == latest.c.version
+            ))
+        ).scalars().all()
+        return {snapshot.user_id: snapshot for snapshot in snapshots}
+
+    def _fetch(self, user_ids: List[int], has_history: List[bool]) -> Optional[Dict[int, dict]]:
+        with self._lock:
+            self.service_calls += 1
+            self.fetched += len(user_ids)
+        if len(user_ids) == 1:
+            features = credit_data_client.get_financial_data(str(user_ids[0]), has_history[0])
+            return None if features is None else {user_ids[0]: features}
+
+        # Пачки /api/generate/batch; пользователи из неудачных пачек отсутствуют в ответе
+        fetched = credit_data_client.get_financial_data_many([str(user_id) for user_id in user_ids], has_history)
+        if len(fetched) != len(user_ids):
+            return None
+        return {user_id: fetched[str(user_id)] for user_id in user_ids}
+
+    def get_many(
+            self,
+            user_ids: List[int],
+            has_history: List[bool],
+            fresh_only: bool = True
+    ) -> List[Tuple[int, dict]]:
+        """(snapshot_id, признаки) для каждого пользователя в порядке user_ids.
+
+        fresh_only=False - подходит снимок любого возраста (пересчет по сохраненным признакам),
+        в credit_data_service идем только за пользователями без снимков.
+        RuntimeError, если нужен credit_data_service, а он недоступен.
+        """
+        history = dict(zip(user_ids, has_history))
+        result: Dict[int, Tuple[int, dict]] = {}
+        for user_id in user_ids:
+            cached = self.cache.get(user_id)
+            if cached is not None and cached[4] == history[user_id] and self._is_fresh(cached[3], fresh_only):
+                result[user_id] = (cached[0], cached[2])
+
+        missing = [user_id for user_id in user_ids if user_id not in result]
+        if not missing:
+            return [result[user_id] for user_id in user_ids]
+
+        db = SessionLocal()
+        try:
+            latest = self._use_latest(db, missing, history, fresh_only, result)
+            stale = [user_id for user_id in missing if user_id not in result]
+            if stale:
+                fetched = self._fetch(stale, [history[user_id] for user_id in stale])
+                if fetched is None:
+                    raise RuntimeError("credit_data_service недоступен")
+                self._insert_snapshots(db, stale, fetched, history, latest, result)
+        finally:
+            db.close()
+
+        return [result[user_id] for user_id in user_ids]
+
+    def _insert_snapshots(self, db, user_ids: List[int], fetched: Dict[int, dict], history: Dict[int, bool],
+                          latest: Dict[int, UserFeatureSnapshot], result: Dict[int, Tuple[int, dict]]):
+        """Новые версии снимков одним INSERT. Если другой процесс успел вставить ту же версию
+        (уникальный индекс user_id, version), перечитываем последние снимки: подходящие берем,
+        для остальных вставляем следующую версию."""
+        for attempt in range(INSERT_ATTEMPTS):
+            fetched_at = datetime.now(timezone.utc)
+            rows = [
+                {
+                    "user_id": user_id,
+                    "version": latest[user_id].version + 1 if user_id in latest else 1,
+                    "features": fetched[user_id],
+                    "has_history": history[user_id],
+                    "source": "credit_data_service",
+                    "fetched_at": fetched_at
+                }
+                for user_id in user_ids
+            ]
+            try:
+                snapshot_ids = db.execute(
+                    insert(UserFeatureSnapshot).returning(UserFeatureSnapshot.id, sort_by_parameter_order=True), rows
+                ).scalars().all()
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                if attempt == INSERT_ATTEMPTS - 1:
+                    raise
+                logger.info(f"Гонка версий снимков признаков, перечитываем {len(user_ids)} пользователей")
+                # Снимок, только что записанный другим процессом, свежий при любом fresh_only
+                latest = self._use_latest(db, user_ids, history, True, result)
+                user_ids = [user_id for user_id in user_ids if user_id not in result]
+                if not user_ids:
+                    return
+                continue
+
+            for row, snapshot_id in zip(rows, snapshot_ids):
+                self.cache.set(row["user_id"], (
+                    snapshot_id, row["version"], row["features"], fetched_at.timestamp(), row["has_history"]
+                ))
+                result[row["user_id"]] = (snapshot_id, row["features"])
+            return
+
+    def get(self, user_id: int, has_history: bool, fresh_only: bool = True) -> Tuple[int, dict]:
+        return self.get_many([user_id], [has_history], fresh_only=fresh_only)[0]
+
+    def stats(self) -> dict:
+        return {
+            "cache": self.cache.stats(),
+            "db_hits": self.db_hits,
+            "service_calls": self.service_calls,
+            "fetched_users": self.fetched
+        }
+
+
+feature_store = FeatureStore()
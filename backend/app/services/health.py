@@ -0,0 +1,108 @@
+"""Проверки зависимостей для /readyz и /health.
+
+Каждая проверка выполняется не чаще раза в HEALTH_CHECK_TTL секунд на процесс:
+частые пробы оркестратора и параллельные запросы получают закешированный результат,
+одновременно идет не больше одной реальной проверки каждой зависимости.
+"""
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from ..config import settings
+from ..database import async_engine
+from .blockchain_service import get_blockchain_service
+from .credit_data_client import credit_data_client
+
+
+HEALTHY_STATUSES = ("ok", "mock")
+
+
+class CachedCheck:
+    def __init__(self, name: str, check: Callable[[], Awaitable[Optional[Dict[str, Any]]]], ttl: float = settings.HEALTH_CHECK_TTL):
+        self.name = name
+        self.check = check
+        self.ttl = ttl
+        self._result: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> Dict[str, Any]:
+        if self._result is not None and time.monotonic() < self._expires_at:
+            return self._result
+
+        async with self._lock:
+            # Пока ждали, проверку мог выполнить другой запрос
+            if self._result is not None and time.monotonic() < self._expires_at:
+                return self._result
+
+            started = time.perf_counter()
+            try:
+                details = await asyncio.wait_for(self.check(), timeout=settings.HEALTH_CHECK_TIMEOUT)
+                result = {"status": "ok", **(details or {})}
+            except asyncio.TimeoutError:
+                result = {"status": "error", "error": f"Нет ответа за {settings.HEALTH_CHECK_TIMEOUT} с"}
+            except Exception as e:
+                result = {"status": "error", "error": str(e)}
+
+            result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            result["checked_at"] = datetime.utcnow().isoformat()
+            self._result = result
+            self._expires_at = time.monotonic() + self.ttl
+            return result
+
+
+async def _check_database():
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def _check_blockchain():
+    service = get_blockchain_service()
+    if service.web3 is None:
+        return {"status": "mock"}
+    if not await run_in_threadpool(service.is_available):
+        raise ConnectionError("Нода блокчейна недоступна")
+
+
+async def _check_credit_data_service():
+    await run_in_threadpool(credit_data_client.health, settings.HEALTH_CHECK_TIMEOUT)
+
+
+async def _estimate_users():
+    """Оценка числа пользователей по статистике планировщика, без COUNT(*)"""
+    async with async_engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            estimate = (await conn.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass('users')")
+            )).scalar()
+            if estimate is None:
+                raise LookupError("Таблица users не найдена")
+            # -1: таблицу еще ни разу не анализировали
+            return {"users_estimate": estimate if estimate >= 0 else None}
+
+        # SQLite (локальная разработка) - статистики нет, таблицы маленькие
+        return {"users_estimate": (await conn.execute(text("SELECT COUNT(*) FROM users"))).scalar()}
+
+
+checks = {
+    "database": CachedCheck("database", _check_database),
+    "blockchain": CachedCheck("blockchain", _check_blockchain),
+    "credit_data_service": CachedCheck("credit_data_service", _check_credit_data_service),
+}
+users_estimate = CachedCheck("users_estimate", _estimate_users)
+
+
+async def readiness() -> Dict[str, Any]:
+    names = list(checks)
+    results = dict(zip(names, await asyncio.gather(*(checks[name].get() for name in names))))
+    ready = all(results[name]["status"] in HEALTHY_STATUSES for name in settings.READINESS_REQUIRED_CHECKS if name in results)
+    degraded = any(result["status"] == "error" for result in results.values())
+    return {
+        "status": "ready" if ready and not degraded else ("degraded" if ready else "not_ready"),
+        "ready": ready,
+        "checks": results
+    }
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+import logging
+
+from sqlalchemy import func, select, or_, and_
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.credit import CreditRequest
+
+logger = logging.getLogger(__name__)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobQueue:
+    """Очередь задач поверх таблицы в БД.
+
+    Задача - строка таблицы с колонками status/attempts/available_at/locked_by/locked_until.
+    Воркеры забирают задачи через SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+    несколько процессов не получат одну и ту же задачу. Если воркер упал,
+    задача снова станет доступна после visibility timeout.
+    """
+
+    def __init__(
+            self,
+            model,
+            visibility_timeout: int = settings.JOB_VISIBILITY_TIMEOUT,
+            max_attempts: int = settings.JOB_MAX_ATTEMPTS,
+            retry_backoff: int = settings.JOB_RETRY_BACKOFF
+    ):
+        self.model = model
+        self.visibility_timeout = timedelta(seconds=visibility_timeout)
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+    def claim(self, db: Session, worker_id: str, limit: int = 1) -> List:
+        """Забрать до limit задач в работу"""
+        model = self.model
+        now = utcnow()
+
+        ready = and_(
+            model.status == "pending",
+            or_(model.available_at.is_(None), model.available_at <= now)
+        )
+        # Воркер взял задачу и пропал - lease истек
+        expired = and_(model.status == "processing", model.locked_until < now)
+
+        jobs = db.execute(
+            select(model)
+            .where(or_(ready, expired))
+            .order_by(model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+
+        claimed = []
+        for job in jobs:
+            if job.attempts >= self.max_attempts:
+                job.status = "failed"
+                job.last_error = job.last_error or "Истек visibility timeout"
+                job.locked_by = None
+                job.locked_until = None
+                job.completed_at = now
+                logger.error(f"Задача {model.__tablename__}#{job.id} исчерпала попытки")
+                continue
+
+            job.status = "processing"
+            job.attempts += 1
+            job.locked_by = worker_id
+            job.locked_until = now + self.visibility_timeout
+            claimed.append(job)
+
+        db.commit()
+        return claimed
+
+    def complete(self, db: Session, job):
+        job.status = "completed"
+        job.locked_by = None
+        job.locked_until = None
+        job.completed_at = utcnow()
+        db.commit()
+
+    def fail(self, db: Session, job, error: str):
+        """Вернуть задачу в очередь с экспоненциальной задержкой или пометить failed"""
+        job.last_error = error[:1000]
+        job.locked_by = None
+        job.locked_until = None
+
+        if job.attempts >= self.max_attempts:
+            job.status = "failed"
+            job.completed_at = utcnow()
+            logger.error(f"Задача {self.model.__tablename__}#{job.id} не выполнена: {error}")
+        else:
+            delay = self.retry_backoff * 2 ** (job.attempts - 1)
+            job.status = "pending"
+            job.available_at = utcnow() + timedelta(seconds=delay)
+            logger.warning(
+                f"Задача {self.model.__tablename__}#{job.id} упала (попытка {job.attempts}), "
+                f"повтор через {delay} с: {error}"
+            )
+
+        db.commit()
+
+    def depth(self, db: Session) -> Dict[str, int]:
+        """Число задач в очереди и в работе (по индексу status)"""
+        model = self.model
+        rows = db.execute(
+            select(model.status, func.count())
+            .where(model.status.in_(("pending", "processing")))
+            .group_by(model.status)
+        ).all()
+        return {"pending": 0, "processing": 0, **{status: count for status, count in rows}}
+
+
+credit_request_queue = JobQueue(CreditRequest)
+
+
+def queue_depth() -> Dict[tuple, float]:
+    """Глубина очередей для /metrics: {(очередь, статус): число задач}"""
+    db = SessionLocal()
+    try:
+        return {("credit_requests", status): count for status, count in credit_request_queue.depth(db).items()}
+    finally:
+        db.close()
@@ -0,0 +1,132 @@
+"""Read model "последний отчет пользователя" (таблица user_latest_scores).
+
+Каждая вставка CreditReport должна в той же транзакции выполнить latest_score_upsert,
+тогда /score и /blockchain-rating читают одну строку по user_id вместо
+ORDER BY created_at DESC LIMIT 1 по credit_reports. Перед таблицей - кеш в памяти процесса.
+Пользователи, у которых отчеты появились до read model, дозаполняются при первом чтении.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from ..config import settings
+from ..models.credit import CreditReport, UserLatestScore
+from .cache import TTLCache
+
+LATEST_SCORE_FIELDS = (
+    "score", "score_category", "reputation_score",
+    "blockchain_hash", "transaction_hash", "block_number", "created_at"
+)
+
+latest_score_cache = TTLCache(max_size=settings.LATEST_SCORE_CACHE_SIZE, ttl=settings.LATEST_SCORE_CACHE_TTL)
+
+
+def _upsert(db, values):
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(UserLatestScore).values(**values)
+    columns = [column.name for column in UserLatestScore.__table__.columns if column.name != "user_id"]
+    return stmt.on_conflict_do_update(
+        index_elements=[UserLatestScore.user_id],
+        set_={column: stmt.excluded[column] for column in columns},
+        where=UserLatestScore.report_id <= stmt.excluded.report_id
+    )
+
+
+def latest_score_upsert(db, report: CreditReport, created_at=None):
+    """Upsert строки read model по отчету (у report уже должен быть id - после flush).
+
+    Возвращает statement: вызывающий выполняет его в своей сессии (Session или AsyncSession),
+    в той же транзакции, что и отчет. Более старый отчет не затирает более новый.
+    """
+    return _upsert(db, {
+        "user_id": report.user_id,
+        "report_id": report.id,
+        "score": report.score,
+        "score_category": report.score_category,
+        "reputation_score": report.reputation_score,
+        "blockchain_hash": report.blockchain_hash,
+        "transaction_hash": report.transaction_hash,
+        "block_number": report.block_number,
+        # В той же транзакции now() совпадает с server_default created_at отчета
+        "created_at": created_at if created_at is not None else func.now()
+    })
+
+
+def latest_score_upsert_many(db, rows: List[Dict[str, Any]]) -> Tuple[Any, List[Dict[str, Any]]]:
+    """То же для пакета отчетов: rows - словари с колонками UserLatestScore без created_at.
+
+    Возвращает (statement, параметры) для executemany: db.execute(*latest_score_upsert_many(db, rows)).
+    Из нескольких отчетов одного пользователя берется отчет с большим report_id.
+    """
+    latest: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        current = latest.get(row["user_id"])
+        if current is None or row["report_id"] > current["report_id"]:
+            latest[row["user_id"]] = row
+    return _upsert(db, {"created_at": func.now()}), list(latest.values())
+
+
+def latest_score_anchored(report_ids, transaction_hash: str, block_number: int):
+    """Обновление транзакции после пакетной записи в блокчейн (services/anchoring.py)"""
+    return (
+        update(UserLatestScore)
+        .where(UserLatestScore.report_id.in_(report_ids))
+        .values(transaction_hash=transaction_hash, block_number=block_number)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _to_dict(row) -> Dict[str, Any]:
+    data = {field: getattr(row, field) for field in LATEST_SCORE_FIELDS}
+    data["id"] = row.report_id if isinstance(row, UserLatestScore) else row.id
+    return data
+
+
+def _latest_report_query(user_id: int):
+    return select(CreditReport).where(
+        CreditReport.user_id == user_id
+    ).order_by(CreditReport.created_at.desc(), CreditReport.id.desc()).limit(1)
+
+
+def get_latest_score(db: Session, user_id: int) -> Optional[Dict[str, Any]]:
+    """Последний отчет пользователя (поля CreditScoreResponse) или None"""
+    cached = latest_score_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    row = db.get(UserLatestScore, user_id)
+    if row is None:
+        report = db.execute(_latest_report_query(user_id)).scalars().first()
+        if report is None:
+            return None  # Отсутствие не кешируем: отчет может появиться в любой момент
+        db.execute(latest_score_upsert(db, report, created_at=report.created_at))
+        db.commit()
+        row = report
+
+    data = _to_dict(row)
+    latest_score_cache.set(user_id, data)
+    return data
+
+
+async def get_latest_score_async(db: AsyncSession, user_id: int) -> Optional[Dict[str, Any]]:
+    cached = latest_score_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    row = await db.get(UserLatestScore, user_id)
+    if row is None:
+        report = (await db.execute(_latest_report_query(user_id))).scalars().first()
+        if report is None:
+            return None
+        await db.execute(latest_score_upsert(db, report, created_at=report.created_at))
+        await db.commit()
+        row = report
+
+    data = _to_dict(row)
+    latest_score_cache.set(user_id, data)
+    return data
@@ -0,0 +1,67 @@
+"""Дерево Меркла для пакетной записи хешей отчетов в блокчейн.
+
+В блокчейн уходит только корень, каждый отчет хранит путь (proof) от своего листа до корня.
+Листы и узлы хешируются с разными префиксами, чтобы внутренний узел нельзя было выдать за лист.
+Непарный узел уровня поднимается на следующий уровень без изменений.
+"""
+import hashlib
+from typing import Dict, List
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def hash_leaf(data_hash: str) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + bytes.fromhex(data_hash)).digest()
+
+
+def hash_node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_tree(data_hashes: List[str]) -> List[List[bytes]]:
+    """Уровни дерева от листьев (0) до корня (последний)"""
+    if not data_hashes:
+        raise ValueError("Нельзя построить дерево без листьев")
+
+    levels = [[hash_leaf(h) for h in data_hashes]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parent = [hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parent.append(level[-1])
+        levels.append(parent)
+    return levels
+
+
+def merkle_root(levels: List[List[bytes]]) -> str:
+    return levels[-1][0].hex()
+
+
+def merkle_proof(levels: List[List[bytes]], index: int) -> List[Dict[str, str]]:
+    """Соседние хеши от листа index до корня: [{"hash": ..., "side": "left" | "right"}]"""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({
+                "hash": level[sibling].hex(),
+                "side": "left" if sibling < index else "right"
+            })
+        index //= 2
+    return proof
+
+
+def verify_proof(data_hash: str, proof: List[Dict[str, str]], root: str) -> bool:
+    """Проверка, что data_hash входит в дерево с корнем root"""
+    try:
+        node = hash_leaf(data_hash)
+        for step in proof:
+            sibling = bytes.fromhex(step["hash"])
+            if step["side"] == "left":
+                node = hash_node(sibling, node)
+            else:
+                node = hash_node(node, sibling)
+        return node.hex() == root
+    except (ValueError, KeyError, TypeError):
+        return False
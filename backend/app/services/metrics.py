@@ -0,0 +1,344 @@
+"""Метрики процесса в текстовом формате Prometheus (/metrics).
+
+Счетчики и гистограммы шардируются по потокам: каждый поток пишет в свой словарь
+без блокировок, /metrics суммирует шарды при чтении. Gauge считаются в момент
+чтения функциями-сборщиками (дорогие - не чаще раза в ttl секунд). Метрики - на процесс: при нескольких воркерах uvicorn
+Prometheus опрашивает каждый процесс (метка instance).
+"""
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence
+import logging
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Секунды: от быстрого ответа из кеша до таймаута внешнего сервиса
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Sharded(ABC):
+    """Базовый класс: по словарю значений на поток"""
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            # Блокировка только при первом обращении потока
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self) -> List[dict]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict.copy атомарен под GIL: поток-владелец может писать в шард параллельно
+        return [shard.copy() for shard in shards]
+
+    @abstractmethod
+    def collect(self) -> List[str]:
+        """Строки метрики в формате Prometheus, шарды всех потоков сложены"""
+
+
+class Counter(_Sharded):
+    type_name = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def collect(self) -> List[str]:
+        totals: Dict[tuple, float] = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in sorted(totals.items())]
+
+
+class Histogram(_Sharded):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # [счетчики корзин..., +Inf, сумма]
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def collect(self) -> List[str]:
+        totals: Dict[tuple, list] = {}
+        for shard in self._snapshots():
+            for labels, state in shard.items():
+                total = totals.setdefault(labels, [0] * len(state))
+                for i, value in enumerate(list(state)):
+                    total[i] += value
+
+        lines = []
+        for labels, state in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(state[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Значение считается при чтении: collect_fn возвращает {(значения меток...): число}.
+
+    ttl > 0 - результат collect_fn переиспользуется ttl секунд: запрос к БД в сборщике
+    выполняется не на каждый опрос Prometheus (и не на каждую реплику Prometheus).
+    """
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], collect_fn: Callable[[], Dict[tuple, float]], ttl: float = 0):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect_fn = collect_fn
+        self.ttl = ttl
+        self._values: Optional[Dict[tuple, float]] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _collect_values(self) -> Dict[tuple, float]:
+        if self.ttl <= 0:
+            return self.collect_fn()
+        if self._values is not None and time.monotonic() < self._expires_at:
+            return self._values
+        with self._lock:
+            # Пока ждали, значения мог собрать параллельный опрос
+            if self._values is None or time.monotonic() >= self._expires_at:
+                self._values = self.collect_fn()
+                self._expires_at = time.monotonic() + self.ttl
+            return self._values
+
+    def collect(self) -> List[str]:
+        try:
+            values = self._collect_values()
+        except Exception as e:
+            logger.warning(f"Не удалось собрать метрику {self.name}: {e}")
+            return []
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in sorted(values.items())]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str], collect_fn: Callable[[], Dict[tuple, float]], ttl: float = 0) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, collect_fn, ttl))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Опросы Prometheus не пишем в лог
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """/metrics процесса без FastAPI (воркер) в фоновом потоке. None - порт занят"""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Не удалось открыть порт метрик {port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Метрики процесса: http://{host}:{server.server_port}/metrics")
+    return server
+
+http_requests_total = registry.counter(
+    "trustflow_http_requests_total", "HTTP запросы по маршруту и коду ответа", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "trustflow_http_request_duration_seconds", "Время обработки HTTP запроса", ("method", "route")
+)
+db_pool_connection_hold = registry.histogram(
+    "trustflow_db_pool_connection_hold_seconds", "Время от выдачи соединения из пула БД до возврата", ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+)
+db_pool_checkouts = registry.counter(
+    "trustflow_db_pool_checkouts_total", "Выдачи соединений из пула БД", ("engine",)
+)
+db_pool_connects = registry.counter(
+    "trustflow_db_pool_connects_total", "Новые соединения с БД (рост - пул мал или соединения рвутся)", ("engine",)
+)
+external_request_duration = registry.histogram(
+    "trustflow_external_request_duration_seconds", "HTTP запросы к внешним сервисам", ("client",)
+)
+external_request_errors = registry.counter(
+    "trustflow_external_request_errors_total", "Ошибки запросов к внешним сервисам (исключение или код >= 400)", ("client",)
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: счетчик и гистограмма времени по шаблону маршрута (/score/{report_id}, а не /score/42)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[object, str] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            for candidate in scope["app"].routes:
+                if getattr(candidate, "endpoint", None) is endpoint:
+                    route = candidate.path
+                    break
+            route = self._routes[endpoint] = route or "unknown"
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route(scope)
+            http_request_duration.observe(time.perf_counter() - started, scope["method"], route)
+            http_requests_total.inc(scope["method"], route, str(status))
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter для requests.Session: время и ошибки каждого запроса с меткой client"""
+
+    def __init__(self, client: str, *args, **kwargs):
+        self.client = client
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = super().send(request, *args, **kwargs)
+        except Exception:
+            external_request_errors.inc(self.client)
+            raise
+        finally:
+            external_request_duration.observe(time.perf_counter() - started, self.client)
+        if response.status_code >= 400:
+            external_request_errors.inc(self.client)
+        return response
+
+
+_pools: Dict[str, object] = {}
+
+
+def _pool_state() -> Dict[tuple, float]:
+    state = {}
+    for name, engine in _pools.items():
+        for key in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(engine.pool, key, None)
+            if callable(method):
+                state[(name, key)] = method()
+    return state
+
+
+db_pool_connections = registry.gauge(
+    "trustflow_db_pool_connections", "Соединения пула БД по состоянию", ("engine", "state"), _pool_state
+)
+
+
+def instrument_pool(engine, name: str):
+    """Метрики пула движка через события пула; для AsyncEngine передается async_engine.sync_engine.
+
+    Насыщение пула видно по trustflow_db_pool_connections (checkedout, overflow) и по времени
+    удержания соединений: долгие checkout -> checkin и есть причина ожидания в очереди пула.
+    """
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        db_pool_connects.inc(name)
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        db_pool_checkouts.inc(name)
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is not None:
+            db_pool_connection_hold.observe(time.perf_counter() - started, name)
+
+    _pools[name] = engine
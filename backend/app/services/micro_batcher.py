@@ -0,0 +1,161 @@
+"""Микро-батчинг вызовов векторной функции из многих потоков.
+
+Потоки вызывают submit(item) и ждут результат. Фоновый поток берет все элементы,
+уже стоящие в очереди (до max_batch_size), при linger_ms > 0 еще ждет пополнения
+пакета до linger_ms с первого элемента, вызывает batch_fn(items) один раз и раздает
+результаты ожидающим. Каждый future получает результат или исключение - в том числе
+когда batch_fn вернул не столько результатов, сколько элементов.
+Очередь ограничена: сверх max_queue submit сразу падает с BatcherOverloaded.
+Размеры пакетов и ожидание в очереди - в stats() и на /metrics (метка batcher=name).
+Выигрыш от linger - benchmarks/micro_batcher.py.
+"""
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import logging
+import queue
+import threading
+import time
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы размеров пакетов; пакеты больше 1024 попадают в +Inf
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+batch_size_metric = registry.histogram(
+    "trustflow_micro_batch_size", "Элементов в пакете микро-батчера", ("batcher",), buckets=BATCH_SIZE_BUCKETS
+)
+queue_delay_metric = registry.histogram(
+    "trustflow_micro_batch_queue_delay_seconds", "Ожидание элемента в очереди микро-батчера до запуска пакета", ("batcher",)
+)
+rejected_metric = registry.counter(
+    "trustflow_micro_batch_rejected_total", "Элементы, отклоненные микро-батчером из-за переполнения очереди", ("batcher",)
+)
+
+
+class BatcherOverloaded(Exception):
+    pass
+
+
+class MicroBatcher:
+    def __init__(
+            self,
+            batch_fn: Callable[[List[Any]], Sequence[Any]],
+            max_batch_size: int = 64,
+            linger_ms: float = 0,
+            max_queue: int = 10_000,
+            name: str = "micro-batcher"
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.linger = linger_ms / 1000
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # Метрики
+        self._metrics_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.batch_size_histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS + (float("inf"),)}
+        self._delays_ms = deque(maxlen=10_000)  # Ожидание в очереди до запуска пакета
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except queue.Full:
+            with self._metrics_lock:
+                self.rejected += 1
+            rejected_metric.inc(self.name)
+            raise BatcherOverloaded(f"{self.name}: очередь переполнена")
+        return future
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Отправить элемент и дождаться результата.
+
+        concurrent.futures.TimeoutError, если результата нет за timeout секунд:
+        элемент снимается с очереди, если пакет с ним еще не запущен.
+        """
+        future = self.submit(item)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.linger
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # После linger забираем только то, что уже в очереди
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Отмененные по таймауту элементы не считаем
+            batch = [entry for entry in self._collect() if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            self._record(len(batch), [(started - enqueued) * 1000 for _, _, enqueued in batch])
+
+            try:
+                results = list(self.batch_fn([item for item, _, _ in batch]))
+                if len(results) != len(batch):
+                    raise ValueError(f"batch_fn вернул {len(results)} результатов на {len(batch)} элементов")
+            except Exception as e:
+                logger.error(f"{self.name}: ошибка пакета из {len(batch)} элементов: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def _record(self, size: int, delays_ms: List[float]):
+        bucket = next((b for b in BATCH_SIZE_BUCKETS if size <= b), float("inf"))
+        with self._metrics_lock:
+            self.batches += 1
+            self.items += size
+            self.batch_size_histogram[bucket] += 1
+            self._delays_ms.extend(delays_ms)
+        batch_size_metric.observe(size, self.name)
+        for delay_ms in delays_ms:
+            queue_delay_metric.observe(delay_ms / 1000, self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            delays = sorted(self._delays_ms)
+            histogram = dict(self.batch_size_histogram)
+            batches, items, rejected = self.batches, self.items, self.rejected
+
+        percentile = lambda q: round(delays[min(len(delays) - 1, int(q / 100 * len(delays)))], 3) if delays else None
+        return {
+            "batches": batches,
+            "items": items,
+            "rejected": rejected,
+            "queue_size": self._queue.qsize(),
+            "avg_batch_size": round(items / batches, 2) if batches else None,
+            "batch_size_histogram": {
+                ("+Inf" if bucket == float("inf") else f"<={bucket}"): count for bucket, count in histogram.items()
+            },
+            "queue_delay_ms": {"p50": percentile(50), "p95": percentile(95), "p99": percentile(99), "max": round(delays[-1], 3) if delays else None},
+        }
@@ -0,0 +1,52 @@
+"""Keyset пагинация по (created_at, id) от новых к старым.
+
+Следующая страница выбирается условием (created_at, id) < (курсор), а не OFFSET:
+запрос идет по индексу (user_id, created_at DESC, id DESC) и стоит одинаково
+на первой и на тысячной странице. Курсор для клиента непрозрачный (base64).
+"""
+from datetime import datetime
+from typing import List, Optional, Tuple
+import base64
+
+from sqlalchemy import String, literal, tuple_
+from sqlalchemy.orm import Query
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """ValueError, если курсор поврежден"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Некорректный курсор") from e
+
+
+def _cursor_timestamp(query: Query, created_at: datetime):
+    if query.session.get_bind().dialect.name == "sqlite":
+        # SQLite хранит время строкой CURRENT_TIMESTAMP, а параметр DateTime биндится
+        # с микросекундами - строки не равны, и курсорная запись попала бы на следующую страницу
+        fmt = "%Y-%m-%d %H:%M:%S.%f" if created_at.microsecond else "%Y-%m-%d %H:%M:%S"
+        return literal(created_at.strftime(fmt), String)
+    return created_at
+
+
+def paginate(query: Query, model, cursor: Optional[str], limit: int) -> Tuple[List, Optional[str]]:
+    """Страница записей query и курсор следующей (None - записей больше нет)"""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(model.created_at, model.id) < tuple_(_cursor_timestamp(query, created_at), row_id)
+        )
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
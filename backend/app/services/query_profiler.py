@@ -0,0 +1,149 @@
+"""Профилирование SQL по запросам к API на событиях движков SQLAlchemy.
+
+На каждый HTTP запрос заводится QueryProfile (contextvar): число запросов к БД,
+суммарное время, самые медленные выражения и повторы одного и того же выражения
+(признак N+1). Медленные выражения пишутся в лог с выборкой SQL_SLOW_QUERY_SAMPLE_RATE,
+значения параметров в лог не попадают - только их типы. Заменяет echo=True.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+import heapq
+import logging
+import random
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_current_profile: ContextVar[Optional["QueryProfile"]] = ContextVar("query_profile", default=None)
+
+
+def _short(statement: str, limit: int = 300) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def _redact_value(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters: Any, executemany: bool = False) -> Any:
+    """Параметры выражения без значений: {'email': '<str len=17>'}"""
+    if executemany:
+        rows = list(parameters or ())
+        return {"executemany": len(rows), "first": redact_parameters(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+class QueryProfile:
+    def __init__(self, name: str, top: int = settings.SQL_PROFILE_TOP):
+        self.name = name
+        self.top = top
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: Dict[str, int] = {}
+        self._slowest: List[Tuple[float, int, str]] = []  # min-heap (ms, порядковый номер, выражение)
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        item = (elapsed_ms, self.count, statement)
+        if len(self._slowest) < self.top:
+            heapq.heappush(self._slowest, item)
+        elif elapsed_ms > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    @property
+    def slowest(self) -> List[Tuple[float, str]]:
+        return [(ms, statement) for ms, _, statement in sorted(self._slowest, reverse=True)]
+
+    def repeated(self, threshold: int = settings.SQL_N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """Выражения, выполненные threshold и более раз за запрос - вероятный N+1"""
+        return sorted(
+            ((statement, count) for statement, count in self.statements.items() if count >= threshold),
+            key=lambda item: -item[1]
+        )
+
+    def summary(self) -> dict:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.total_ms, 2),
+            "slowest": [{"ms": round(ms, 2), "statement": _short(statement)} for ms, statement in self.slowest],
+            "n_plus_one": [{"count": count, "statement": _short(statement)} for statement, count in self.repeated()],
+        }
+
+    def header(self) -> str:
+        """Значение заголовка X-DB-Profile"""
+        value = f"queries={self.count}; db_ms={self.total_ms:.1f}"
+        repeated = self.repeated()
+        if repeated:
+            value += f"; n_plus_one={repeated[0][1]}x"
+        return value
+
+    def report(self):
+        """Лог по итогам запроса: предупреждение о N+1"""
+        for statement, count in self.repeated():
+            logger.warning(f"Возможный N+1 в {self.name}: выражение выполнено {count} раз: {_short(statement)}")
+
+
+def current_profile() -> Optional[QueryProfile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_queries(name: str):
+    """Собирает профиль SQL выражений, выполненных внутри блока (в том числе в threadpool и async сессиях)"""
+    profile = QueryProfile(name)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, elapsed_ms)
+
+    if elapsed_ms >= settings.SQL_SLOW_QUERY_MS and random.random() < settings.SQL_SLOW_QUERY_SAMPLE_RATE:
+        logger.warning(
+            f"Медленный SQL ({elapsed_ms:.1f} мс{', ' + profile.name if profile else ''}): {_short(statement, 1000)} "
+            f"параметры: {redact_parameters(parameters, executemany)}"
+        )
+
+
+def _handle_error(exception_context):
+    # Выражение упало: снимаем отметку времени, иначе стек разъедется
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine: Engine):
+    """Подписка на события движка; для AsyncEngine передается async_engine.sync_engine"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,130 @@
+"""Детерминированный расчет кредитного скора по 12 признакам credit_data_service.
+
+Каждый признак переводится в "качество" от 0 (плохо) до 1 (хорошо), вклад признака в
+баллах = вес * (качество - 0.5). Скор = 575 + сумма вкладов, в пределах 300..850.
+Вклады аддитивны и сохраняются в отчете как факторы. Матрица признаков (n, 12)
+считается за один векторный проход; score_features - обертка для одного пользователя.
+"""
+from typing import Dict, Iterable, List, Mapping, Sequence
+
+import numpy as np
+
+# Порядок столбцов совпадает с CreditDataGenerator.FEATURES
+FEATURES = (
+    "INCOME", "SAVINGS", "R_SAVINGS_INCOME", "T_EXPENDITURE_12",
+    "R_EXPENDITURE_INCOME", "CAT_DEPENDENTS", "T_TAX_12", "DEBT",
+    "R_DEBT_INCOME", "R_DEBT_SAVINGS", "CAT_DEBT", "HAS_HISTORY",
+)
+
+# Баллы, на которые признак может сдвинуть скор от середины (сумма = 550 = 850 - 300)
+WEIGHTS = {
+    "INCOME": 80,
+    "SAVINGS": 60,
+    "R_SAVINGS_INCOME": 40,
+    "T_EXPENDITURE_12": 10,
+    "R_EXPENDITURE_INCOME": 60,
+    "CAT_DEPENDENTS": 15,
+    "T_TAX_12": 35,
+    "DEBT": 50,
+    "R_DEBT_INCOME": 90,
+    "R_DEBT_SAVINGS": 50,
+    "CAT_DEBT": 10,
+    "HAS_HISTORY": 50,
+}
+
+# Верхние границы денежных признаков (диапазоны генератора) для логарифмической шкалы
+MONEY_SCALE = {
+    "INCOME": 662094,
+    "SAVINGS": 2911863,
+    "T_EXPENDITURE_12": 472924,
+    "T_TAX_12": 17013,
+    "DEBT": 5968620,
+}
+
+MIN_SCORE = 300
+MAX_SCORE = 850
+BASE_SCORE = (MIN_SCORE + MAX_SCORE) / 2
+
+# Границы категорий - как в determine_category
+CATEGORY_THRESHOLDS = ((720, "excellent"), (680, "good"), (620, "fair"), (580, "poor"))
+DEFAULT_CATEGORY = "bad"
+
+
+class ScoringEngine:
+    def __init__(self, weights: Mapping[str, float] = WEIGHTS):
+        self.weights = np.array([weights[name] for name in FEATURES], dtype=np.float64)
+        self._index = {name: i for i, name in enumerate(FEATURES)}
+
+    def _quality(self, X: np.ndarray) -> np.ndarray:
+        """Признаки -> качество 0..1 (1 - лучше для заемщика)"""
+        col = lambda name: X[:, self._index[name]]
+        log_scale = lambda name: np.clip(np.log1p(np.maximum(col(name), 0)) / np.log1p(MONEY_SCALE[name]), 0, 1)
+        saturate = lambda x: np.maximum(x, 0) / (1 + np.maximum(x, 0))
+
+        quality = np.empty_like(X, dtype=np.float64)
+        quality[:, self._index["INCOME"]] = log_scale("INCOME")
+        quality[:, self._index["SAVINGS"]] = log_scale("SAVINGS")
+        quality[:, self._index["R_SAVINGS_INCOME"]] = saturate(col("R_SAVINGS_INCOME"))
+        quality[:, self._index["T_EXPENDITURE_12"]] = 1 - log_scale("T_EXPENDITURE_12")
+        quality[:, self._index["R_EXPENDITURE_INCOME"]] = 1 - np.clip(col("R_EXPENDITURE_INCOME"), 0, 2) / 2
+        quality[:, self._index["CAT_DEPENDENTS"]] = 1 - np.clip(col("CAT_DEPENDENTS"), 0, 1)
+        quality[:, self._index["T_TAX_12"]] = log_scale("T_TAX_12")
+        quality[:, self._index["DEBT"]] = 1 - log_scale("DEBT")
+        quality[:, self._index["R_DEBT_INCOME"]] = 1 - np.clip(col("R_DEBT_INCOME"), 0, 5) / 5
+        quality[:, self._index["R_DEBT_SAVINGS"]] = 1 - saturate(col("R_DEBT_SAVINGS"))
+        quality[:, self._index["CAT_DEBT"]] = 1 - np.clip(col("CAT_DEBT"), 0, 1)
+        quality[:, self._index["HAS_HISTORY"]] = np.clip(col("HAS_HISTORY"), 0, 1)
+        return quality
+
+    def score_matrix(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        """Скоринг матрицы признаков (n, 12) в порядке FEATURES.
+
+        Возвращает score (int), category (str), reputation_score (float)
+        и contributions (n, 12) - вклад каждого признака в баллах.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(FEATURES):
+            raise ValueError(f"Ожидается матрица (n, {len(FEATURES)}), получено {X.shape}")
+
+        contributions = (self._quality(X) - 0.5) * self.weights
+        score = np.clip(np.rint(BASE_SCORE + contributions.sum(axis=1)), MIN_SCORE, MAX_SCORE).astype(np.int64)
+        category = np.select(
+            [score >= threshold for threshold, _ in CATEGORY_THRESHOLDS],
+            [name for _, name in CATEGORY_THRESHOLDS],
+            default=DEFAULT_CATEGORY
+        )
+        return {
+            "score": score,
+            "category": category,
+            "reputation_score": score / MAX_SCORE,
+            "contributions": contributions,
+        }
+
+    def score_many(self, rows: Sequence[Mapping[str, float]]) -> List[dict]:
+        """Скоринг списка словарей признаков одним векторным вызовом, результат - по словарю на строку"""
+        result = self.score_matrix(features_to_matrix(rows))
+        contributions = np.round(result["contributions"], 1).tolist()
+        return [
+            {
+                "score": score,
+                "category": category,
+                "reputation_score": reputation_score,
+                "factors": dict(zip(FEATURES, factors)),
+            }
+            for score, category, reputation_score, factors in zip(
+                result["score"].tolist(), result["category"].tolist(),
+                result["reputation_score"].tolist(), contributions
+            )
+        ]
+
+    def score_features(self, features: Mapping[str, float]) -> dict:
+        """Скоринг одного пользователя: словарь признаков -> результат в формате отчета"""
+        return self.score_many([features])[0]
+
+
+def features_to_matrix(rows: Iterable[Mapping[str, float]]) -> np.ndarray:
+    """Список словарей признаков -> матрица (n, 12); отсутствующий признак = 0"""
+    return np.array([[row.get(name, 0) or 0 for name in FEATURES] for row in rows], dtype=np.float64).reshape(-1, len(FEATURES))
+
+
+scoring_engine = ScoringEngine()
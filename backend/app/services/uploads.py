@@ -0,0 +1,58 @@
+"""Потоковое сохранение загруженных файлов.
+
+Файл читается один раз кусками по UPLOAD_CHUNK_SIZE: каждый кусок сразу пишется на диск
+(aiofiles) и добавляется в SHA-256, поэтому память не зависит от размера файла,
+а хеш и размер готовы без повторного чтения. Запись идет во временный файл рядом
+с целевым и переименовывается только после успешного чтения целиком.
+"""
+from typing import Tuple
+import hashlib
+import os
+import uuid
+
+import aiofiles
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from ..config import settings
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_size: int):
+        super().__init__(f"Файл больше {max_size} байт")
+        self.max_size = max_size
+
+
+async def save_upload(
+        upload: UploadFile,
+        path: str,
+        max_size: int = settings.MAX_FILE_SIZE,
+        chunk_size: int = settings.UPLOAD_CHUNK_SIZE
+) -> Tuple[int, str]:
+    """Сохраняет upload в path, возвращает (размер, sha256 hex).
+
+    UploadTooLarge - как только прочитано больше max_size байт; частичный файл удаляется.
+    """
+    # Starlette уже знает размер тела части - слишком большой файл отклоняем без чтения
+    if upload.size is not None and upload.size > max_size:
+        raise UploadTooLarge(max_size)
+
+    sha256 = hashlib.sha256()
+    size = 0
+    tmp_path = f"{path}.{uuid.uuid4().hex}.part"  # Параллельные загрузки в один path не мешают друг другу
+    try:
+        async with aiofiles.open(tmp_path, "wb") as buffer:
+            while chunk := await upload.read(chunk_size):
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(max_size)
+                # hashlib отпускает GIL на больших кусках - считаем вне event loop
+                await run_in_threadpool(sha256.update, chunk)
+                await buffer.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return size, sha256.hexdigest()
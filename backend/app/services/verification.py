@@ -0,0 +1,104 @@
+"""Офлайн проверка кредитных отчетов по proof дерева Меркла.
+
+Отчет проверяется локально: хеш содержимого -> proof -> корень. В блокчейн ходим только
+чтобы убедиться, что контракт действительно записал этот корень, и результат кешируется:
+не больше одного чтения из блокчейна на корень за время жизни процесса.
+Без подключенного блокчейна корень не проверяется и отчет не считается подтвержденным.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import json
+import threading
+import time
+
+from ..models.blockchain import BlockchainRecord
+from ..models.credit import CreditReport
+from .anchoring import generate_blockchain_hash
+from .blockchain_service import get_blockchain_service
+from .merkle import verify_proof
+
+
+class AnchoredRootCache:
+    """Подтвержденные в блокчейне корни Меркла (LRU)"""
+
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = max_size
+        self._roots: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, merkle_root: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            anchor = self._roots.get(merkle_root)
+            if anchor is None:
+                self.misses += 1
+                return None
+            self._roots.move_to_end(merkle_root)
+            self.hits += 1
+            return anchor
+
+    def put(self, merkle_root: str, anchor: Dict[str, Any]):
+        with self._lock:
+            self._roots[merkle_root] = anchor
+            self._roots.move_to_end(merkle_root)
+            while len(self._roots) > self.max_size:
+                self._roots.popitem(last=False)
+
+    def is_anchored(self, merkle_root: str, transaction_hash: Optional[str]) -> Optional[bool]:
+        if self.get(merkle_root) is not None:
+            return True
+
+        anchored = get_blockchain_service().is_root_anchored(merkle_root, transaction_hash)
+        # Кешируем только подтверждение: неподтвержденный корень может появиться позже
+        if anchored:
+            self.put(merkle_root, {"transaction_hash": transaction_hash, "checked_at": time.time()})
+        return anchored
+
+
+anchored_roots = AnchoredRootCache()
+
+
+def verify_report_proof(report: CreditReport, record: Optional[BlockchainRecord]) -> Dict[str, Any]:
+    """Проверка отчета по сохраненному proof и закешированному корню"""
+    started = time.perf_counter()
+    details: Dict[str, Any] = {"mode": "proof"}
+
+    try:
+        # Хеш содержимого отчета: совпадает с записанным, если отчет в БД не меняли
+        content_hash = generate_blockchain_hash(json.loads(report.report_data or "{}"))
+    except (TypeError, ValueError):
+        content_hash = None
+    details["content_matches"] = content_hash == report.blockchain_hash
+
+    if record is None or record.anchor_status != "anchored":
+        details.update({
+            "verified": False,
+            "status": "pending",
+            "message": "Хеш отчета еще не записан в блокчейн, ожидает пакета"
+        })
+        return details
+
+    details["proof_valid"] = (
+        record.data_hash == report.blockchain_hash
+        and verify_proof(record.data_hash, record.merkle_proof or [], record.merkle_root)
+    )
+    details["root_anchored"] = anchored_roots.is_anchored(record.merkle_root, record.transaction_hash)
+    if details["root_anchored"] is None:
+        message = "Блокчейн недоступен, запись корня Меркла не проверена"
+    elif not details["root_anchored"]:
+        message = "Корень Меркла не найден в контракте"
+    elif not (details["content_matches"] and details["proof_valid"]):
+        message = "Отчет не соответствует записанному хешу"
+    else:
+        message = "Отчет подтвержден по proof и корню Меркла в блокчейне"
+    details.update({
+        "verified": bool(details["content_matches"] and details["proof_valid"] and details["root_anchored"]),
+        "message": message,
+        "status": "anchored",
+        "merkle_root": record.merkle_root,
+        "leaf_index": record.leaf_index,
+        "proof_length": len(record.merkle_proof or []),
+        "verification_ms": round((time.perf_counter() - started) * 1000, 3)
+    })
+    return details
@@ -0,0 +1,171 @@
+"""Воркер очереди расчета кредитного скора.
+
+Запускается отдельно от API (python worker.py). Каждый процесс держит пул потоков,
+потоки забирают задачи из credit_requests через SELECT ... FOR UPDATE SKIP LOCKED.
+Пропускная способность масштабируется числом процессов воркеров, независимо от реплик API.
+Отдельный поток процесса пакетно записывает хеши отчетов в блокчейн (services/anchoring.py).
+Скоринг одновременных задач собирается в пакеты (services/micro_batcher.py).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import SessionLocal
+from .models.user import User
+from .models.credit import CreditReport, CreditRequest
+from .services.feature_store import feature_store
+from .services.metrics import start_metrics_server
+from .services.micro_batcher import MicroBatcher
+from .services.scoring_engine import scoring_engine
+from .services.anchoring import anchorer, enqueue_anchor, generate_blockchain_hash
+from .services.job_queue import credit_request_queue
+from .services.latest_scores import latest_score_upsert
+
+logger = logging.getLogger(__name__)
+
+
+def process_credit_request(db: Session, request: CreditRequest, score_batcher: MicroBatcher):
+    """Расчет скора по одному запросу. Исключение = задача вернется в очередь"""
+    request_data = json.loads(request.payload or "{}")
+    user = db.get(User, request.user_id)
+    if not user:
+        raise ValueError(f"Пользователь {request.user_id} не найден")
+
+    # Признаки из хранилища (свежий снимок) или из credit_data_service;
+    # сервис недоступен - RuntimeError, задача вернется в очередь с ретраем
+    snapshot_id, features = feature_store.get(user.id, bool(user.has_credit_history))
+    # Скоринг через микро-батчер: одновременные задачи потоков считаются одним векторным вызовом
+    score_data = score_batcher(features, timeout=settings.SCORING_BATCH_TIMEOUT)
+
+    # Подготовка данных для хеширования
+    report_data = {
+        "user_id": user.id,
+        "score": score_data["score"],
+        "category": score_data["category"],
+        "calculated_at": datetime.utcnow().isoformat(),
+        "factors": score_data["factors"],
+        "features": features
+    }
+
+    # Создаем отчет
+    report = CreditReport(
+        user_id=user.id,
+        score=score_data["score"],
+        score_category=score_data["category"],
+        reputation_score=score_data["reputation_score"],
+        report_data=json.dumps(report_data),
+        feature_snapshot_id=snapshot_id
+    )
+    db.add(report)
+    db.flush()
+
+    # Запись в блокчейн если требуется - хеш уйдет в ближайшем пакете (см. services/anchoring.py)
+    if request_data.get("use_blockchain", False) and user.wallet_address:
+        enqueue_anchor(db, report, generate_blockchain_hash(report_data), report_data)
+        request.blockchain_recorded = True
+
+    db.execute(latest_score_upsert(db, report))
+
+    # Обновляем репутационный счет пользователя
+    user.reputation_score = score_data["reputation_score"]
+
+
+class Worker:
+    def __init__(
+            self,
+            pool_size: int = settings.WORKER_POOL_SIZE,
+            poll_interval: float = settings.WORKER_POLL_INTERVAL,
+            anchor_interval: float = settings.ANCHOR_POLL_INTERVAL
+    ):
+        self.pool_size = pool_size
+        self.poll_interval = poll_interval
+        self.anchor_interval = anchor_interval
+        self.stop_event = threading.Event()
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        # Одновременно скоринг ждут не больше pool_size потоков: полный пакет уходит сразу, без linger
+        self.score_batcher = MicroBatcher(
+            scoring_engine.score_many,
+            max_batch_size=min(settings.SCORING_BATCH_MAX_SIZE, pool_size),
+            linger_ms=settings.SCORING_BATCH_LINGER_MS,
+            max_queue=settings.SCORING_BATCH_QUEUE_LIMIT,
+            name="score-batcher"
+        )
+
+    def _run_once(self, worker_id: str) -> bool:
+        """Взять и обработать одну задачу. False - очередь пуста"""
+        db = SessionLocal()
+        try:
+            jobs = credit_request_queue.claim(db, worker_id)
+            if not jobs:
+                return False
+
+            request = jobs[0]
+            try:
+                process_credit_request(db, request, self.score_batcher)
+                credit_request_queue.complete(db, request)  # Отчет и статус - в одной транзакции
+                logger.info(f"[{worker_id}] Запрос #{request.id} обработан")
+            except Exception as e:
+                db.rollback()
+                credit_request_queue.fail(db, request, str(e))
+            return True
+        finally:
+            db.close()
+
+    def _loop(self, index: int):
+        worker_id = f"{self.name}/{index}"
+        while not self.stop_event.is_set():
+            try:
+                if not self._run_once(worker_id):
+                    self.stop_event.wait(self.poll_interval)
+            except Exception as e:
+                # Например, недоступна БД - не роняем поток
+                logger.error(f"[{worker_id}] Ошибка воркера: {e}")
+                self.stop_event.wait(self.poll_interval)
+
+    def _anchor_loop(self):
+        while not self.stop_event.is_set():
+            db = SessionLocal()
+            try:
+                anchorer.check_submitted(db)
+                # Пока пакеты полные - отправляем без паузы
+                while not self.stop_event.is_set() and anchorer.anchor_pending(db):
+                    pass
+            except Exception as e:
+                logger.error(f"Ошибка пакетной записи в блокчейн: {e}")
+            finally:
+                db.close()
+            self.stop_event.wait(self.anchor_interval)
+
+    def _stats_loop(self):
+        while not self.stop_event.wait(settings.SCORING_BATCH_STATS_INTERVAL):
+            logger.info(f"Метрики микро-батчинга скоринга: {self.score_batcher.stats()}")
+            logger.info(f"Метрики хранилища признаков: {feature_store.stats()}")
+
+    def stop(self, *args):
+        logger.info(f"Воркер {self.name} останавливается, дорабатываем текущие задачи")
+        self.stop_event.set()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info(f"Воркер {self.name} запущен, потоков: {self.pool_size}")
+        if settings.WORKER_METRICS_PORT:
+            start_metrics_server(settings.WORKER_METRICS_PORT)
+
+        anchor_thread = threading.Thread(target=self._anchor_loop, name="anchorer", daemon=True)
+        anchor_thread.start()
+        threading.Thread(target=self._stats_loop, name="batcher-stats", daemon=True).start()
+
+        with ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="credit-worker") as pool:
+            for index in range(self.pool_size):
+                pool.submit(self._loop, index)
+
+        anchor_thread.join()
@@ -0,0 +1,86 @@
+"""Латентность async обработчиков под конкурентной нагрузкой.
+
+Регистрирует пользователя, логинится и гоняет async эндпоинты кредитного модуля
+с заданной конкурентностью, печатает p50/p95/p99 по каждому эндпоинту.
+
+Сравнение "до/после": запустить на одном и том же сервере и базе
+сначала для коммита до перехода на async сессии, затем для текущего.
+Разница видна, когда у базы есть сетевая задержка (отдельный хост с Postgres):
+синхронный запрос в async обработчике держит event loop на все время round trip.
+
+    python benchmarks/concurrent_latency.py --base-url http://127.0.0.1:8000 --concurrency 50 --requests 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+ENDPOINTS = [
+    ("GET", "/api/credit/blockchain-rating", None),
+    ("POST", "/api/credit/choose-method", {"method": "parsing", "has_credit_history": True}),
+    ("POST", "/api/credit/process-parsing", None),
+]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def login(client: httpx.AsyncClient) -> str:
+    email = f"bench_{uuid.uuid4().hex[:12]}@example.com"
+    password = "benchmark-password"
+    response = await client.post("/api/auth/register", json={
+        "email": email,
+        "password": password,
+        "consent_data_processing": True
+    })
+    response.raise_for_status()
+    response = await client.post("/api/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run(base_url: str, concurrency: int, total: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        token = await login(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        latencies = {path: [] for _, path, _ in ENDPOINTS}
+        errors = {path: 0 for _, path, _ in ENDPOINTS}
+        counter = iter(range(total))
+
+        async def worker():
+            for i in counter:
+                method, path, body = ENDPOINTS[i % len(ENDPOINTS)]
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body, headers=headers)
+                    if response.status_code >= 400:
+                        errors[path] += 1
+                except httpx.HTTPError:
+                    errors[path] += 1
+                latencies[path].append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"{total} запросов, конкурентность {concurrency}, {total / elapsed:.1f} req/s")
+    print(f"{'endpoint':40} {'p50, ms':>9} {'p95, ms':>9} {'p99, ms':>9} {'mean, ms':>9} {'errors':>7}")
+    for path, values in latencies.items():
+        print(f"{path:40} {percentile(values, 50):9.1f} {percentile(values, 95):9.1f} "
+              f"{percentile(values, 99):9.1f} {statistics.mean(values):9.1f} {errors[path]:7d}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.concurrency, args.requests))
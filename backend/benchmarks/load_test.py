@@ -0,0 +1,371 @@
+"""Нагрузочный тест основного сценария API с сохранением результатов в JSON.
+
+Сценарий: регистрация и логин пользователей, затем смешанная нагрузка -
+/api/credit/request, /score, /history, /upload и /blockchain-rating в пропорциях FLOWS.
+По каждому эндпоинту - число запросов, throughput, p50/p95/p99, ошибки по кодам.
+
+С --start-stand поднимает локальный стенд: credit_data_service, API (uvicorn) и воркер
+очереди, блокчейн в мок режиме (пустой BLOCKCHAIN_RPC_URL), база - SQLite во временной
+папке или --database-url (локальный Postgres). Переменные окружения (ARGON2_*, WORKER_*
+и т.д.) передаются процессам стенда как есть. Без --start-stand нагрузка идет на --base-url.
+
+    python benchmarks/load_test.py run --start-stand --users 50 --duration 30 --output before.json
+    python benchmarks/load_test.py run --start-stand --database-url postgresql://... --output after.json
+    python benchmarks/load_test.py compare before.json after.json --threshold 10
+
+compare печатает изменения p50/p95/p99 и throughput и завершается с кодом 1,
+если какой-то эндпоинт стал хуже больше чем на threshold процентов.
+"""
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+from concurrent_latency import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CREDIT_DATA_SERVICE_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "credit_data_service")
+
+# Смешанная нагрузка после логина: (имя в отчете, вес)
+FLOWS = [
+    ("POST /api/credit/request", 2),
+    ("GET /api/credit/score", 4),
+    ("GET /api/credit/history", 3),
+    ("POST /api/credit/upload", 1),
+    ("GET /api/credit/blockchain-rating", 3),
+]
+
+# Минимальный PDF; до --upload-kb дополняется комментариями
+PDF_HEADER = b"%PDF-1.4\n1 0 obj << /Type /Catalog >> endobj\n"
+PDF_TRAILER = b"trailer << /Root 1 0 R >>\n%%EOF\n"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.started: Dict[str, float] = {}
+        self.finished: Dict[str, float] = {}
+
+    def record(self, name: str, started: float, status: str):
+        now = time.perf_counter()
+        self.latencies.setdefault(name, []).append((now - started) * 1000)
+        statuses = self.statuses.setdefault(name, {})
+        statuses[status] = statuses.get(status, 0) + 1
+        self.started[name] = min(self.started.get(name, started), started)
+        self.finished[name] = max(self.finished.get(name, now), now)
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for name, values in self.latencies.items():
+            elapsed = max(self.finished[name] - self.started[name], 1e-9)
+            statuses = self.statuses[name]
+            result[name] = {
+                "requests": len(values),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "mean_ms": round(statistics.mean(values), 2),
+                "max_ms": round(max(values), 2),
+                # 404 на /score до первого расчета - не ошибка
+                "errors": sum(count for status, count in statuses.items() if status == "exception" or status.startswith("5")),
+                "statuses": dict(sorted(statuses.items())),
+            }
+        return result
+
+
+async def timed(client: httpx.AsyncClient, recorder: Recorder, name: str, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, path, **kwargs)
+    except httpx.HTTPError:
+        recorder.record(name, started, "exception")
+        return None
+    recorder.record(name, started, str(response.status_code))
+    return response
+
+
+async def sign_up(client: httpx.AsyncClient, recorder: Recorder, run_id: str, i: int) -> Optional[dict]:
+    email = f"load_{run_id}_{i}@example.com"
+    password = "load-test-password"
+    await timed(client, recorder, "POST /api/auth/register", "POST", "/api/auth/register", json={
+        "email": email,
+        "password": password,
+        "has_credit_history": i % 3 != 0,
+        "consent_data_processing": True
+    })
+    response = await timed(client, recorder, "POST /api/auth/login", "POST", "/api/auth/login", json={
+        "email": email, "password": password
+    })
+    if response is None or response.status_code != 200:
+        return None
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def make_pdf(size_kb: int) -> bytes:
+    padding = max(0, size_kb * 1024 - len(PDF_HEADER) - len(PDF_TRAILER))
+    line = b"% load test padding " + b"x" * 100 + b"\n"
+    return PDF_HEADER + (line * (padding // len(line) + 1))[:padding] + PDF_TRAILER
+
+
+async def run_flow(client: httpx.AsyncClient, recorder: Recorder, name: str, headers: dict, pdf: bytes, cursors: dict):
+    token = headers["Authorization"]
+    if name == "POST /api/credit/request":
+        await timed(client, recorder, name, "POST", "/api/credit/request", json={"use_blockchain": False}, headers=headers)
+    elif name == "GET /api/credit/score":
+        await timed(client, recorder, name, "GET", "/api/credit/score", headers=headers)
+    elif name == "GET /api/credit/history":
+        # Листаем историю страницами, как клиент; после последней - снова с начала
+        params = {"cursor": cursors[token]} if cursors.get(token) else {}
+        response = await timed(client, recorder, name, "GET", "/api/credit/history", params=params, headers=headers)
+        if response is not None and response.status_code == 200:
+            cursors[token] = response.json().get("next_cursor")
+    elif name == "POST /api/credit/upload":
+        await timed(client, recorder, name, "POST", "/api/credit/upload", headers=headers,
+                    files={"file": ("statement.pdf", pdf, "application/pdf")}, data={"document_type": "gosuslugi"})
+    elif name == "GET /api/credit/blockchain-rating":
+        await timed(client, recorder, name, "GET", "/api/credit/blockchain-rating", headers=headers)
+
+
+async def load(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+    pdf = make_pdf(args.upload_kb)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        # Фаза 1: регистрация и логин (argon2 - отдельная строка отчета, не смешивается с чтением)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def limited_sign_up(i):
+            async with semaphore:
+                return await sign_up(client, recorder, run_id, i)
+
+        users = [headers for headers in await asyncio.gather(*(limited_sign_up(i) for i in range(args.users))) if headers]
+        if not users:
+            raise RuntimeError("Не удалось зарегистрировать ни одного пользователя")
+
+        # Фаза 2: смешанная нагрузка на время --duration или до --requests запросов
+        names = [name for name, _ in FLOWS]
+        weights = [weight for _, weight in FLOWS]
+        cursors: Dict[str, Optional[str]] = {}
+        deadline = time.perf_counter() + args.duration
+        remaining = iter(range(args.requests)) if args.requests else None
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                if remaining is not None and next(remaining, None) is None:
+                    return
+                await run_flow(client, recorder, rng.choices(names, weights)[0], rng.choice(users), pdf, cursors)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    endpoints = recorder.summary()
+    mixed = sum(endpoints[name]["requests"] for name in names if name in endpoints)
+    return {
+        "users": len(users),
+        "mixed_elapsed_s": round(elapsed, 2),
+        "mixed_throughput_rps": round(mixed / max(elapsed, 1e-9), 2),
+        "endpoints": endpoints,
+    }
+
+
+def wait_ready(url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} не ответил за {timeout:.0f} с")
+
+
+def create_tables(env: dict):
+    """Таблицы в базе стенда: модели, которые импортируют API и воркер, в отдельном процессе с окружением стенда"""
+    code = (
+        "import app.main, app.worker\n"
+        "from app.database import Base, engine\n"
+        "for table in Base.metadata.sorted_tables:\n"
+        "    try:\n"
+        "        table.create(engine, checkfirst=True)\n"
+        "    except Exception as e:\n"
+        "        print(f'{table.name}: {e}')\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, check=True)
+
+
+def start_stand(args, stack: ExitStack) -> str:
+    workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="trustflow_load_"))
+    upload_dir = os.path.join(workdir, "uploads")
+    os.makedirs(upload_dir)
+
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        "BLOCKCHAIN_RPC_URL": "",  # мок режим BlockchainService
+        "CREDIT_DATA_SERVICE_URL": f"http://127.0.0.1:{args.credit_data_port}",
+        "UPLOAD_DIR": upload_dir,
+        "PYTHONUNBUFFERED": "1",
+    })
+    env.pop("ASYNC_DATABASE_URL", None)
+    create_tables(env)
+
+    def spawn(name, command, cwd):
+        log = stack.enter_context(open(os.path.join(workdir, f"{name}.log"), "w"))
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+        def stop():
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        stack.callback(stop)
+
+    spawn("credit_data_service", [
+        sys.executable, "-m", "uvicorn", "app:app", "--port", str(args.credit_data_port), "--log-level", "warning"
+    ], CREDIT_DATA_SERVICE_DIR)
+    spawn("api", [
+        sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.api_port),
+        "--workers", str(args.api_workers), "--log-level", "warning"
+    ], BACKEND_DIR)
+    if not args.no_worker:
+        spawn("worker", [sys.executable, "worker.py"], BACKEND_DIR)
+
+    base_url = f"http://127.0.0.1:{args.api_port}"
+    wait_ready(f"http://127.0.0.1:{args.credit_data_port}/health")
+    wait_ready(f"{base_url}/livez")
+    print(f"Стенд поднят: {base_url}, база {env['DATABASE_URL']}, логи в {workdir}")
+    return base_url
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: dict):
+    print(f"\nПользователей: {result['users']}, смешанная нагрузка: "
+          f"{result['mixed_throughput_rps']:.1f} req/s за {result['mixed_elapsed_s']:.1f} с")
+    print(f"{'endpoint':36} {'req':>7} {'rps':>8} {'p50, ms':>9} {'p95, ms':>9} {'p99, ms':>9} {'errors':>7}  statuses")
+    for name, stats in result["endpoints"].items():
+        print(f"{name:36} {stats['requests']:7d} {stats['throughput_rps']:8.1f} {stats['p50_ms']:9.1f} "
+              f"{stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f} {stats['errors']:7d}  {stats['statuses']}")
+
+
+def command_run(args):
+    with ExitStack() as stack:
+        if args.start_stand:
+            args.base_url = start_stand(args, stack)
+        result = asyncio.run(load(args))
+
+    result = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "git_commit": git_commit(),
+            "base_url": args.base_url,
+            "stand": args.start_stand,
+            "database": (args.database_url or "sqlite").split(":", 1)[0] if args.start_stand else None,
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        **result,
+    }
+    print_report(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.output}")
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def command_compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"{baseline['meta'].get('git_commit')} -> {candidate['meta'].get('git_commit')}, порог {args.threshold:.0f}%")
+    print(f"{'endpoint':36} {'p50':>16} {'p95':>16} {'p99':>16} {'rps':>16}")
+    regressions = []
+    for name in candidate["endpoints"]:
+        if name not in baseline["endpoints"]:
+            continue
+        before, after = baseline["endpoints"][name], candidate["endpoints"][name]
+        cells = []
+        for key, worse_if_higher in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+            delta = change(before[key], after[key])
+            worse = delta > args.threshold if worse_if_higher else delta < -args.threshold
+            if worse:
+                regressions.append(f"{name} {key}: {before[key]} -> {after[key]} ({delta:+.1f}%)")
+            cells.append(f"{after[key]:8.1f} {delta:+6.1f}%{'!' if worse else ' '}")
+        print(f"{name:36} {' '.join(cells)}")
+
+    if regressions:
+        print("\nРегрессии:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nРегрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Нагрузочный прогон")
+    run_parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    run_parser.add_argument("--start-stand", action="store_true", help="Поднять локальный стенд (API, воркер, credit_data_service)")
+    run_parser.add_argument("--database-url", help="База стенда; по умолчанию SQLite во временной папке")
+    run_parser.add_argument("--api-port", type=int, default=8100)
+    run_parser.add_argument("--api-workers", type=int, default=1)
+    run_parser.add_argument("--credit-data-port", type=int, default=8102)
+    run_parser.add_argument("--no-worker", action="store_true", help="Не запускать воркер очереди (отчеты не считаются)")
+    run_parser.add_argument("--users", type=int, default=50)
+    run_parser.add_argument("--concurrency", type=int, default=20)
+    run_parser.add_argument("--duration", type=float, default=30, help="Секунд смешанной нагрузки")
+    run_parser.add_argument("--requests", type=int, default=0, help="Остановиться после N запросов смешанной нагрузки")
+    run_parser.add_argument("--upload-kb", type=int, default=64, help="Размер загружаемого PDF")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", help="Файл для результатов в JSON")
+
+    compare_parser = commands.add_parser("compare", help="Сравнить два прогона")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10, help="Допустимое ухудшение, %%")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        sys.exit(command_compare(args))
+    command_run(args)
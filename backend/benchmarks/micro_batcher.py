@@ -0,0 +1,78 @@
+"""Стоит ли микро-батчинг скоринга в воркере своего linger.
+
+Моделирует потоки воркера: каждый поток между вызовами скоринга "работает с БД"
+--io-ms миллисекунд (sleep отпускает GIL, как ожидание ответа базы), затем скорит
+одного пользователя. Сравниваются прямой вызов score_features и MicroBatcher с
+разными linger_ms: пропускная способность задач и латентность вызова скоринга.
+
+    python benchmarks/micro_batcher.py --threads 4 16 64 --linger-ms 0 1 5 --io-ms 2
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.micro_batcher import MicroBatcher  # noqa: E402
+from app.services.scoring_engine import FEATURES, scoring_engine  # noqa: E402
+from concurrent_latency import percentile  # noqa: E402
+from scoring_engine import random_features  # noqa: E402
+
+
+def run(score, threads: int, duration: float, io_ms: float, features: list) -> dict:
+    latencies = [[] for _ in range(threads)]
+    stop = threading.Event()
+
+    def loop(index: int):
+        own = latencies[index]
+        i = index
+        while not stop.is_set():
+            time.sleep(io_ms / 1000)
+            started = time.perf_counter()
+            score(features[i % len(features)])
+            own.append((time.perf_counter() - started) * 1000)
+            i += threads
+
+    pool = [threading.Thread(target=loop, args=(i,), daemon=True) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    values = [value for own in latencies for value in own]
+    return {
+        "rps": len(values) / elapsed,
+        "p50": percentile(values, 50),
+        "p99": percentile(values, 99),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Микро-батчинг скоринга: прямой вызов против пакетов с linger")
+    parser.add_argument("--threads", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--linger-ms", type=float, nargs="+", default=[0, 1, 5])
+    parser.add_argument("--io-ms", type=float, default=2.0, help="Работа потока между вызовами скоринга")
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    features = [dict(zip(FEATURES, row)) for row in random_features(1000, rng).tolist()]
+
+    print(f"{'потоков':>8} {'вариант':>14} {'задач/с':>10} {'p50, мс':>9} {'p99, мс':>9}")
+    for threads in args.threads:
+        variants = [("напрямую", scoring_engine.score_features, None)]
+        for linger_ms in args.linger_ms:
+            batcher = MicroBatcher(scoring_engine.score_many, max_batch_size=threads, linger_ms=linger_ms)
+            variants.append((f"linger {linger_ms:g} мс", batcher, batcher))
+        for name, score, batcher in variants:
+            result = run(score, threads, args.duration, args.io_ms, features)
+            extra = f"  средний пакет {batcher.stats()['avg_batch_size']}" if batcher else ""
+            print(f"{threads:>8} {name:>14} {result['rps']:>10.0f} {result['p50']:>9.3f} {result['p99']:>9.3f}{extra}")
@@ -0,0 +1,60 @@
+"""Микробенчмарк services/scoring_engine.py: стоимость строки в микросекундах.
+
+Признаки генерируются в диапазонах credit_data_service. Печатает время векторного
+score_matrix для разных размеров пакета и время score_features на одного пользователя.
+
+    python benchmarks/scoring_engine.py --sizes 1 100 10000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.scoring_engine import FEATURES, MONEY_SCALE, scoring_engine  # noqa: E402
+
+
+def random_features(n: int, rng: np.random.Generator) -> np.ndarray:
+    columns = {name: rng.integers(0, high, size=n, endpoint=True) for name, high in MONEY_SCALE.items()}
+    has_history = rng.random(n) < 0.7
+    columns["DEBT"] = np.where(has_history, columns["DEBT"], 0)
+    safe_div = lambda a, b: np.divide(a, b, out=np.zeros(n), where=b != 0)
+    columns["R_SAVINGS_INCOME"] = safe_div(columns["SAVINGS"], columns["INCOME"])
+    columns["R_EXPENDITURE_INCOME"] = safe_div(columns["T_EXPENDITURE_12"], columns["INCOME"])
+    columns["R_DEBT_INCOME"] = safe_div(columns["DEBT"], columns["INCOME"])
+    columns["R_DEBT_SAVINGS"] = safe_div(columns["DEBT"], columns["SAVINGS"])
+    columns["CAT_DEPENDENTS"] = rng.random(n) < 0.5
+    columns["CAT_DEBT"] = columns["DEBT"] > 0
+    columns["HAS_HISTORY"] = has_history
+    return np.column_stack([np.asarray(columns[name], dtype=np.float64) for name in FEATURES])
+
+
+def best_of(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Микробенчмарк движка скоринга")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"{'строк':>10} {'всего, мс':>12} {'мкс/строка':>12}")
+    for n in args.sizes:
+        X = random_features(n, rng)
+        elapsed = best_of(lambda: scoring_engine.score_matrix(X), args.repeat)
+        print(f"{n:>10} {elapsed * 1000:>12.3f} {elapsed / n * 1e6:>12.3f}")
+
+    features = dict(zip(FEATURES, random_features(1, rng)[0].tolist()))
+    calls = 1000
+    elapsed = best_of(lambda: [scoring_engine.score_features(features) for _ in range(calls)], args.repeat)
+    print(f"score_features (один пользователь): {elapsed / calls * 1e6:.1f} мкс/вызов")
@@ -0,0 +1,97 @@
+"""Подбор параметров argon2 под текущее железо.
+
+Для каждой памяти (от большей к меньшей) ищем максимальное число итераций, при котором
+медиана одной проверки пароля укладывается в целевое время. Выбирается первый подходящий
+вариант - больше памяти при том же времени дороже для перебора на GPU. Если даже t=1
+не укладывается, память уменьшается до MIN_MEMORY_COST; не уложились и там - остаются
+минимальные параметры с предупреждением.
+
+    python calibrate_argon2.py --target-ms 250
+    python calibrate_argon2.py --target-ms 250 --write-env .env
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from app.auth.passwords import make_context
+from app.config import settings
+
+MIN_MEMORY_COST = 19456  # 19 MiB - нижняя граница по рекомендациям OWASP
+MAX_TIME_COST = 10
+
+
+def measure_verify_ms(time_cost: int, memory_cost: int, parallelism: int, rounds: int) -> float:
+    context = make_context(time_cost, memory_cost, parallelism)
+    hashed = context.hash("calibration-password")
+    context.verify("calibration-password", hashed)  # Прогрев
+
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        context.verify("calibration-password", hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, max_memory_cost: int, parallelism: int, rounds: int) -> dict:
+    memory_cost = max(max_memory_cost, MIN_MEMORY_COST)
+    while True:
+        elapsed = measure_verify_ms(1, memory_cost, parallelism, rounds)
+        print(f"m={memory_cost} KiB t=1: {elapsed:.1f} мс")
+        if elapsed <= target_ms:
+            break
+        if memory_cost == MIN_MEMORY_COST:
+            # Даже минимальные параметры медленнее цели - берем их, слабее не опускаемся
+            print(
+                f"Внимание: t=1 m={MIN_MEMORY_COST} KiB ({elapsed:.1f} мс) медленнее цели {target_ms:g} мс, "
+                f"выбраны минимальные параметры",
+                file=sys.stderr
+            )
+            return {"time_cost": 1, "memory_cost": memory_cost, "parallelism": parallelism, "verify_ms": elapsed}
+        memory_cost = max(memory_cost // 2, MIN_MEMORY_COST)
+
+    time_cost = 1
+    while time_cost < MAX_TIME_COST:
+        candidate = measure_verify_ms(time_cost + 1, memory_cost, parallelism, rounds)
+        print(f"m={memory_cost} KiB t={time_cost + 1}: {candidate:.1f} мс")
+        if candidate > target_ms:
+            break
+        time_cost += 1
+        elapsed = candidate
+    return {"time_cost": time_cost, "memory_cost": memory_cost, "parallelism": parallelism, "verify_ms": elapsed}
+
+
+def write_env(path: str, params: dict):
+    values = {
+        "ARGON2_TIME_COST": str(params["time_cost"]),
+        "ARGON2_MEMORY_COST": str(params["memory_cost"]),
+        "ARGON2_PARALLELISM": str(params["parallelism"]),
+    }
+    lines = []
+    if os.path.exists(path):
+        with open(path) as f:
+            lines = [line for line in f.read().splitlines() if line.split("=", 1)[0].strip() not in values]
+    lines += [f"{key}={value}" for key, value in values.items()]
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Калибровка параметров argon2 под целевое время проверки пароля")
+    parser.add_argument("--target-ms", type=float, default=settings.ARGON2_TARGET_MS, help="Целевое время одной проверки, мс")
+    parser.add_argument("--max-memory", type=int, default=settings.ARGON2_MEMORY_COST, help="Максимум памяти на хеш, KiB (по умолчанию текущий ARGON2_MEMORY_COST)")
+    parser.add_argument("--parallelism", type=int, default=settings.ARGON2_PARALLELISM, help="Потоков argon2 на хеш")
+    parser.add_argument("--rounds", type=int, default=5, help="Замеров на каждый вариант")
+    parser.add_argument("--write-env", metavar="PATH", help="Записать выбранные параметры в .env файл")
+    args = parser.parse_args()
+
+    params = calibrate(args.target_ms, args.max_memory, args.parallelism, args.rounds)
+    print(
+        f"Выбрано: ARGON2_TIME_COST={params['time_cost']} ARGON2_MEMORY_COST={params['memory_cost']} "
+        f"ARGON2_PARALLELISM={params['parallelism']} (проверка ~{params['verify_ms']:.1f} мс)"
+    )
+    if args.write_env:
+        write_env(args.write_env, params)
+        print(f"Параметры записаны в {args.write_env}; существующие хеши обновятся при следующем входе")
@@ -0,0 +1,28 @@
+import argparse
+import logging
+
+from app.config import settings
+from app.rescoring import Checkpoint, Rescorer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчет кредитных отчетов всех пользователей текущей моделью")
+    parser.add_argument("--chunk-size", type=int, default=settings.RESCORE_CHUNK_SIZE, help="Пользователей в пачке")
+    parser.add_argument("--processes", type=int, default=settings.RESCORE_PROCESSES, help="Процессов скоринга")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="Пачек в пуле одновременно (по умолчанию 2 на процесс)")
+    parser.add_argument("--checkpoint", default="rescore", help="Имя запуска: прогресс для продолжения хранится в rescore_checkpoints")
+    parser.add_argument("--refresh-features", action="store_true", help="Запросить заново признаки старше FEATURE_TTL")
+    parser.add_argument("--reset", action="store_true", help="Начать заново, игнорируя checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    checkpoint = Checkpoint(args.checkpoint)
+    if args.reset:
+        checkpoint.reset()
+
+    Rescorer(
+        checkpoint,
+        chunk_size=args.chunk_size,
+        processes=args.processes,
+        max_in_flight=args.max_in_flight,
+        refresh_features=args.refresh_features
+    ).run()
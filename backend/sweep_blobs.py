@@ -0,0 +1,22 @@
+import argparse
+import asyncio
+import logging
+
+from app.database import AsyncSessionLocal
+from app.services.blob_store import blob_store
+
+
+async def sweep() -> int:
+    async with AsyncSessionLocal() as db:
+        return len(await blob_store.sweep(db))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Удаление файлов загрузок, на которые не ссылается ни один документ. "
+                    "Запускать периодически (cron) в часы без загрузок"
+    )
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"Удалено файлов: {asyncio.run(sweep())}")
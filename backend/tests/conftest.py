@@ -0,0 +1,29 @@
+"""Общие фикстуры тестов: временная SQLite база и мок режим блокчейна.
+
+Переменные окружения задаются до импорта app: настройки читаются при импорте config.
+"""
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="trustflow-tests-")
+# TEST_DATABASE_URL - прогон на Postgres (отдельная пустая база: таблицы удаляются после тестов)
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["BLOCKCHAIN_RPC_URL"] = ""
+os.environ["UPLOAD_DIR"] = os.path.join(_db_dir, "uploads")
+
+import pytest  # noqa: E402
+
+import app.main  # noqa: E402,F401  - регистрирует все модели в Base.metadata
+from app.database import Base, SessionLocal, engine  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Сессия на чистой схеме: таблицы создаются перед тестом и удаляются после"""
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
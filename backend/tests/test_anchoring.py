@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta, timezone
+import hashlib
+
+import pytest
+
+from app.config import settings
+from app.models.blockchain import BlockchainRecord, MerkleAnchor
+from app.services import anchoring
+from app.services.anchoring import Anchorer, anchor_record_values
+
+
+class FakeChain:
+    """Блокчейн без ожидания: send_merkle_root отдает хеш, статус задается тестом"""
+
+    def __init__(self):
+        self.sent = []
+        self.fail_send = False
+        self.states = {}
+
+    def can_anchor(self):
+        return True
+
+    def send_merkle_root(self, merkle_root, leaf_count):
+        if self.fail_send:
+            return None
+        tx_hash = f"0x{len(self.sent) + 1:064x}"
+        self.sent.append((merkle_root, leaf_count, tx_hash))
+        return tx_hash
+
+    def get_transaction_status(self, transaction_hash):
+        return self.states.get(transaction_hash, {"status": "pending", "block_number": None})
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    chain = FakeChain()
+    monkeypatch.setattr(anchoring, "get_blockchain_service", lambda: chain)
+    return chain
+
+
+def add_records(db, count):
+    for i in range(count):
+        data_hash = hashlib.sha256(str(i).encode()).hexdigest()
+        db.add(BlockchainRecord(**anchor_record_values(1, None, data_hash, {"i": i})))
+    db.commit()
+
+
+def expire(db, anchor):
+    anchor.submitted_at = datetime.now(timezone.utc) - timedelta(seconds=settings.BLOCKCHAIN_TX_TIMEOUT + 1)
+    db.commit()
+
+
+def statuses(db):
+    return {record.anchor_status for record in db.query(BlockchainRecord).all()}
+
+
+def test_batch_is_sent_without_waiting_for_receipt(db, chain):
+    add_records(db, 3)
+
+    anchor = Anchorer(batch_size=3).anchor_pending(db)
+
+    assert anchor.status == "sent"
+    assert anchor.transaction_hash == chain.sent[0][2]
+    assert statuses(db) == {"submitting"}
+
+
+def test_receipt_is_checked_on_later_run(db, chain):
+    add_records(db, 2)
+    anchorer = Anchorer(batch_size=2)
+    anchor = anchorer.anchor_pending(db)
+
+    # Receipt еще нет - ждем, не отправляя заново
+    assert anchorer.check_submitted(db) == 0
+    assert len(chain.sent) == 1
+
+    chain.states[anchor.transaction_hash] = {"status": "confirmed", "block_number": 42}
+    assert anchorer.check_submitted(db) == 1
+
+    db.refresh(anchor)
+    assert anchor.status == "anchored"
+    assert anchor.block_number == 42
+    records = db.query(BlockchainRecord).all()
+    assert {record.anchor_status for record in records} == {"anchored"}
+    assert {record.transaction_hash for record in records} == {anchor.transaction_hash}
+    assert len(chain.sent) == 1
+
+
+def test_lost_transaction_is_resent_after_timeout(db, chain):
+    add_records(db, 2)
+    anchorer = Anchorer(batch_size=2)
+    anchor = anchorer.anchor_pending(db)
+    first_tx = anchor.transaction_hash
+
+    expire(db, anchor)
+    anchorer.check_submitted(db)
+
+    db.refresh(anchor)
+    assert len(chain.sent) == 2
+    assert chain.sent[1][0] == chain.sent[0][0]  # Тот же корень, те же записи
+    assert anchor.transaction_hash != first_tx
+    assert anchor.attempts == 2
+    assert db.query(MerkleAnchor).count() == 1
+
+
+def test_reverted_transaction_is_resent(db, chain):
+    add_records(db, 2)
+    anchorer = Anchorer(batch_size=2)
+    anchor = anchorer.anchor_pending(db)
+    chain.states[anchor.transaction_hash] = {"status": "reverted", "block_number": 7}
+
+    anchorer.check_submitted(db)
+
+    assert len(chain.sent) == 2
+
+
+def test_failed_send_keeps_batch_until_attempts_exhausted(db, chain, monkeypatch):
+    monkeypatch.setattr(settings, "ANCHOR_MAX_ATTEMPTS", 2)
+    add_records(db, 2)
+    anchorer = Anchorer(batch_size=2)
+    chain.fail_send = True
+
+    assert anchorer.anchor_pending(db) is None
+    anchor = db.query(MerkleAnchor).one()
+    assert anchor.status == "submitting"
+    assert anchor.transaction_hash is None
+
+    # До истечения срока пакет не трогается
+    anchorer.check_submitted(db)
+    assert anchor.attempts == 1
+
+    expire(db, anchor)
+    anchorer.check_submitted(db)
+    db.refresh(anchor)
+    assert anchor.status == "failed"
+    assert statuses(db) == {"failed"}
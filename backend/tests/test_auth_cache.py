@@ -0,0 +1,73 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth.security import create_access_token, get_current_user, invalidate_cached_user, user_cache
+from app.database import async_engine
+from app.main import app
+from app.models.user import User
+from app.routes import auth as auth_routes
+
+
+@pytest.fixture
+def user(db):
+    user_cache.clear()
+    user = User(email="cached@example.com", password_hash="x", consent_data_processing=False)
+    db.add(user)
+    db.commit()
+    yield user
+    user_cache.clear()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+        # Соединения asyncpg привязаны к event loop клиента
+        client.portal.call(async_engine.dispose)
+
+
+def token_for(user):
+    return create_access_token({"sub": str(user.id)})
+
+
+def test_cached_user_is_reread_after_invalidate(db, user):
+    token = token_for(user)
+    assert get_current_user(token, db).full_name is None
+
+    user.full_name = "Новое имя"
+    db.commit()
+    # До сброса запрос обслуживается из кеша процесса
+    assert get_current_user(token, db).full_name is None
+
+    invalidate_cached_user(user.id)
+    assert get_current_user(token, db).full_name == "Новое имя"
+
+
+def test_consent_update_invalidates_cache(db, user, client):
+    get_current_user(token_for(user), db)
+
+    response = client.post(
+        "/api/credit/choose-method",
+        json={"method": "upload", "consent_data_processing": True},
+        headers={"Authorization": f"Bearer {token_for(user)}"}
+    )
+
+    assert response.status_code == 200
+    assert user_cache.get(user.id) is None
+    db.expire_all()
+    assert get_current_user(token_for(user), db).consent_data_processing is True
+
+
+def test_password_rehash_on_login_invalidates_cache(db, user, client, monkeypatch):
+    get_current_user(token_for(user), db)
+
+    async def verify_and_update(plain_password, hashed_password):
+        return True, "rehashed"
+
+    monkeypatch.setattr(auth_routes, "verify_and_update_password_async", verify_and_update)
+    response = client.post("/api/auth/login", json={"email": user.email, "password": "password"})
+
+    assert response.status_code == 200
+    assert user_cache.get(user.id) is None
+    db.refresh(user)
+    assert user.password_hash == "rehashed"
@@ -0,0 +1,167 @@
+import asyncio
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal, async_engine
+from app.models.uploaded_document import DocumentBlob
+from app.services.blob_store import BlobStore
+
+CONTENT = b"%PDF-1.4 one and the same document"
+
+
+@pytest.fixture
+def store(db, tmp_path):
+    return BlobStore(str(tmp_path))
+
+
+def run(coro):
+    async def scenario():
+        try:
+            return await coro
+        finally:
+            await async_engine.dispose()  # Соединения пула привязаны к event loop теста
+    return asyncio.run(scenario())
+
+
+async def put(store):
+    return await store.put(UploadFile(io.BytesIO(CONTENT), filename="a.pdf", size=len(CONTENT)))
+
+
+async def upload(store):
+    """Загрузка целиком: put, acquire, commit"""
+    sha256, size, path, staging_path = await put(store)
+    async with AsyncSessionLocal() as session:
+        await store.acquire(session, sha256, size, path, staging_path)
+        await session.commit()
+    return sha256, size, path
+
+
+async def row(sha256):
+    async with AsyncSessionLocal() as session:
+        return await session.get(DocumentBlob, sha256)
+
+
+def test_acquire_places_file_once_and_counts_references(store):
+    async def scenario():
+        sha256, _, path = await upload(store)
+        await upload(store)
+        return path, await row(sha256)
+
+    path, blob = run(scenario())
+    assert open(path, "rb").read() == CONTENT
+    assert blob.ref_count == 2
+    assert os.listdir(store.staging_dir) == []
+
+
+def test_sweep_between_put_and_acquire_does_not_lose_file(store):
+    async def scenario():
+        sha256, _, path = await upload(store)
+        async with AsyncSessionLocal() as session:
+            await store.release(session, sha256)
+            await session.commit()
+
+        # Новая загрузка того же содержимого: файл уже на месте, ее put его не трогает
+        staged = await put(store)
+        async with AsyncSessionLocal() as session:
+            assert await store.sweep(session) == [path]
+        assert not os.path.exists(path)
+
+        async with AsyncSessionLocal() as session:
+            await store.acquire(session, *staged)
+            await session.commit()
+        return path, await row(sha256)
+
+    path, blob = run(scenario())
+    assert open(path, "rb").read() == CONTENT
+    assert blob.ref_count == 1
+
+
+def test_sweep_keeps_referenced_blobs(store):
+    async def scenario():
+        sha256, _, path = await upload(store)
+        async with AsyncSessionLocal() as session:
+            assert await store.sweep(session) == []
+        return path, await row(sha256)
+
+    path, blob = run(scenario())
+    assert os.path.exists(path)
+    assert blob.ref_count == 1
+
+
+def test_discard_after_failed_upload_removes_unreferenced_file(store):
+    async def scenario():
+        sha256, size, path, staging_path = await put(store)
+        async with AsyncSessionLocal() as session:
+            await store.acquire(session, sha256, size, path, staging_path)
+            await session.rollback()  # Транзакция загрузки не прошла
+            await store.discard(session, sha256, size, path, staging_path)
+        return path, await row(sha256)
+
+    path, blob = run(scenario())
+    assert not os.path.exists(path)
+    assert blob is None
+    assert os.listdir(store.staging_dir) == []
+
+
+def test_discard_keeps_file_referenced_by_another_upload(store):
+    async def scenario():
+        staged_a = await put(store)
+        async with AsyncSessionLocal() as session_a:
+            await store.acquire(session_a, *staged_a)
+            await session_a.rollback()
+
+            # Загрузка B того же содержимого успела закоммитить ссылку
+            sha256, _, path = await upload(store)
+
+            await store.discard(session_a, *staged_a)
+        return path, await row(sha256)
+
+    path, blob = run(scenario())
+    assert open(path, "rb").read() == CONTENT
+    assert blob.ref_count == 1
+
+
+def test_acquire_rewrites_file_missing_under_existing_row(store):
+    async def scenario():
+        sha256, _, path = await upload(store)
+        os.remove(path)  # Например, удален sweep, чья транзакция потом откатилась
+        await upload(store)
+        return path, await row(sha256)
+
+    path, blob = run(scenario())
+    assert open(path, "rb").read() == CONTENT
+    assert blob.ref_count == 2
+
+
+@pytest.mark.skipif(async_engine.dialect.name != "postgresql", reason="Блокировки строк - только Postgres (TEST_DATABASE_URL)")
+def test_upload_waits_for_sweep_lock_and_restores_file(store):
+    async def scenario():
+        sha256, _, path = await upload(store)
+        async with AsyncSessionLocal() as session:
+            await store.release(session, sha256)
+            await session.commit()
+
+        async with AsyncSessionLocal() as sweeper:
+            # sweep() до commit: строка заблокирована и удалена, файла уже нет
+            blob = (await sweeper.execute(
+                select(DocumentBlob).where(DocumentBlob.sha256 == sha256).with_for_update()
+            )).scalars().one()
+            await sweeper.delete(blob)
+            await sweeper.flush()
+            os.remove(path)
+
+            concurrent_upload = asyncio.create_task(upload(store))
+            await asyncio.sleep(0.2)
+            assert not concurrent_upload.done()  # Ждет блокировку строки
+            await sweeper.commit()
+
+        await concurrent_upload
+        return path, await row(sha256)
+
+    path, blob = run(scenario())
+    assert open(path, "rb").read() == CONTENT
+    assert blob.ref_count == 1
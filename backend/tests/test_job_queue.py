@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from app.models.credit import CreditRequest
+from app.services.job_queue import JobQueue, utcnow
+
+
+def add_jobs(db, count):
+    jobs = [CreditRequest(user_id=i, payload="{}") for i in range(count)]
+    db.add_all(jobs)
+    db.commit()
+    return jobs
+
+
+def test_claim_takes_pending_jobs_in_order(db):
+    add_jobs(db, 3)
+    queue = JobQueue(CreditRequest, visibility_timeout=60)
+
+    first = queue.claim(db, "w1", limit=2)
+    second = queue.claim(db, "w2", limit=2)
+
+    assert [job.id for job in first] == [1, 2]
+    assert [job.id for job in second] == [3]
+    assert all(job.status == "processing" and job.attempts == 1 for job in first + second)
+    assert {job.locked_by for job in first} == {"w1"}
+    assert queue.claim(db, "w3") == []
+
+
+def test_claimed_job_is_not_taken_until_lease_expires(db):
+    add_jobs(db, 1)
+    queue = JobQueue(CreditRequest, visibility_timeout=60)
+    job, = queue.claim(db, "w1")
+
+    assert queue.claim(db, "w2") == []
+
+    # Воркер w1 пропал: lease истек
+    job.locked_until = utcnow() - timedelta(seconds=1)
+    db.commit()
+
+    reclaimed, = queue.claim(db, "w2")
+    assert reclaimed.id == job.id
+    assert reclaimed.locked_by == "w2"
+    assert reclaimed.attempts == 2
+
+
+def test_expired_job_fails_after_max_attempts(db):
+    add_jobs(db, 1)
+    queue = JobQueue(CreditRequest, visibility_timeout=60, max_attempts=1)
+    job, = queue.claim(db, "w1")
+    job.locked_until = utcnow() - timedelta(seconds=1)
+    db.commit()
+
+    assert queue.claim(db, "w2") == []
+    db.refresh(job)
+    assert job.status == "failed"
+    assert job.locked_by is None
+    assert job.completed_at is not None
+
+
+def test_fail_returns_job_with_backoff(db):
+    add_jobs(db, 1)
+    queue = JobQueue(CreditRequest, visibility_timeout=60, max_attempts=3, retry_backoff=30)
+    job, = queue.claim(db, "w1")
+
+    queue.fail(db, job, "credit_data_service недоступен")
+
+    assert job.status == "pending"
+    assert job.locked_by is None
+    assert queue.claim(db, "w1") == []  # Задержка ретрая еще не прошла
+
+    job.available_at = utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert [retried.id for retried in queue.claim(db, "w1")] == [job.id]
+
+
+def test_complete_and_depth(db):
+    add_jobs(db, 2)
+    queue = JobQueue(CreditRequest, visibility_timeout=60)
+    job, = queue.claim(db, "w1")
+
+    assert queue.depth(db) == {"pending": 1, "processing": 1}
+    queue.complete(db, job)
+    assert job.status == "completed" and job.completed_at is not None
+    assert queue.depth(db) == {"pending": 1, "processing": 0}
@@ -0,0 +1,83 @@
+import hashlib
+
+import pytest
+
+from app.services.merkle import build_tree, hash_leaf, hash_node, merkle_proof, merkle_root, verify_proof
+
+
+def data_hashes(count):
+    return [hashlib.sha256(str(i).encode()).hexdigest() for i in range(count)]
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 4, 5, 7, 8, 13, 100])
+def test_every_leaf_proof_round_trips(count):
+    hashes = data_hashes(count)
+    levels = build_tree(hashes)
+    root = merkle_root(levels)
+
+    for index, data_hash in enumerate(hashes):
+        assert verify_proof(data_hash, merkle_proof(levels, index), root)
+
+
+def test_single_leaf_root_is_leaf_hash():
+    data_hash, = data_hashes(1)
+    levels = build_tree([data_hash])
+    assert merkle_root(levels) == hash_leaf(data_hash).hex()
+    assert merkle_proof(levels, 0) == []
+
+
+def test_odd_leaf_is_promoted_without_duplication():
+    a, b, c = data_hashes(3)
+    levels = build_tree([a, b, c])
+
+    expected = hash_node(hash_node(hash_leaf(a), hash_leaf(b)), hash_leaf(c))
+    assert merkle_root(levels) == expected.hex()
+    # Непарный лист поднимается без изменений: в его proof только один шаг
+    assert merkle_proof(levels, 2) == [{"hash": hash_node(hash_leaf(a), hash_leaf(b)).hex(), "side": "left"}]
+    # Дублирование последнего листа дало бы другой корень
+    assert merkle_root(build_tree([a, b, c, c])) != merkle_root(levels)
+
+
+def test_empty_tree_is_rejected():
+    with pytest.raises(ValueError):
+        build_tree([])
+
+
+def test_tampered_proofs_are_rejected():
+    hashes = data_hashes(5)
+    levels = build_tree(hashes)
+    root = merkle_root(levels)
+    proof = merkle_proof(levels, 1)
+
+    other_hash = hashlib.sha256(b"other").hexdigest()
+    assert not verify_proof(other_hash, proof, root)
+    assert not verify_proof(hashes[1], proof, other_hash)
+
+    flipped_hash = [dict(step) for step in proof]
+    flipped_hash[0]["hash"] = ("0" if proof[0]["hash"][0] != "0" else "1") + proof[0]["hash"][1:]
+    assert not verify_proof(hashes[1], flipped_hash, root)
+
+    swapped_side = [dict(step) for step in proof]
+    swapped_side[0]["side"] = "right" if proof[0]["side"] == "left" else "left"
+    assert not verify_proof(hashes[1], swapped_side, root)
+
+    assert not verify_proof(hashes[1], proof[:-1], root)
+    assert not verify_proof(hashes[1], merkle_proof(levels, 2), root)
+
+
+def test_internal_node_cannot_pass_as_leaf():
+    a, b, c, d = data_hashes(4)
+    levels = build_tree([a, b, c, d])
+    # Узел уровня 1 с proof от уровня 1: без префиксов листа и узла это сошлось бы
+    node = levels[1][0].hex()
+    assert not verify_proof(node, [{"hash": levels[1][1].hex(), "side": "right"}], merkle_root(levels))
+
+
+@pytest.mark.parametrize("proof", [
+    [{"hash": "not-hex", "side": "left"}],
+    [{"side": "left"}],
+    [None],
+])
+def test_malformed_proof_returns_false(proof):
+    data_hash, = data_hashes(1)
+    assert not verify_proof(data_hash, proof, hash_leaf(data_hash).hex())
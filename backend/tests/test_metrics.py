@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.services import metrics
+from app.services.metrics import Counter, Gauge, _Sharded, instrument_pool
+
+
+def test_sharded_requires_collect():
+    with pytest.raises(TypeError):
+        _Sharded("x", "x")
+
+    counter = Counter("trustflow_test_total", "x", ("kind",))
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    assert counter.collect() == ['trustflow_test_total{kind="a"} 3']
+
+
+def test_gauge_ttl_reuses_collected_values():
+    calls = []
+
+    def collect():
+        calls.append(1)
+        return {("q",): len(calls)}
+
+    gauge = Gauge("trustflow_test_depth", "x", ("queue",), collect, ttl=60)
+    assert gauge.collect() == gauge.collect() == ['trustflow_test_depth{queue="q"} 1']
+    assert len(calls) == 1
+
+    uncached = Gauge("trustflow_test_depth", "x", ("queue",), collect)
+    uncached.collect()
+    uncached.collect()
+    assert len(calls) == 3
+
+
+def test_instrument_pool_uses_pool_events(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    instrument_pool(engine, "test")
+    try:
+        for _ in range(2):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        assert 'trustflow_db_pool_checkouts_total{engine="test"} 2' in metrics.db_pool_checkouts.collect()
+        assert 'trustflow_db_pool_connects_total{engine="test"} 1' in metrics.db_pool_connects.collect()
+        assert 'trustflow_db_pool_connection_hold_seconds_count{engine="test"} 2' in metrics.db_pool_connection_hold.collect()
+    finally:
+        metrics._pools.pop("test", None)
+        engine.dispose()
@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import threading
+import time
+
+import pytest
+
+from app.services.micro_batcher import BatcherOverloaded, MicroBatcher, batch_size_metric, queue_delay_metric
+
+
+def test_results_match_items_across_threads():
+    batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_batch_size=8)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda item: batcher(item, timeout=5), range(200)))
+
+    assert results == [item * 2 for item in range(200)]
+    stats = batcher.stats()
+    assert stats["items"] == 200
+    assert stats["batches"] <= 200
+
+
+def test_waiting_items_are_scored_in_one_batch():
+    release = threading.Event()
+    sizes = []
+
+    def batch_fn(items):
+        release.wait(5)
+        sizes.append(len(items))
+        return items
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=10)
+    first = batcher.submit(0)  # Держит фоновый поток, пока копятся остальные
+    time.sleep(0.05)
+    rest = [batcher.submit(i) for i in range(1, 6)]
+    release.set()
+
+    assert first.result(timeout=5) == 0
+    assert [future.result(timeout=5) for future in rest] == [1, 2, 3, 4, 5]
+    assert sizes == [1, 5]
+
+
+def test_batch_exception_reaches_every_caller():
+    def batch_fn(items):
+        raise RuntimeError("модель недоступна")
+
+    batcher = MicroBatcher(batch_fn)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+
+
+def test_result_count_mismatch_fails_every_future():
+    batcher = MicroBatcher(lambda items: items[:-1])
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+
+
+def test_call_times_out_and_cancelled_item_is_skipped():
+    release = threading.Event()
+    seen = []
+
+    def batch_fn(items):
+        release.wait(5)
+        seen.extend(items)
+        return items
+
+    batcher = MicroBatcher(batch_fn)
+    first = batcher.submit("first")
+    time.sleep(0.05)
+    with pytest.raises(FutureTimeoutError):
+        batcher("late", timeout=0.05)
+    release.set()
+
+    assert first.result(timeout=5) == "first"
+    time.sleep(0.1)
+    assert seen == ["first"]
+
+
+def test_full_queue_rejects_submit():
+    release = threading.Event()
+    batcher = MicroBatcher(lambda items: release.wait(5) and items, max_batch_size=1, max_queue=1)
+    batcher.submit(0)
+    time.sleep(0.05)  # Фоновый поток забрал первый элемент и ждет
+    batcher.submit(1)
+
+    with pytest.raises(BatcherOverloaded):
+        batcher.submit(2)
+    assert batcher.stats()["rejected"] == 1
+    release.set()
+
+
+def test_oversized_batches_counted_in_overflow_bucket_and_exported():
+    batcher = MicroBatcher(lambda items: items, max_batch_size=2048, name="test-overflow")
+
+    batcher._record(2000, [1.0] * 2000)
+    batcher._record(1024, [])
+
+    histogram = batcher.stats()["batch_size_histogram"]
+    assert histogram["+Inf"] == 1
+    assert histogram["<=1024"] == 1
+
+    lines = batch_size_metric.collect()
+    assert 'trustflow_micro_batch_size_bucket{batcher="test-overflow",le="1024"} 1' in lines
+    assert 'trustflow_micro_batch_size_bucket{batcher="test-overflow",le="+Inf"} 2' in lines
+    assert 'trustflow_micro_batch_queue_delay_seconds_count{batcher="test-overflow"} 2000' in queue_delay_metric.collect()
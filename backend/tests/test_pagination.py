@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import literal_column, update
+
+from app.models.credit import CreditReport
+from app.services.pagination import decode_cursor, encode_cursor, paginate
+
+
+@pytest.mark.parametrize("created_at", [
+    datetime(2026, 1, 1, 12, 30, 5),
+    datetime(2026, 1, 1, 12, 30, 5, 123456),
+])
+def test_cursor_round_trips(created_at):
+    cursor = encode_cursor(created_at, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "bm8tc2VwYXJhdG9y", encode_cursor(datetime(2026, 1, 1), 1)[:-3]])
+def test_broken_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def add_reports(db, timestamps):
+    """Отчеты с created_at в формате SQLite CURRENT_TIMESTAMP (как у server_default)"""
+    reports = [CreditReport(user_id=1, score=600) for _ in timestamps]
+    db.add_all(reports)
+    db.flush()
+    for report, timestamp in zip(reports, timestamps):
+        db.execute(
+            update(CreditReport).where(CreditReport.id == report.id).values(created_at=literal_column(f"'{timestamp}'"))
+        )
+    db.commit()
+    return [report.id for report in reports]
+
+
+def all_pages(db, limit):
+    pages, cursor = [], None
+    while True:
+        query = db.query(CreditReport).filter(CreditReport.user_id == 1)
+        rows, cursor = paginate(query, CreditReport, cursor, limit)
+        pages.append([row.id for row in rows])
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 5, 10])
+def test_pages_split_equal_created_at_without_gaps_or_duplicates(db, limit):
+    ids = add_reports(db, [
+        "2026-01-01 10:00:00",
+        "2026-01-01 10:00:01",
+        "2026-01-01 10:00:01",
+        "2026-01-01 10:00:01",
+        "2026-01-01 10:00:01",
+        "2026-01-01 10:00:01",
+        "2026-01-01 10:00:02",
+    ])
+
+    pages = all_pages(db, limit)
+
+    # Новые первыми, при равном created_at - по убыванию id
+    expected = [ids[6]] + ids[1:6][::-1] + [ids[0]]
+    assert [row_id for page in pages for row_id in page] == expected
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_last_full_page_has_no_cursor(db):
+    add_reports(db, ["2026-01-01 10:00:00"] * 4)
+
+    query = db.query(CreditReport).filter(CreditReport.user_id == 1)
+    rows, cursor = paginate(query, CreditReport, None, 4)
+    assert len(rows) == 4 and cursor is None
+
+    rows, cursor = paginate(query, CreditReport, None, 3)
+    assert len(rows) == 3 and cursor is not None
+    rows, cursor = paginate(query, CreditReport, cursor, 3)
+    assert len(rows) == 1 and cursor is None
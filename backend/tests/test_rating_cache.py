@@ -0,0 +1,58 @@
+import pytest
+
+from app.services.blockchain_service import BlockchainService, rating_version
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = BlockchainService()
+    reads = []
+    read_ratings = service._read_ratings
+
+    def counting_read(user_ids):
+        reads.append(list(user_ids))
+        return read_ratings(user_ids)
+
+    monkeypatch.setattr(service, "_read_ratings", counting_read)
+    service.reads = reads
+    return service
+
+
+def test_same_version_is_served_from_cache(service):
+    version = rating_version({"id": 1, "transaction_hash": None})
+    first = service.get_user_rating(7, version)
+
+    assert service.get_user_rating(7, version) == first
+    assert service.reads == [[7]]
+
+
+def test_new_version_rereads_rating(service):
+    service.get_user_rating(7, rating_version({"id": 1, "transaction_hash": None}))
+    service.get_user_rating(7, rating_version({"id": 1, "transaction_hash": "0xab"}))
+    service.get_user_rating(7, rating_version({"id": 2, "transaction_hash": None}))
+
+    assert service.reads == [[7], [7], [7]]
+
+
+def test_warm_ratings_reads_missing_users_in_one_batch(service):
+    service.get_user_rating(1, "v1")
+
+    ratings = service.warm_ratings({1: "v1", 2: "v1", 3: None})
+
+    assert set(ratings) == {1, 2, 3}
+    assert service.reads == [[1], [2, 3]]
+    # Прогретые записи отдаются из кеша с той же версией
+    assert service.get_user_rating(2, "v1") == ratings[2]
+    assert service.get_user_rating(3) == ratings[3]
+    assert len(service.reads) == 2
+    # Устаревшая версия читается заново
+    service.warm_ratings({1: "v2"})
+    assert service.reads[-1] == [1]
+
+
+def test_update_credit_score_invalidates_cached_rating(service):
+    service.get_user_rating(7, "v1")
+    assert service.update_credit_score(7, 700, "ab" * 32)
+
+    service.get_user_rating(7, "v1")
+    assert service.reads == [[7], [7]]
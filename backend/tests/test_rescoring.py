@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from app import rescoring
+from app.models.credit import CreditReport, UserLatestScore
+from app.models.user import User
+from app.rescoring import Checkpoint, Rescorer
+
+
+def add_users(db, count):
+    for i in range(1, count + 1):
+        db.add(User(id=i, email=f"user{i}@example.com", password_hash="x"))
+    db.commit()
+
+
+def report_rows(user_ids):
+    return [
+        {
+            "user_id": user_id,
+            "score": 700,
+            "score_category": "good",
+            "reputation_score": 70.0,
+            "report_data": json.dumps({"user_id": user_id, "source": "rescoring"}),
+            "feature_snapshot_id": None
+        }
+        for user_id in user_ids
+    ]
+
+
+def test_checkpoint_is_saved_with_chunk_reports(db):
+    add_users(db, 3)
+    rescorer = Rescorer(Checkpoint("test"))
+
+    rescorer._write(report_rows([1, 2]), last_user_id=2)
+    rescorer._write(report_rows([3]), last_user_id=3)
+
+    resumed = Checkpoint("test")
+    assert (resumed.last_user_id, resumed.processed) == (3, 3)
+    assert db.query(CreditReport).count() == 3
+    assert db.query(UserLatestScore).count() == 3
+
+    resumed.reset()
+    assert Checkpoint("test").last_user_id == 0
+
+
+def test_failed_chunk_leaves_neither_reports_nor_checkpoint(db, monkeypatch):
+    add_users(db, 2)
+    rescorer = Rescorer(Checkpoint("test"))
+
+    def broken_upsert(*args, **kwargs):
+        raise RuntimeError("сбой после вставки отчетов")
+
+    monkeypatch.setattr(rescoring, "latest_score_upsert_many", broken_upsert)
+    with pytest.raises(RuntimeError):
+        rescorer._write(report_rows([1, 2]), last_user_id=2)
+
+    # Повторный запуск начнет с той же пачки и не задвоит отчеты
+    assert Checkpoint("test").last_user_id == 0
+    assert db.query(CreditReport).count() == 0
@@ -0,0 +1,15 @@
+import argparse
+import logging
+
+from app.config import settings
+from app.worker import Worker
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Воркер очереди расчета кредитного скора")
+    parser.add_argument("--pool-size", type=int, default=settings.WORKER_POOL_SIZE, help="Потоков в процессе")
+    parser.add_argument("--poll-interval", type=float, default=settings.WORKER_POLL_INTERVAL, help="Секунд между опросами пустой очереди")
+    parser.add_argument("--anchor-interval", type=float, default=settings.ANCHOR_POLL_INTERVAL, help="Секунд между проверками пакета для блокчейна")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    Worker(pool_size=args.pool_size, poll_interval=args.poll_interval, anchor_interval=args.anchor_interval).run()
@@ -1,6 +1,8 @@
 from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import Dict
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, model_validator
+from typing import Dict, List, Union
+import numpy as np
 import random
 import threading
 import uvicorn
@@ -18,6 +20,26 @@ class GenerateResponse(BaseModel):
     features: Dict[str, float]
 
 
+class BatchGenerateRequest(BaseModel):
+    user_ids: List[str]
+    # Один флаг на всех или по флагу на каждого пользователя
+    has_credit_history: Union[bool, List[bool]]
+
+    @model_validator(mode="after")
+    def check_sizes(self):
+        if len(self.user_ids) > CreditDataGenerator.MAX_BATCH_SIZE:
+            raise ValueError(f"Максимальный размер пакета: {CreditDataGenerator.MAX_BATCH_SIZE}")
+        if isinstance(self.has_credit_history, list) and len(self.has_credit_history) != len(self.user_ids):
+            raise ValueError("Длина has_credit_history должна совпадать с длиной user_ids")
+        return self
+
+
+class BatchGenerateResponse(BaseModel):
+    # Колоночный формат: features[имя][i] относится к user_ids[i]
+    user_ids: List[str]
+    features: Dict[str, List[float]]
+
+
 #  ГЕНЕРАТОР
 class CreditDataGenerator:
     RANGES = {
@@ -28,6 +50,15 @@ class CreditDataGenerator:
         'DEBT': (0, 5968620),
     }
 
+    # Порядок признаков в ответе
+    FEATURES = (
+        'INCOME', 'SAVINGS', 'R_SAVINGS_INCOME', 'T_EXPENDITURE_12',
+        'R_EXPENDITURE_INCOME', 'CAT_DEPENDENTS', 'T_TAX_12', 'DEBT',
+        'R_DEBT_INCOME', 'R_DEBT_SAVINGS', 'CAT_DEBT', 'HAS_HISTORY',
+    )
+
+    MAX_BATCH_SIZE = 100_000
+
     _local = threading.local()
 
     @staticmethod
@@ -36,6 +67,12 @@ class CreditDataGenerator:
             CreditDataGenerator._local.random = random.Random()
         return CreditDataGenerator._local.random
 
+    @staticmethod
+    def _get_numpy_random() -> np.random.Generator:
+        if not hasattr(CreditDataGenerator._local, 'np_random'):
+            CreditDataGenerator._local.np_random = np.random.default_rng()
+        return CreditDataGenerator._local.np_random
+
     @staticmethod
     def generate(has_history: bool) -> Dict[str, float]:
         data = {}
@@ -63,6 +100,37 @@ class CreditDataGenerator:
 
         return data
 
+    @staticmethod
+    def generate_batch(has_history: np.ndarray) -> Dict[str, np.ndarray]:
+        """Векторная генерация признаков для n пользователей за один проход"""
+        has_history = np.asarray(has_history, dtype=bool)
+        n = has_history.shape[0]
+        rnd = CreditDataGenerator._get_numpy_random()
+        data = {}
+
+        # 1. ОСНОВНЫЕ 5 параметров - по столбцу на признак
+        for key, (min_val, max_val) in CreditDataGenerator.RANGES.items():
+            data[key] = rnd.integers(min_val, max_val, size=n, endpoint=True)
+        data['DEBT'] = np.where(has_history, data['DEBT'], 0)
+
+        # 2. Категориальные
+        data['CAT_DEPENDENTS'] = (rnd.random(n) < 0.5).astype(np.int64)
+
+        # 3. ВЫЧИСЛЯЕМ отношения (деление на ноль дает 0.0, как в generate)
+        def safe_div(a, b):
+            out = np.zeros(n, dtype=np.float64)
+            np.divide(a, b, out=out, where=b != 0)
+            return np.round(out, 2)
+
+        data['R_SAVINGS_INCOME'] = safe_div(data['SAVINGS'], data['INCOME'])
+        data['R_EXPENDITURE_INCOME'] = safe_div(data['T_EXPENDITURE_12'], data['INCOME'])
+        data['R_DEBT_INCOME'] = safe_div(data['DEBT'], data['INCOME'])
+        data['R_DEBT_SAVINGS'] = safe_div(data['DEBT'], data['SAVINGS'])
+        data['CAT_DEBT'] = (data['DEBT'] > 0).astype(np.int64)
+        data['HAS_HISTORY'] = has_history.astype(np.int64)
+
+        return {key: data[key] for key in CreditDataGenerator.FEATURES}
+
 
 @app.post("/api/generate")
 def generate_data(request: GenerateRequest):
@@ -75,6 +143,22 @@ def generate_data(request: GenerateRequest):
     )
 
 
+@app.post("/api/generate/batch", response_model=BatchGenerateResponse)
+def generate_data_batch(request: BatchGenerateRequest):
+    if isinstance(request.has_credit_history, bool):
+        has_history = np.full(len(request.user_ids), request.has_credit_history, dtype=bool)
+    else:
+        has_history = np.array(request.has_credit_history, dtype=bool)
+
+    columns = CreditDataGenerator.generate_batch(has_history)
+    # tolist() переводит столбцы в нативные типы Python одним вызовом,
+    # JSONResponse отдаем напрямую, минуя поэлементную валидацию ответа
+    return JSONResponse(content={
+        "user_ids": request.user_ids,
+        "features": {key: column.tolist() for key, column in columns.items()}
+    })
+
+
 @app.get("/health")
 def health_check():
     return {"status": "ok", "service": "credit_data_generator"}
@@ -1,26 +1,155 @@
+"""Клиенты рандомайзера кредитных данных. Используется и бэкендом (backend/app/services/credit_data_client.py)"""
+import asyncio
 import requests
+import httpx
 import logging
-from typing import Optional, Dict
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, List, Union
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Размер пачки для /api/generate/batch
+BATCH_CHUNK_SIZE = 5000
+
+
+def _columns_to_rows(payload: Dict) -> Dict[str, Dict]:
+    """Колоночный ответ /api/generate/batch -> {user_id: features}"""
+    features = payload["features"]
+    return {
+        user_id: {key: column[i] for key, column in features.items()}
+        for i, user_id in enumerate(payload["user_ids"])
+    }
+
+
+def _chunks(user_ids: List[str], has_history: List[bool], size: int):
+    for start in range(0, len(user_ids), size):
+        yield user_ids[start:start + size], has_history[start:start + size]
+
+
+def _history_flags(user_ids: List[str], has_history: Union[bool, List[bool]]) -> List[bool]:
+    if isinstance(has_history, bool):
+        return [has_history] * len(user_ids)
+    if len(has_history) != len(user_ids):
+        raise ValueError("Длина has_history должна совпадать с длиной user_ids")
+    return list(has_history)
+
 
 class RandomizerClient:
-    def __init__(self, base_url: str = "http://localhost:8002"):
+    """Синхронный клиент с пулом keep-alive соединений"""
+
+    def __init__(
+            self,
+            base_url: str = "http://localhost:8002",
+            timeout: float = 5,
+            pool_size: int = 20,
+            batch_timeout: Optional[float] = None,
+            adapter: Optional[HTTPAdapter] = None
+    ):
         self.base_url = base_url.rstrip("/")  # убираем слеш в конце
+        self.timeout = timeout
+        self.batch_timeout = batch_timeout or timeout  # Пачка до BATCH_CHUNK_SIZE пользователей
+
+        # Одна сессия на клиент: TCP соединения переиспользуются между вызовами.
+        # adapter - свой HTTPAdapter (например, с метриками), по умолчанию обычный пул
+        self.session = requests.Session()
+        adapter = adapter or HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def get_financial_data(self, user_id: str, has_history: bool) -> Optional[Dict]:
         """Получить 12 параметров от рандомайзера"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/generate",
                 json={
                     "user_id": user_id,
                     "has_credit_history": has_history
                 },
-                timeout=5
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+            logger.info(f"Успешно получены данные для user_id={user_id}")
+            return data["features"]
+
+        except Exception as e:
+            logger.error(f"Ошибка рандомайзера для user_id={user_id}: {e}")
+            return None
+
+    def get_financial_data_many(
+            self,
+            user_ids: List[str],
+            has_history: Union[bool, List[bool]],
+            chunk_size: int = BATCH_CHUNK_SIZE
+    ) -> Dict[str, Dict]:
+        """Получить параметры для списка пользователей через /api/generate/batch.
+
+        Возвращает {user_id: features}; пользователи из неудачных пачек отсутствуют в ответе.
+        """
+        flags = _history_flags(user_ids, has_history)
+        result = {}
+        for ids, chunk_flags in _chunks(user_ids, flags, chunk_size):
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/api/generate/batch",
+                    json={"user_ids": ids, "has_credit_history": chunk_flags},
+                    timeout=self.batch_timeout
+                )
+                response.raise_for_status()
+                result.update(_columns_to_rows(response.json()))
+            except Exception as e:
+                logger.error(f"Ошибка рандомайзера для пачки из {len(ids)} пользователей: {e}")
+
+        logger.info(f"Успешно получены данные для {len(result)} из {len(user_ids)} пользователей")
+        return result
+
+    def health(self, timeout: Optional[float] = None) -> bool:
+        """True, если сервис отвечает на /health; иначе исключение requests"""
+        response = self.session.get(f"{self.base_url}/health", timeout=timeout or self.timeout)
+        response.raise_for_status()
+        return True
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncRandomizerClient:
+    """Асинхронный клиент для вызова из async обработчиков FastAPI"""
+
+    def __init__(
+            self,
+            base_url: str = "http://localhost:8002",
+            timeout: float = 5,
+            pool_size: int = 20,
+            max_concurrency: int = 4
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """httpx.AsyncClient создается при первом запросе (внутри работающего event loop)
+        и держит keep-alive соединения в пуле до aclose()"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+        return self._client
+
+    async def get_financial_data(self, user_id: str, has_history: bool) -> Optional[Dict]:
+        """Получить 12 параметров от рандомайзера, не блокируя event loop"""
+        try:
+            response = await self.client.post(
+                "/api/generate",
+                json={
+                    "user_id": user_id,
+                    "has_credit_history": has_history
+                }
             )
             response.raise_for_status()
             data = response.json()
@@ -31,15 +160,62 @@ class RandomizerClient:
             logger.error(f"Ошибка рандомайзера для user_id={user_id}: {e}")
             return None
 
+    async def get_financial_data_many(
+            self,
+            user_ids: List[str],
+            has_history: Union[bool, List[bool]],
+            chunk_size: int = BATCH_CHUNK_SIZE
+    ) -> Dict[str, Dict]:
+        """Получить параметры для списка пользователей.
+
+        Пачки /api/generate/batch отправляются параллельно, не более max_concurrency одновременно.
+        """
+        flags = _history_flags(user_ids, has_history)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch_chunk(ids: List[str], chunk_flags: List[bool]) -> Dict[str, Dict]:
+            async with semaphore:
+                try:
+                    response = await self.client.post(
+                        "/api/generate/batch",
+                        json={"user_ids": ids, "has_credit_history": chunk_flags}
+                    )
+                    response.raise_for_status()
+                    return _columns_to_rows(response.json())
+                except Exception as e:
+                    logger.error(f"Ошибка рандомайзера для пачки из {len(ids)} пользователей: {e}")
+                    return {}
+
+        chunks = await asyncio.gather(*(
+            fetch_chunk(ids, chunk_flags) for ids, chunk_flags in _chunks(user_ids, flags, chunk_size)
+        ))
+
+        result = {}
+        for chunk in chunks:
+            result.update(chunk)
+        logger.info(f"Успешно получены данные для {len(result)} из {len(user_ids)} пользователей")
+        return result
+
+    async def aclose(self):
+        """Закрыть пул соединений (например, в shutdown приложения); следующий запрос откроет новый"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
 
 # Создаём один экземпляр на всё приложение
 randomizer_client = RandomizerClient()
+async_randomizer_client = AsyncRandomizerClient()
 
 # Тест только при прямом запуске
 if __name__ == "__main__":
     # Для локальной проверки
+    logging.basicConfig(level=logging.INFO)
     result = randomizer_client.get_financial_data('test_user', True)
     if result:
         print(f"✅ Клиент работает! Получено {len(result)} параметров:{result}")
     else:
-        print("❌ Клиент не смог получить данные")
\ No newline at end of file
+        print("❌ Клиент не смог получить данные")
+
+    many = randomizer_client.get_financial_data_many([f"user_{i}" for i in range(100)], False)
+    print(f"Пакетный режим: получены данные для {len(many)} пользователей")